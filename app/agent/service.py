@@ -11,6 +11,11 @@ Multi-turn design:
   LangGraph's thread_id.
 - Timeout is handled at the async route layer via asyncio.wait_for;
   this module does NOT use signal.SIGALRM.
+- generate_image (sync) and agenerate_image (async) share setup and
+  result extraction; the API routes use the async path.
+- Render tools publish images in the background (publisher.py); a run
+  waits for its conversation's uploads before returning the final reply.
+  Its images leave the in-memory image store when the run ends.
 """
 
 import re
@@ -31,7 +36,15 @@ from langchain.messages import HumanMessage
 
 from ..config import get_settings
 from ..model import get_main_model, get_fallback_models
-from ..tool import generate_html_image, generate_html_image_from_vfs, check_image_quality
+from ..tool import (
+    generate_html_image,
+    generate_html_image_from_vfs,
+    generate_html_image_variants,
+    patch_html_image,
+    check_image_quality,
+)
+from ..util.image_store import release_images
+from ..util.publisher import await_published, wait_published
 from .prompt import get_system_prompt
 
 logger = logging.getLogger(__name__)
@@ -60,6 +73,10 @@ _VFS_SYSTEM_PROMPT = """## 虚拟文件系统工具（可选）
 4) 生成图片后，仍必须调用 check_image_quality。
 """
 
+_LIVE_PAGE_PROMPT = """5) generate_html_image_from_vfs 渲染后页面会保持打开：后续小改动（颜色、文字、间距、图表配置）优先用 patch_html_image 直接修改并截图，无需 edit_file 和重新渲染。
+6) patch_html_image 的改动不会写回文件；若之后需要 edit_file 做结构性修改，请把已做的补丁改动一并写入文件。返回 LIVE_PAGE_NOT_FOUND 时改用 generate_html_image_from_vfs 完整渲染。
+"""
+
 
 class ImageGenAgenticService:
     """
@@ -89,10 +106,12 @@ class ImageGenAgenticService:
             self.service_name, model.model_name, len(fallback_models),
         )
 
-        tools = [generate_html_image, check_image_quality]
+        tools = [generate_html_image, generate_html_image_variants, check_image_quality]
         if settings.agent_enable_virtual_filesystem:
             # Keep the original toolchain and add VFS file-based render path.
             tools.insert(1, generate_html_image_from_vfs)
+            if settings.render_live_pages:
+                tools.insert(2, patch_html_image)
 
         if settings.agent_enable_mermaid:
             try:
@@ -129,7 +148,7 @@ class ImageGenAgenticService:
         if settings.agent_enable_virtual_filesystem:
             filesystem_middleware = FilesystemMiddleware(
                 backend=StateBackend,
-                system_prompt=_VFS_SYSTEM_PROMPT,
+                system_prompt=_VFS_SYSTEM_PROMPT + (_LIVE_PAGE_PROMPT if settings.render_live_pages else ""),
                 tool_token_limit_before_evict=20000,
             )
             # Keep only VFS text/file tools; do not expose execute.
@@ -190,28 +209,8 @@ class ImageGenAgenticService:
         m = _IMAGE_URL_RE.search(text)
         return m.group(1) if m else None
 
-    def generate_image(
-        self,
-        query: str,
-        conversation_id: str,
-        user_id: str = "",
-    ) -> str:
-        """
-        Execute one turn of the image generation workflow.
-
-        Args:
-            query: Natural-language image description or follow-up instruction.
-            conversation_id: Stable conversation identifier; used as LangGraph thread_id
-                             so that history is preserved across turns.
-            user_id: Optional user identifier for Langfuse tracing.
-
-        Returns:
-            Agent response string containing the image URL in markdown format.
-
-        Note:
-            Timeout is NOT handled here. The caller (async route) should wrap
-            this call in asyncio.wait_for(run_in_threadpool(...), timeout=...).
-        """
+    def _build_run_input(self, query: str, conversation_id: str, user_id: str) -> tuple[dict, dict]:
+        """Build the agent input and run config (thread_id, callbacks, tracing metadata)."""
         session_id = (
             f"{self.service_name}_{user_id}"
             if user_id
@@ -251,24 +250,33 @@ class ImageGenAgenticService:
                 "langfuse_tags": ["ImageGen", "image_gen_agent"],
             },
         }
+        return {"messages": messages}, config
 
-        logger.info("[%s][%s] Agent executing ...", self.service_name, conversation_id)
-        start_time = datetime.now()
+    def _handle_run_error(self, e: Exception, conversation_id: str, start_time: datetime) -> str:
+        """Log an agent failure and return the user-facing error text."""
+        error_type = type(e).__name__
+        elapsed = (datetime.now() - start_time).total_seconds()
+        logger.error(
+            "[%s][%s] Error after %.2fs: %s - %s",
+            self.service_name, conversation_id, elapsed, error_type, e,
+            exc_info=True,
+        )
+        if "RateLimitError" in error_type:
+            return "LLM rate limit exceeded. Please retry later."
+        return "Image generation service encountered an error. Please retry later."
 
-        try:
-            result = self.agent.invoke({"messages": messages}, config=config)
-        except Exception as e:
-            error_type = type(e).__name__
-            elapsed = (datetime.now() - start_time).total_seconds()
-            logger.error(
-                "[%s][%s] Error after %.2fs: %s - %s",
-                self.service_name, conversation_id, elapsed, error_type, e,
-                exc_info=True,
-            )
-            if "RateLimitError" in error_type:
-                return "LLM rate limit exceeded. Please retry later."
-            return "Image generation service encountered an error. Please retry later."
+    def _finish_run(
+        self,
+        result: dict,
+        conversation_id: str,
+        start_time: datetime,
+        publish_failures: list[dict] | None = None,
+    ) -> str:
+        """Log run statistics and extract the final reply from agent results.
 
+        publish_failures are the run's images whose background upload failed;
+        a reply linking one of them is replaced by an error message.
+        """
         elapsed = (datetime.now() - start_time).total_seconds()
         logger.info(
             "[%s][%s] Agent finished in %.2fs",
@@ -303,4 +311,80 @@ class ImageGenAgenticService:
             )
             return "Image generation agent completed but produced no output."
 
+        for failure in publish_failures or []:
+            logger.error(
+                "[%s][%s] Publishing %s failed: %s",
+                self.service_name, conversation_id, failure["url"], failure["error"],
+            )
+        if any(failure["url"] in final_output for failure in publish_failures or []):
+            return "Image generation succeeded but publishing the image failed. Please retry later."
+
         return final_output
+
+    def generate_image(
+        self,
+        query: str,
+        conversation_id: str,
+        user_id: str = "",
+    ) -> str:
+        """
+        Execute one turn of the image generation workflow.
+
+        Args:
+            query: Natural-language image description or follow-up instruction.
+            conversation_id: Stable conversation identifier; used as LangGraph thread_id
+                             so that history is preserved across turns.
+            user_id: Optional user identifier for Langfuse tracing.
+
+        Returns:
+            Agent response string containing the image URL in markdown format.
+
+        Note:
+            Timeout is NOT handled here. The caller (async route) should wrap
+            this call in asyncio.wait_for(run_in_threadpool(...), timeout=...).
+        """
+        agent_input, config = self._build_run_input(query, conversation_id, user_id)
+
+        logger.info("[%s][%s] Agent executing ...", self.service_name, conversation_id)
+        start_time = datetime.now()
+
+        try:
+            result = self.agent.invoke(agent_input, config=config)
+        except Exception as e:
+            return self._handle_run_error(e, conversation_id, start_time)
+        finally:
+            release_images(conversation_id)
+
+        publish_failures = wait_published(conversation_id)
+        return self._finish_run(result, conversation_id, start_time, publish_failures)
+
+    async def agenerate_image(
+        self,
+        query: str,
+        conversation_id: str,
+        user_id: str = "",
+    ) -> str:
+        """
+        Async counterpart of generate_image.
+
+        Runs the agent with ainvoke so render tools await the async renderer
+        on the event loop instead of occupying threadpool workers.
+
+        Note:
+            Timeout is NOT handled here. The caller should wrap this call in
+            asyncio.wait_for(..., timeout=...).
+        """
+        agent_input, config = self._build_run_input(query, conversation_id, user_id)
+
+        logger.info("[%s][%s] Agent executing (async) ...", self.service_name, conversation_id)
+        start_time = datetime.now()
+
+        try:
+            result = await self.agent.ainvoke(agent_input, config=config)
+        except Exception as e:
+            return self._handle_run_error(e, conversation_id, start_time)
+        finally:
+            release_images(conversation_id)
+
+        publish_failures = await await_published(conversation_id)
+        return self._finish_run(result, conversation_id, start_time, publish_failures)
@@ -5,23 +5,26 @@ Multi-turn conversation design:
 - POST /conversations               — create a new session
 - POST /conversations/{id}/messages — send one user turn, get agent reply
 - GET  /conversations/{id}/messages — retrieve display history (for page refresh)
+- GET  /images/{filename}           — an image, from its local copy while its upload is pending
 
 Each conversation is isolated by its conversation_id, which is used directly
 as LangGraph's thread_id inside the agent service.
 
 Concurrency:
-- Blocking agent call is offloaded to a thread pool via run_in_threadpool.
+- The agent runs natively on the event loop (service.agenerate_image), so
+  in-flight renders are awaited instead of holding threadpool workers.
 - asyncio.wait_for enforces a per-request timeout (600 s).
 - Per-conversation asyncio.Lock prevents concurrent turns on the same session.
 """
 
 import uuid
 import asyncio
+import mimetypes
 import logging
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, HTTPException
-from starlette.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response
 
 from .schemas import (
     ConversationCreateRequest,
@@ -34,6 +37,9 @@ from .schemas import (
 )
 from ..agent.service import ImageGenAgenticService
 from ..agent.conversation_store import InMemoryConversationStore, DisplayMessage
+from ..util.publisher import get_image_publisher
+from ..util.render_scheduler import get_render_scheduler
+from ..util.uploader import api_image_url, image_url
 
 logger = logging.getLogger(__name__)
 
@@ -79,8 +85,46 @@ def _get_lock(conversation_id: str) -> asyncio.Lock:
 
 @router.get("/health", response_model=HealthResponse, tags=["health"])
 async def health_check():
-    """Service health check endpoint."""
-    return HealthResponse()
+    """Service health check endpoint; reports render queue depth for load shedding."""
+    stats = get_render_scheduler().stats()
+    saturated = stats["active"] >= stats["max_concurrent"] and stats["queued"] >= stats["max_queue"]
+    return HealthResponse(
+        status="busy" if saturated else "ok",
+        render_active=stats["active"],
+        render_queue_depth=stats["queued"],
+        render_max_concurrent=stats["max_concurrent"],
+        render_max_queue=stats["max_queue"],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Images
+# ---------------------------------------------------------------------------
+
+@router.get("/images/{filename}", tags=["image"])
+async def get_image(filename: str):
+    """
+    Serve a rendered image.
+
+    Render tools hand out this route's URL (image_api_url_base) while the
+    background upload of the image is pending; until then the bytes are
+    served from the local copy held by the publisher, afterwards the request
+    is redirected to the published URL (image_url_base).
+    """
+    if "/" in filename or "\\" in filename or filename in ("", ".", ".."):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    publisher = get_image_publisher()
+    data = publisher.pending(filename) if publisher is not None else None
+    if data is None:
+        published = image_url(filename)
+        if published == api_image_url(filename):
+            # image_url_base points back at this route: redirecting would loop.
+            logger.warning("IMAGE_URL_BASE is this API's image route; not redirecting %s", filename)
+            raise HTTPException(status_code=404, detail="Image not found")
+        return RedirectResponse(published, status_code=307)
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return Response(content=data, media_type=media_type, headers={"Cache-Control": "no-store"})
 
 
 # ---------------------------------------------------------------------------
@@ -151,8 +195,7 @@ async def send_message(conversation_id: str, request: ConversationMessageRequest
 
         try:
             result_text = await asyncio.wait_for(
-                run_in_threadpool(
-                    service.generate_image,
+                service.agenerate_image(
                     query=request.query,
                     conversation_id=conversation_id,
                     user_id=request.user_id or "",
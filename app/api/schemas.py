@@ -59,5 +59,9 @@ class ConversationMessagesResponse(BaseModel):
 
 class HealthResponse(BaseModel):
     """Health check response."""
-    status: str = "ok"
+    status: str = Field(default="ok", description="'ok', or 'busy' while the render queue is full")
     service: str = "lumi-draw"
+    render_active: int = Field(default=0, description="Renders currently running")
+    render_queue_depth: int = Field(default=0, description="Renders waiting for a slot")
+    render_max_concurrent: int = Field(default=0, description="Render concurrency limit")
+    render_max_queue: int = Field(default=0, description="Render wait queue capacity")
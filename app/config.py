@@ -44,16 +44,124 @@ class Settings(BaseSettings):
     image_remote_host: str = "10.220.77.197"
     image_remote_dir: str = "/home/ccn-a/images/"
     image_local_dir: str = "/home/ccn-a/images/"
+    # Public (static host / CDN) base uploaded images are served from.
     image_url_base: str = "http://10.220.77.197/images/"
     image_sftp_username: str = "ccn-a"
+    # Persistent SFTP sessions reused across uploads (see sftp_pool.py): max
+    # open sessions, SSH keepalive interval (s, 0 = off) and idle close (s).
+    image_sftp_pool_size: int = 2
+    image_sftp_keepalive: int = 30
+    image_sftp_idle_timeout: int = 300
+    # Write-behind publishing (see publisher.py): render tools return the
+    # image's URL on this API's GET /images/{name} route (image_api_url_base,
+    # the externally reachable ".../api/v1/images/"; unset = upload
+    # synchronously) and upload in the background. The route serves the bytes
+    # until the upload lands, then redirects to image_url_base. The final
+    # reply waits for the conversation's uploads (up to image_publish_timeout
+    # s). Failed uploads are retried image_publish_retries times, backoff
+    # doubling per retry.
+    image_api_url_base: str = ""
+    image_publish_async: bool = True
+    image_publish_workers: int = 2
+    image_publish_retries: int = 3
+    image_publish_backoff: float = 0.5
+    image_publish_timeout: float = 60.0
 
     # --- Renderer ---
     render_output_dir: str = "/tmp/image_gen"
+    # Keep rendered images in memory for upload / QA instead of writing them
+    # to render_output_dir; over render_memory_max_mb the least recently used
+    # spill over to disk (or are dropped with render_spill_to_disk off).
+    render_in_memory: bool = True
+    render_memory_max_mb: int = 256
+    render_spill_to_disk: bool = True
     render_html_mode: str = "enhanced_web"  # pure_css | enhanced_web
     render_allowed_hosts: str = "cdn.jsdelivr.net,unpkg.com,cdnjs.cloudflare.com"
     render_ready_timeout_ms: int = 12000
+    render_auto_detect_charts: bool = True  # Ready once all ECharts instances finish
+    render_stable_timeout_ms: int = 3000  # pure_css: max wait for fonts/images/stable layout
     render_block_external_images: bool = True
     render_use_local_echarts: bool = False  # Use local ECharts bundle instead of CDN
+    # Deterministic renders: animations / transitions off (CSS and ECharts),
+    # Math.random seeded and Date / performance.now frozen, so identical HTML
+    # yields byte-identical images.
+    render_deterministic: bool = False
+    # Static pre-flight checks of enhanced_web HTML before rendering (see
+    # preflight.py); autofix applies the safe fixes, otherwise they are warnings.
+    render_preflight: bool = True
+    render_preflight_autofix: bool = True
+    # Per-page budgets (0 = off): main-thread script time in ms and JS heap in
+    # MB. Over budget, page scripts are terminated and the render fails with
+    # SCRIPT_BUDGET_EXCEEDED (see script_budget.py).
+    render_script_budget_ms: int = 10000
+    render_heap_budget_mb: int = 512
+    # Draw pages that are a single self-contained <svg> in process (cairosvg)
+    # instead of in Chromium; anything the classifier is unsure about still
+    # goes to the browser (see svg_fast_lane.py).
+    render_svg_fast_lane: bool = True
+    # URL-keyed on-disk cache for whitelisted CDN assets (see asset_cache.py),
+    # LRU-evicted over render_asset_cache_max_mb
+    render_asset_cache_enabled: bool = True
+    render_asset_cache_dir: str = "/tmp/lumi_asset_cache"
+    render_asset_cache_max_mb: int = 256
+    # Pre-warmed pages per pooled browser with ECharts already evaluated (0 = off).
+    # Used for pages whose only ECharts bundle is render_warm_echarts_url
+    # (or any ECharts bundle when render_use_local_echarts is on).
+    render_warm_echarts_pages: int = 1
+    render_warm_echarts_url: str = "https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"
+    # Warm browser pool: browsers kept alive per process, concurrent renders
+    # per browser, and renders before a browser is recycled.
+    render_pool_size: int = 2
+    render_pool_max_pages: int = 4
+    render_pool_max_renders: int = 200
+    render_pool_prewarm: bool = True  # Launch pool browsers at startup
+    # Content-addressed render cache (LRU on disk)
+    render_cache_enabled: bool = True
+    render_cache_dir: str = "/tmp/image_gen/cache"
+    render_cache_max_mb: int = 512
+    render_cache_max_entries: int = 2000
+    # Output encoding: png | png_optimized | png_quantized | webp | jpeg.
+    # Re-encoding runs in a process pool (0 workers = run in a thread).
+    render_output_format: str = "png"
+    render_output_quality: int = 85  # webp/jpeg quality (webp 100 = lossless)
+    render_encode_workers: int = 2
+    # Tall pages: capture in strips of render_tile_height CSS px (0 = single
+    # full-page screenshot) and cap each image at render_max_height px
+    # (0 = no cap), either truncating or splitting into several images.
+    render_tile_height: int = 4096
+    render_max_height: int = 16384
+    render_overflow_mode: str = "truncate"  # truncate | split
+    render_batch_max_items: int = 8  # Max variants per generate_html_image_variants call
+    # Admission control: renders running at once (a batch counts as one),
+    # renders allowed to wait for a slot, and seconds they may wait before
+    # failing with RENDER_BUSY.
+    render_max_concurrent: int = 8
+    render_max_queue: int = 32
+    render_queue_timeout: float = 30.0
+    # Live pages: keep the last VFS-rendered page per conversation open so
+    # patch_html_image can edit it in place (idle TTL in seconds, LRU cap).
+    render_live_pages: bool = False
+    render_live_page_ttl: int = 600
+    render_live_page_max: int = 16
+    # Local font service: families named in a page are subset to its characters
+    # and served via @font-face (needs fontTools). Map: "Family=/path,...".
+    # Off until benchmarked: exact per-page subsets rarely hit the cache.
+    render_fonts_enabled: bool = False
+    render_font_map: str = (
+        "Microsoft YaHei=/usr/share/fonts/truetype/wqy/wqy-microhei.ttc,"
+        "微软雅黑=/usr/share/fonts/truetype/wqy/wqy-microhei.ttc,"
+        "PingFang SC=/usr/share/fonts/truetype/wqy/wqy-microhei.ttc,"
+        "SimHei=/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc,"
+        "黑体=/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc"
+    )
+    render_font_cache_dir: str = "/tmp/lumi_font_cache"
+    # Out-of-process render workers (0 = render in the API process). Each
+    # worker runs its own browser pool and is recycled after
+    # render_worker_max_renders requests or once its process tree (Chromium
+    # included) passes render_worker_max_rss_mb (0 = no RSS limit).
+    render_workers: int = 0
+    render_worker_max_renders: int = 100
+    render_worker_max_rss_mb: int = 1536
 
     # --- Mermaid Migration ---
     # Feature flag for Mermaid tool. Defaults to False (HTML Native mode).
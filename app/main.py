@@ -10,6 +10,11 @@ from fastapi import FastAPI
 
 from .config import get_settings
 from .api.routes import router
+from .util.browser_pool import get_browser_pool, shutdown_browser_pool
+from .util.encoder import shutdown_encode_executor
+from .util.publisher import shutdown_image_publisher
+from .util.render_workers import get_render_workers, shutdown_render_workers
+from .util.sftp_pool import shutdown_sftp_pool
 
 
 settings = get_settings()
@@ -25,8 +30,22 @@ logging.basicConfig(
 async def lifespan(app: FastAPI):
     """Application lifespan: startup / shutdown hooks."""
     logging.getLogger(__name__).info("Lumi Draw starting up ...")
+    workers = get_render_workers()
+    if workers is not None:
+        # Browsers live in the worker processes; none are needed here.
+        workers.warm()
+    elif settings.render_pool_prewarm:
+        try:
+            get_browser_pool().warm()
+        except Exception as e:
+            logging.getLogger(__name__).warning("Browser pool prewarm failed: %s", e)
     yield
     logging.getLogger(__name__).info("Lumi Draw shutting down ...")
+    shutdown_render_workers()
+    shutdown_browser_pool()
+    shutdown_encode_executor()
+    shutdown_image_publisher()
+    shutdown_sftp_pool()
 
 
 app = FastAPI(
@@ -2,11 +2,18 @@
 Agent tools: HTML rendering, VL quality check.
 """
 
-from .html_render import generate_html_image, generate_html_image_from_vfs
+from .html_render import (
+    generate_html_image,
+    generate_html_image_from_vfs,
+    generate_html_image_variants,
+    patch_html_image,
+)
 from .image_qa import check_image_quality
 
 __all__ = [
     "generate_html_image",
     "generate_html_image_from_vfs",
+    "generate_html_image_variants",
+    "patch_html_image",
     "check_image_quality",
 ]
@@ -1,24 +1,217 @@
 """
 HTML rendering agent tool.
 
-Renders HTML code to a PNG image and uploads it, returning an accessible URL.
+Renders HTML code to an image (PNG by default, optionally WebP/JPEG/optimized
+PNG) and uploads it, returning an accessible URL.
 Supports both pure CSS and enhanced_web (ECharts) rendering modes.
+
+generate_html_image_variants renders several (html, width) variants as
+parallel pages of one pooled browser and reports per-variant results.
+
+With render_live_pages on, generate_html_image_from_vfs keeps the rendered
+page alive per conversation and patch_html_image edits it in place.
+
+Each tool has a sync implementation (agent.invoke) and a native async
+coroutine (agent.ainvoke) that awaits the renderer instead of holding a
+worker thread for the whole render.
+
+Inside an agent run, images are handed to the write-behind publisher
+(publisher.py) and the tools return their URLs without waiting for the
+upload; the agent service waits for the uploads before replying.
 """
 
 import json
+import time
+import asyncio
 import logging
 
 from langchain.tools import ToolRuntime
 from langchain_core.tools import tool
 
-from ..util.renderer import render_html_to_image
+from ..config import get_settings
+from ..util.renderer import (
+    patch_live_page,
+    patch_live_page_async,
+    render_html_batch,
+    render_html_batch_async,
+    render_html_to_image,
+    render_html_to_image_async,
+    render_live_page,
+    render_live_page_async,
+)
+from ..util.image_store import discard_images, hold_images
+from ..util.publisher import get_image_publisher
 from ..util.uploader import upload_image
 
 logger = logging.getLogger(__name__)
 
 
+def _publish_render(render_result: dict, conversation_id: str | None = None, **extra) -> dict:
+    """Publish a successful render (every split part / variant) and build the tool result dict.
+
+    With a conversation_id the uploads are queued on the write-behind
+    publisher and the images stay in memory until the agent run ends (for
+    check_image_quality); otherwise they upload here and leave memory
+    before returning.
+    """
+    if render_result["status"] != "success":
+        return render_result
+
+    local_path = render_result["local_path"]
+    images = render_result.get("parts") or render_result.get("variants") or [{"local_path": local_path}]
+    paths = [part["local_path"] for part in images]
+    publisher = None
+    if conversation_id is not None:
+        hold_images(conversation_id, paths)
+        publisher = get_image_publisher()
+    urls = []
+    upload_started = time.perf_counter()
+    try:
+        for part in images:
+            if publisher is None:
+                upload_result = upload_image(part["local_path"])
+            else:
+                url = publisher.submit(conversation_id, part["local_path"])
+                upload_result = (
+                    {"status": "success", "url": url} if url is not None
+                    else {"status": "error", "error": f"File not found: {part['local_path']}"}
+                )
+            if upload_result["status"] != "success":
+                return {
+                    "status": "error",
+                    "error": upload_result.get("error", "Upload failed"),
+                    "local_path": part["local_path"],
+                }
+            urls.append(upload_result["url"])
+    finally:
+        if conversation_id is None:
+            discard_images(paths)
+    upload_ms = round((time.perf_counter() - upload_started) * 1000, 1)
+
+    result = {
+        "status": "success",
+        "image_url": urls[0],
+        "local_path": local_path,
+        "width": render_result["width"],
+        "height": render_result["height"],
+        "format": render_result.get("format", "png"),
+        "file_size": render_result.get("file_size"),
+        "encode_ms": render_result.get("encode_ms", 0),
+        "queue_ms": render_result.get("queue_ms", 0),
+    }
+    if "timings" in render_result:
+        result["timings"] = {**render_result["timings"], "upload": upload_ms}
+        result["counters"] = render_result.get("counters", {})
+    if render_result.get("preflight"):
+        result["preflight"] = render_result["preflight"]
+    if render_result.get("truncated"):
+        result["truncated"] = True
+        result["page_height"] = render_result["page_height"]
+    if render_result.get("parts"):
+        result["page_height"] = render_result["page_height"]
+        result["parts"] = [
+            {**part, "image_url": url} for part, url in zip(render_result["parts"], urls)
+        ]
+    if render_result.get("variants"):
+        result["variants"] = [
+            {**variant, "image_url": url} for variant, url in zip(render_result["variants"], urls)
+        ]
+    result.update(extra)
+    return result
+
+
+def _dump_result(result: dict) -> str:
+    if result["status"] != "success":
+        return json.dumps(result, ensure_ascii=False)
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def _pair_variants(html_codes: list[str], widths: list[int] | None) -> tuple[list[tuple[str, int]], dict | None]:
+    """Build (html, width) batch jobs. Returns (jobs, error_dict_or_None)."""
+    widths = widths or [1200]
+    if not html_codes:
+        return [], {"status": "error", "error": "html_codes must contain at least one HTML document"}
+    if len(html_codes) == 1:
+        jobs = [(html_codes[0], width) for width in widths]
+    elif len(widths) == 1:
+        jobs = [(html_code, widths[0]) for html_code in html_codes]
+    elif len(widths) == len(html_codes):
+        jobs = list(zip(html_codes, widths))
+    else:
+        return [], {
+            "status": "error",
+            "error": "widths must have one entry, or as many entries as html_codes",
+        }
+
+    max_items = get_settings().render_batch_max_items
+    if len(jobs) > max_items:
+        return [], {"status": "error", "error": f"Too many variants ({len(jobs)}), at most {max_items} per call"}
+    return jobs, None
+
+
+def _batch_result(jobs: list[tuple[str, int]], items: list[dict]) -> dict:
+    """Combine per-variant tool results; status is success / partial / error."""
+    succeeded = sum(1 for item in items if item["status"] == "success")
+    if succeeded == len(items):
+        status = "success"
+    elif succeeded:
+        status = "partial"
+    else:
+        status = "error"
+    return {
+        "status": status,
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": [
+            {"index": index, "viewport_width": width, **item}
+            for index, ((_, width), item) in enumerate(zip(jobs, items))
+        ],
+    }
+
+
+def _read_vfs_html(file_path: str, runtime: ToolRuntime | None) -> tuple[str, dict | None]:
+    """Load HTML from the virtual filesystem. Returns (html, error_dict_or_None)."""
+    if runtime is None:
+        return "", {"status": "error", "error": "Tool runtime is missing"}
+
+    if not file_path.startswith("/"):
+        return "", {"status": "error", "error": "file_path must be an absolute virtual path"}
+
+    files = runtime.state.get("files", {})
+    file_data = files.get(file_path)
+    if file_data is None:
+        return "", {"status": "error", "error": f"Virtual file not found: {file_path}"}
+
+    lines = file_data.get("content", [])
+    html_code = "\n".join(lines).strip()
+    if not html_code:
+        return "", {"status": "error", "error": f"Virtual file is empty: {file_path}"}
+
+    return html_code, None
+
+
+def _conversation_id(runtime: ToolRuntime | None) -> str | None:
+    """LangGraph thread_id (= conversation_id) of the current agent run, if any."""
+    config = getattr(runtime, "config", None) or {}
+    return config.get("configurable", {}).get("thread_id")
+
+
+def _live_conversation(runtime: ToolRuntime | None) -> str | None:
+    """Conversation whose VFS renders should keep a live page, or None."""
+    if not get_settings().render_live_pages:
+        return None
+    return _conversation_id(runtime)
+
+
 @tool
-def generate_html_image(html_code: str, width: int = 1200) -> str:
+def generate_html_image(
+    html_code: str,
+    width: int = 1200,
+    output_format: str = "",
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
+    runtime: ToolRuntime = None,
+) -> str:
     """将 HTML 代码渲染为图片。
 
     适用于：表格、数据展示、复杂排版、仪表盘、卡片、信息图、ECharts 图表等。
@@ -28,40 +221,63 @@ def generate_html_image(html_code: str, width: int = 1200) -> str:
     参数:
         html_code: 完整的 HTML 代码（包含 <!DOCTYPE html> 或 <html> 标签）
         width: 视口宽度（像素），默认 1200
+        output_format: 输出格式，可选 png / png_optimized / png_quantized / webp / jpeg，
+            留空使用服务默认配置
+        scales: 设备像素比列表（如 [1, 2] 同时输出普通图与高清图），默认 [1]
+        thumbnails: 缩略图宽度列表（像素，如 [320]），默认不生成
 
     返回:
-        JSON 字符串：包含 status, image_url, local_path, width, height
+        JSON 字符串：包含 status, image_url, local_path, width, height, format, file_size,
+        timings（各阶段耗时 ms）, counters；
+        超长页面会被截断（truncated, page_height）或拆分为多张图片（parts）；
+        请求多分辨率时 variants 列出每个版本的 local_path 与 image_url
     """
     try:
         logger.info("[Tool:generate_html_image] Rendering, viewport_width=%d", width)
 
-        render_result = render_html_to_image(html_code, viewport_width=width)
-        if render_result["status"] != "success":
-            return json.dumps(render_result, ensure_ascii=False)
-
-        local_path = render_result["local_path"]
-
-        upload_result = upload_image(local_path)
-        if upload_result["status"] != "success":
-            return json.dumps({
-                "status": "error",
-                "error": upload_result.get("error", "Upload failed"),
-                "local_path": local_path,
-            }, ensure_ascii=False)
-
-        result = {
-            "status": "success",
-            "image_url": upload_result["url"],
-            "local_path": local_path,
-            "width": render_result["width"],
-            "height": render_result["height"],
-        }
+        render_result = render_html_to_image(
+            html_code, viewport_width=width, output_format=output_format,
+            scales=scales, thumbnails=thumbnails,
+        )
+        result = _publish_render(render_result, _conversation_id(runtime))
+        if result["status"] == "success":
+            logger.info(
+                "[Tool:generate_html_image] Done: %s (%dx%d)",
+                result["image_url"], result["width"], result["height"],
+            )
+        return _dump_result(result)
 
-        logger.info(
-            "[Tool:generate_html_image] Done: %s (%dx%d)",
-            result["image_url"], result["width"], result["height"],
+    except Exception as e:
+        logger.error("[Tool:generate_html_image] Error: %s", e, exc_info=True)
+        return json.dumps({
+            "status": "error",
+            "error": f"HTML image generation failed: {e}"
+        }, ensure_ascii=False)
+
+
+async def _agenerate_html_image(
+    html_code: str,
+    width: int = 1200,
+    output_format: str = "",
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
+    runtime: ToolRuntime = None,
+) -> str:
+    """Async implementation of generate_html_image."""
+    try:
+        logger.info("[Tool:generate_html_image] Rendering (async), viewport_width=%d", width)
+
+        render_result = await render_html_to_image_async(
+            html_code, viewport_width=width, output_format=output_format,
+            scales=scales, thumbnails=thumbnails,
         )
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        result = await asyncio.to_thread(_publish_render, render_result, _conversation_id(runtime))
+        if result["status"] == "success":
+            logger.info(
+                "[Tool:generate_html_image] Done: %s (%dx%d)",
+                result["image_url"], result["width"], result["height"],
+            )
+        return _dump_result(result)
 
     except Exception as e:
         logger.error("[Tool:generate_html_image] Error: %s", e, exc_info=True)
@@ -71,10 +287,16 @@ def generate_html_image(html_code: str, width: int = 1200) -> str:
         }, ensure_ascii=False)
 
 
+generate_html_image.coroutine = _agenerate_html_image
+
+
 @tool
 def generate_html_image_from_vfs(
     file_path: str,
     width: int = 1200,
+    output_format: str = "",
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
     runtime: ToolRuntime = None,
 ) -> str:
     """从虚拟文件系统中的 HTML 文件渲染图片。
@@ -85,69 +307,243 @@ def generate_html_image_from_vfs(
     参数:
         file_path: 虚拟文件系统中的绝对路径（例如 /workspace/design.html）
         width: 视口宽度（像素），默认 1200
+        output_format: 输出格式，可选 png / png_optimized / png_quantized / webp / jpeg，
+            留空使用服务默认配置
+        scales: 设备像素比列表（如 [1, 2] 同时输出普通图与高清图），默认 [1]
+        thumbnails: 缩略图宽度列表（像素，如 [320]），默认不生成
 
     返回:
-        JSON 字符串：包含 status, image_url, local_path, width, height, source_file
+        JSON 字符串：包含 status, image_url, local_path, width, height, format, file_size, source_file,
+        timings（各阶段耗时 ms）, counters；
+        超长页面会被截断（truncated, page_height）或拆分为多张图片（parts）；
+        请求多分辨率时 variants 列出每个版本的 local_path 与 image_url
     """
     try:
-        if runtime is None:
-            return json.dumps(
-                {"status": "error", "error": "Tool runtime is missing"},
-                ensure_ascii=False,
-            )
+        html_code, error = _read_vfs_html(file_path, runtime)
+        if error is not None:
+            return json.dumps(error, ensure_ascii=False)
 
-        if not file_path.startswith("/"):
-            return json.dumps(
-                {"status": "error", "error": "file_path must be an absolute virtual path"},
-                ensure_ascii=False,
-            )
+        logger.info(
+            "[Tool:generate_html_image_from_vfs] Rendering from virtual file=%s, viewport_width=%d",
+            file_path, width,
+        )
 
-        files = runtime.state.get("files", {})
-        file_data = files.get(file_path)
-        if file_data is None:
-            return json.dumps(
-                {"status": "error", "error": f"Virtual file not found: {file_path}"},
-                ensure_ascii=False,
+        conversation_id = _live_conversation(runtime)
+        if conversation_id is not None:
+            render_result = render_live_page(
+                conversation_id, html_code, viewport_width=width, output_format=output_format,
+                scales=scales, thumbnails=thumbnails,
             )
-
-        lines = file_data.get("content", [])
-        html_code = "\n".join(lines).strip()
-        if not html_code:
-            return json.dumps(
-                {"status": "error", "error": f"Virtual file is empty: {file_path}"},
-                ensure_ascii=False,
+        else:
+            render_result = render_html_to_image(
+                html_code, viewport_width=width, output_format=output_format,
+                scales=scales, thumbnails=thumbnails,
             )
+        return _dump_result(_publish_render(render_result, _conversation_id(runtime), source_file=file_path))
+    except Exception as e:
+        logger.error("[Tool:generate_html_image_from_vfs] Error: %s", e, exc_info=True)
+        return json.dumps(
+            {"status": "error", "error": f"VFS HTML image generation failed: {e}"},
+            ensure_ascii=False,
+        )
+
+
+async def _agenerate_html_image_from_vfs(
+    file_path: str,
+    width: int = 1200,
+    output_format: str = "",
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
+    runtime: ToolRuntime = None,
+) -> str:
+    """Async implementation of generate_html_image_from_vfs."""
+    try:
+        html_code, error = _read_vfs_html(file_path, runtime)
+        if error is not None:
+            return json.dumps(error, ensure_ascii=False)
 
         logger.info(
-            "[Tool:generate_html_image_from_vfs] Rendering from virtual file=%s, viewport_width=%d",
+            "[Tool:generate_html_image_from_vfs] Rendering (async) from virtual file=%s, viewport_width=%d",
             file_path, width,
         )
 
-        render_result = render_html_to_image(html_code, viewport_width=width)
-        if render_result["status"] != "success":
-            return json.dumps(render_result, ensure_ascii=False)
-
-        local_path = render_result["local_path"]
-        upload_result = upload_image(local_path)
-        if upload_result["status"] != "success":
-            return json.dumps({
-                "status": "error",
-                "error": upload_result.get("error", "Upload failed"),
-                "local_path": local_path,
-            }, ensure_ascii=False)
-
-        result = {
-            "status": "success",
-            "image_url": upload_result["url"],
-            "local_path": local_path,
-            "width": render_result["width"],
-            "height": render_result["height"],
-            "source_file": file_path,
-        }
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        conversation_id = _live_conversation(runtime)
+        if conversation_id is not None:
+            render_result = await render_live_page_async(
+                conversation_id, html_code, viewport_width=width, output_format=output_format,
+                scales=scales, thumbnails=thumbnails,
+            )
+        else:
+            render_result = await render_html_to_image_async(
+                html_code, viewport_width=width, output_format=output_format,
+                scales=scales, thumbnails=thumbnails,
+            )
+        result = await asyncio.to_thread(
+            _publish_render, render_result, _conversation_id(runtime), source_file=file_path,
+        )
+        return _dump_result(result)
     except Exception as e:
         logger.error("[Tool:generate_html_image_from_vfs] Error: %s", e, exc_info=True)
         return json.dumps(
             {"status": "error", "error": f"VFS HTML image generation failed: {e}"},
             ensure_ascii=False,
         )
+
+
+generate_html_image_from_vfs.coroutine = _agenerate_html_image_from_vfs
+
+
+@tool
+def generate_html_image_variants(
+    html_codes: list[str],
+    widths: list[int] | None = None,
+    output_format: str = "",
+    runtime: ToolRuntime = None,
+) -> str:
+    """批量渲染多个 HTML 变体（不同宽度、主题或候选布局），并行渲染、分别返回结果。
+
+    适用于：同一页面需要多个宽度，或需要对比多个候选设计。
+    比多次调用 generate_html_image 更快；单个变体失败不影响其他变体。
+
+    参数:
+        html_codes: HTML 代码列表；只有 1 个时，按 widths 中的每个宽度各渲染一次
+        widths: 视口宽度列表（像素），默认 [1200]；只有 1 个时用于所有 HTML，
+            否则须与 html_codes 一一对应
+        output_format: 输出格式，可选 png / png_optimized / png_quantized / webp / jpeg，
+            留空使用服务默认配置
+
+    返回:
+        JSON 字符串：包含 status(success/partial/error), succeeded, failed,
+        results[]（每项包含 index, viewport_width 以及与 generate_html_image 相同的字段）
+    """
+    try:
+        jobs, error = _pair_variants(html_codes, widths)
+        if error is not None:
+            return json.dumps(error, ensure_ascii=False)
+
+        logger.info("[Tool:generate_html_image_variants] Rendering %d variants", len(jobs))
+
+        render_results = render_html_batch(jobs, output_format=output_format)
+        conversation_id = _conversation_id(runtime)
+        result = _batch_result(jobs, [_publish_render(r, conversation_id) for r in render_results])
+        logger.info(
+            "[Tool:generate_html_image_variants] Done: %d ok, %d failed",
+            result["succeeded"], result["failed"],
+        )
+        return _dump_result(result)
+    except Exception as e:
+        logger.error("[Tool:generate_html_image_variants] Error: %s", e, exc_info=True)
+        return json.dumps(
+            {"status": "error", "error": f"Batch HTML image generation failed: {e}"},
+            ensure_ascii=False,
+        )
+
+
+async def _agenerate_html_image_variants(
+    html_codes: list[str],
+    widths: list[int] | None = None,
+    output_format: str = "",
+    runtime: ToolRuntime = None,
+) -> str:
+    """Async implementation of generate_html_image_variants."""
+    try:
+        jobs, error = _pair_variants(html_codes, widths)
+        if error is not None:
+            return json.dumps(error, ensure_ascii=False)
+
+        logger.info("[Tool:generate_html_image_variants] Rendering %d variants (async)", len(jobs))
+
+        render_results = await render_html_batch_async(jobs, output_format=output_format)
+        conversation_id = _conversation_id(runtime)
+        published = [await asyncio.to_thread(_publish_render, r, conversation_id) for r in render_results]
+        result = _batch_result(jobs, published)
+        logger.info(
+            "[Tool:generate_html_image_variants] Done: %d ok, %d failed",
+            result["succeeded"], result["failed"],
+        )
+        return _dump_result(result)
+    except Exception as e:
+        logger.error("[Tool:generate_html_image_variants] Error: %s", e, exc_info=True)
+        return json.dumps(
+            {"status": "error", "error": f"Batch HTML image generation failed: {e}"},
+            ensure_ascii=False,
+        )
+
+
+generate_html_image_variants.coroutine = _agenerate_html_image_variants
+
+
+def _patch_extra(render_result: dict) -> dict:
+    return {"patches": render_result.get("patches", []), "patch_count": render_result.get("patch_count", 0)}
+
+
+@tool
+def patch_html_image(
+    patches: list[dict],
+    runtime: ToolRuntime = None,
+) -> str:
+    """对本会话上一次 generate_html_image_from_vfs 渲染的页面做小范围修改并重新截图（无需重新加载页面）。
+
+    适用于：改颜色/字号/间距、替换文字、修改属性、更新 ECharts 配置等小改动。
+    结构性大改仍应使用 edit_file + generate_html_image_from_vfs。
+    注意：补丁只作用于实时页面，不会写回虚拟文件。
+
+    参数:
+        patches: 补丁列表，按顺序应用，每项为以下之一：
+            {"op": "css", "css": ".title { color: #c00; }"}  追加 CSS 规则
+            {"op": "text", "selector": "h1", "text": "新标题"}  替换元素文字
+            {"op": "html", "selector": "#note", "html": "<b>提示</b>"}  替换元素内部 HTML
+            {"op": "attr", "selector": "img.logo", "name": "width", "value": "80"}  设置属性（value 为 null 时删除）
+            {"op": "replace_text", "find": "旧文字", "replace": "新文字"}  全文替换文字
+            {"op": "chart", "selector": "#chart", "option": {...}, "replace": false}  合并 ECharts option
+                （selector 省略时作用于所有图表；replace 为 true 时整体替换）
+
+    返回:
+        JSON 字符串：字段与 generate_html_image_from_vfs 相同，另含 patches（每个补丁匹配数）与 patch_count；
+        error_code 为 LIVE_PAGE_NOT_FOUND 时需重新完整渲染，PATCH_NOT_APPLIED 表示有补丁未匹配（页面未改动）
+    """
+    try:
+        conversation_id = _conversation_id(runtime)
+        if conversation_id is None:
+            return json.dumps({"status": "error", "error": "Tool runtime is missing"}, ensure_ascii=False)
+
+        logger.info("[Tool:patch_html_image] Patching live page of %s (%d patches)", conversation_id, len(patches))
+
+        render_result = patch_live_page(conversation_id, patches)
+        return _dump_result(_publish_render(render_result, conversation_id, **_patch_extra(render_result)))
+    except Exception as e:
+        logger.error("[Tool:patch_html_image] Error: %s", e, exc_info=True)
+        return json.dumps(
+            {"status": "error", "error": f"Live page patch failed: {e}"},
+            ensure_ascii=False,
+        )
+
+
+async def _apatch_html_image(
+    patches: list[dict],
+    runtime: ToolRuntime = None,
+) -> str:
+    """Async implementation of patch_html_image."""
+    try:
+        conversation_id = _conversation_id(runtime)
+        if conversation_id is None:
+            return json.dumps({"status": "error", "error": "Tool runtime is missing"}, ensure_ascii=False)
+
+        logger.info(
+            "[Tool:patch_html_image] Patching live page of %s (%d patches, async)", conversation_id, len(patches),
+        )
+
+        render_result = await patch_live_page_async(conversation_id, patches)
+        result = await asyncio.to_thread(
+            _publish_render, render_result, conversation_id, **_patch_extra(render_result),
+        )
+        return _dump_result(result)
+    except Exception as e:
+        logger.error("[Tool:patch_html_image] Error: %s", e, exc_info=True)
+        return json.dumps(
+            {"status": "error", "error": f"Live page patch failed: {e}"},
+            ensure_ascii=False,
+        )
+
+
+patch_html_image.coroutine = _apatch_html_image
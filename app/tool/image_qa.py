@@ -5,16 +5,17 @@ Uses Qwen3-VL-30B vision-language model to evaluate generated images.
 Fail-open strategy: defaults to pass when the VL model is unavailable.
 """
 
-import os
 import re
 import json
 import base64
 import logging
+import mimetypes
 
 import httpx
 from langchain_core.tools import tool
 
 from ..config import get_settings
+from ..util.image_store import read_image
 
 logger = logging.getLogger(__name__)
 
@@ -36,14 +37,15 @@ def check_image_quality(image_path: str, description: str) -> str:
     settings = get_settings()
 
     try:
-        if not os.path.exists(image_path):
+        image_bytes = read_image(image_path)
+        if image_bytes is None:
             return json.dumps({
                 "status": "error",
                 "error": f"Image file not found: {image_path}"
             }, ensure_ascii=False)
 
-        with open(image_path, "rb") as f:
-            image_data = base64.b64encode(f.read()).decode("utf-8")
+        image_data = base64.b64encode(image_bytes).decode("utf-8")
+        mime_type = mimetypes.guess_type(image_path)[0] or "image/png"
 
         evaluation_prompt = f"""请评估这张图片的质量。用户的需求描述是："{description}"
 
@@ -62,7 +64,7 @@ def check_image_quality(image_path: str, description: str) -> str:
                 "content": [
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{image_data}"},
+                        "image_url": {"url": f"data:{mime_type};base64,{image_data}"},
                     },
                     {"type": "text", "text": evaluation_prompt},
                 ],
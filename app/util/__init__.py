@@ -2,10 +2,18 @@
 Utility functions: Playwright renderer and image uploader.
 """
 
-from .renderer import render_html_to_image
+from .renderer import (
+    render_html_batch,
+    render_html_batch_async,
+    render_html_to_image,
+    render_html_to_image_async,
+)
 from .uploader import upload_image
 
 __all__ = [
     "render_html_to_image",
+    "render_html_to_image_async",
+    "render_html_batch",
+    "render_html_batch_async",
     "upload_image",
 ]
@@ -0,0 +1,210 @@
+"""
+On-disk cache for whitelisted CDN assets.
+
+In enhanced_web mode every request to `render_allowed_hosts` used to go to
+the network on each render. This cache stores responses keyed by their
+exact URL, so renders are served locally. They are fast, deterministic,
+and work on air-gapped nodes once the cache has been prefetched.
+
+Layout: <render_asset_cache_dir>/<ASSET_CACHE_VERSION>/<sha256(url)>.body
+plus a .json sidecar with {url, content_type}. Bumping the version
+abandons old entries without touching them.
+
+The directory is an LRU bounded by render_asset_cache_max_mb (oldest
+mtime evicted first; each process touches an entry when it first reads
+it), so URLs fetched on first use
+cannot grow it without limit.
+
+A body is read from disk once per process and the same bytes object is
+handed to every later hit. Playwright's route.fulfill() only takes bytes and
+base64-encodes them for the browser, so a memory map would be copied on
+every hit anyway.
+
+Build-time prefetch (see prefetch_assets.py):
+    python -m app.util.prefetch_assets app/static/asset_manifest.txt
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or keying changes.
+ASSET_CACHE_VERSION = "v1"
+
+
+class AssetCache:
+    """URL-keyed on-disk asset store, LRU-bounded by bytes, with bodies kept in memory once read."""
+
+    def __init__(self, root_dir: str, max_bytes: int):
+        self.cache_dir = os.path.join(root_dir, ASSET_CACHE_VERSION)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] = OrderedDict()  # url hash -> body bytes, LRU order
+        self._total_bytes = 0
+        self._loaded = False
+        self._bodies: dict[str, tuple[bytes, str]] = {}  # url hash -> (body, content_type)
+
+    def get(self, url: str) -> tuple[bytes, str] | None:
+        """Return (body, content_type) for an exact URL, or None on a miss."""
+        key = _url_key(url)
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._bodies.get(key)
+            if entry is not None:
+                self._index.move_to_end(key)
+                return entry
+        # Not read by this process yet, or stored by another one since.
+        entry = self._read(url)
+        if entry is None:
+            return None
+        with self._lock:
+            self._add_locked(key, entry)
+        return entry
+
+    def put(self, url: str, body: bytes, content_type: str) -> None:
+        """Store a response body for `url` (atomic replace), evicting old entries over budget."""
+        key = _url_key(url)
+        body_path, meta_path = self._paths(url)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as f:
+            f.write(body)
+        os.replace(body_path + suffix, body_path)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "content_type": content_type}, f)
+        os.replace(meta_path + suffix, meta_path)
+        with self._lock:
+            self._ensure_loaded()
+            self._add_locked(key, (body, content_type))
+        logger.info("[asset_cache] Stored %s (%d bytes)", url, len(body))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._index), "bytes": self._total_bytes, "in_memory": len(self._bodies)}
+
+    def prefetch(self, urls: list[str], refresh: bool = False) -> dict:
+        """Download `urls` into the cache. Returns {fetched, skipped, failed}."""
+        import httpx
+
+        counts = {"fetched": 0, "skipped": 0, "failed": 0}
+        with httpx.Client(timeout=60.0, follow_redirects=True) as client:
+            for url in urls:
+                if not refresh and os.path.exists(self._paths(url)[0]):
+                    counts["skipped"] += 1
+                    continue
+                try:
+                    response = client.get(url)
+                    response.raise_for_status()
+                except Exception as e:
+                    logger.warning("[asset_cache] Prefetch failed for %s: %s", url, e)
+                    counts["failed"] += 1
+                    continue
+                content_type = response.headers.get("content-type", "application/octet-stream")
+                self.put(url, response.content, content_type)
+                counts["fetched"] += 1
+        return counts
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        base = os.path.join(self.cache_dir, _url_key(url))
+        return f"{base}.body", f"{base}.json"
+
+    def _read(self, url: str) -> tuple[bytes, str] | None:
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("url") != url:
+                return None
+            with open(body_path, "rb") as f:
+                body = f.read()
+            os.utime(body_path)
+            return body, meta["content_type"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _ensure_loaded(self) -> None:
+        """Build the LRU index from disk once (oldest mtime first)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".body"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        self._evict_locked()
+
+    def _add_locked(self, key: str, entry: tuple[bytes, str]) -> None:
+        self._total_bytes += len(entry[0]) - self._index.get(key, 0)
+        self._index[key] = len(entry[0])
+        self._index.move_to_end(key)
+        self._bodies[key] = entry
+        self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        # The newest entry stays even when it alone is over budget.
+        while len(self._index) > 1 and self._total_bytes > self.max_bytes:
+            key = next(iter(self._index))
+            self._total_bytes -= self._index.pop(key)
+            self._bodies.pop(key, None)
+            base = os.path.join(self.cache_dir, key)
+            for path in (f"{base}.body", f"{base}.json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            logger.debug("[asset_cache] Evicted %s", key[:12])
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def read_manifest(path: str) -> list[str]:
+    """Read a manifest file: one URL per line; '#' lines and ' #' suffixes are comments."""
+    urls = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split(" #", 1)[0].strip()
+            if line and not line.startswith("#"):
+                urls.append(line)
+    return urls
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_cache: AssetCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_asset_cache() -> AssetCache | None:
+    """Return the process-wide AssetCache, or None when disabled."""
+    global _cache
+    settings = get_settings()
+    if not settings.render_asset_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AssetCache(
+                settings.render_asset_cache_dir,
+                max_bytes=settings.render_asset_cache_max_mb * 1024 * 1024,
+            )
+        return _cache
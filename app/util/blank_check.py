@@ -0,0 +1,89 @@
+"""
+Pixel-based blank image detection.
+
+Runs on the in-memory screenshot before anything is encoded or written.
+The PNG is decoded and box-downsampled to at most _SAMPLE_SIZE px per
+side; box averaging evens out pixel-level noise (dithering, JPEG-like
+speckle) while any real content still shifts its cell's colour. Smooth
+gradients survive averaging: their far end differs from the dominant
+colour, so a gradient background counts as content and is never reported
+blank. On that small buffer we compute:
+
+- background: the most common (quantized) colour,
+- distinct_colors: number of quantized colours,
+- variance: luminance variance,
+- content_bbox: bounding box of pixels that differ from the background
+  by more than _BACKGROUND_TOLERANCE, scaled back to screenshot pixels.
+
+The image is blank when fewer than _MIN_CONTENT_PIXELS sample pixels
+differ from the background. Small but legitimate images therefore pass,
+while large noisy-but-empty backgrounds fail.
+"""
+
+import io
+
+_SAMPLE_SIZE = 256
+_BACKGROUND_TOLERANCE = 24  # max channel difference still counted as background
+_MIN_CONTENT_PIXELS = 4
+_QUANTIZE_SHIFT = 4  # 16 levels per channel for background/colour counting
+
+
+def blank_check_available() -> bool:
+    """Pixel statistics need Pillow; callers fall back to a byte-size check without it."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def analyze_image(png_bytes: bytes) -> dict:
+    """
+    Compute blank-detection statistics for an encoded screenshot.
+
+    Returns:
+        dict with {blank, background, distinct_colors, variance, content_pixels,
+        content_ratio, content_bbox}.
+    """
+    from PIL import Image, ImageChops, ImageStat
+
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        full_width, full_height = image.size
+        if image.mode in ("RGBA", "LA", "P"):
+            rgba = image.convert("RGBA")
+            sample = Image.new("RGB", rgba.size, (255, 255, 255))
+            sample.paste(rgba, mask=rgba.getchannel("A"))
+        else:
+            sample = image.convert("RGB")
+    sample.thumbnail((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.Resampling.BOX)
+
+    quantized = sample.point(lambda v: (v >> _QUANTIZE_SHIFT) << _QUANTIZE_SHIFT)
+    colors = quantized.getcolors(maxcolors=sample.width * sample.height) or []
+    _, bucket = max(colors)
+    # Background = mean colour of the sample pixels in the most common bucket.
+    in_bucket = ImageChops.difference(quantized, Image.new("RGB", sample.size, bucket)).convert("L")
+    in_bucket = in_bucket.point(lambda v: 255 if v == 0 else 0)
+    background = tuple(round(v) for v in ImageStat.Stat(sample, in_bucket).mean)
+
+    # Per-pixel max channel distance from the background colour.
+    diff = ImageChops.difference(sample, Image.new("RGB", sample.size, background))
+    r, g, b = diff.split()
+    distance = ImageChops.lighter(ImageChops.lighter(r, g), b)
+    mask = distance.point(lambda v: 255 if v > _BACKGROUND_TOLERANCE else 0)
+    content_pixels = mask.histogram()[255]
+    bbox = mask.getbbox()
+
+    scale_x = full_width / sample.width
+    scale_y = full_height / sample.height
+    return {
+        "blank": content_pixels < _MIN_CONTENT_PIXELS,
+        "background": "#%02x%02x%02x" % background,
+        "distinct_colors": len(colors),
+        "variance": round(ImageStat.Stat(sample.convert("L")).var[0], 1),
+        "content_pixels": content_pixels,
+        "content_ratio": round(content_pixels / (sample.width * sample.height), 4),
+        "content_bbox": [
+            int(bbox[0] * scale_x), int(bbox[1] * scale_y),
+            int(bbox[2] * scale_x), int(bbox[3] * scale_y),
+        ] if bbox else None,
+    }
@@ -0,0 +1,399 @@
+"""
+Warm headless Chromium pool.
+
+Keeps a small number of Chromium browsers alive for the whole process so a
+render only pays for a fresh browser context + page instead of a Playwright
+driver start-up and a cold browser launch.
+
+Playwright objects are bound to the event loop that created them, while the
+agent tools run on arbitrary threadpool threads. The pool therefore owns a
+dedicated daemon thread running its own asyncio loop; callers submit render
+coroutines to it and either block on the result (run) or await it from
+their own event loop (arun).
+
+Lifecycle per browser:
+- Launched lazily (or by warm()) into one of `size` slots.
+- Health-checked on every acquire; disconnected browsers are replaced.
+- Recycled (closed and relaunched on demand) after `max_renders` renders.
+
+Pages that outlive their render job (warm ECharts pages, live pages) hold
+a PageLease on their browser. Leases count against `max_pages` like
+running renders, and a recycled browser stays open until its last lease
+is released; lease holders are told when their browser retires so they
+can let go early.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+]
+
+# A render job receives a connected Browser and returns the render result.
+RenderJob = Callable[[Any], Awaitable[Any]]
+
+
+@dataclass
+class _PooledBrowser:
+    """One warm browser occupying a pool slot."""
+    slot: int
+    browser: Any
+    active: int = 0
+    renders: int = 0
+    retiring: bool = False
+    leases: list["PageLease"] = field(default_factory=list)
+
+    @property
+    def pages(self) -> int:
+        """Pages open on this browser: running renders plus leased pages."""
+        return self.active + len(self.leases)
+
+
+@dataclass(eq=False)
+class PageLease:
+    """Page capacity held on a pooled browser by a page that outlives its render job."""
+    pooled: _PooledBrowser
+    # Awaited (once) when the browser starts retiring; should release the lease.
+    on_retire: Callable[[], Awaitable[None]] | None = None
+
+
+class BrowserPool:
+    """
+    Process-wide pool of warm Chromium browsers.
+
+    Each render gets its own isolated BrowserContext; at most `max_pages`
+    renders and leased pages share one browser at the same time.
+    """
+
+    def __init__(self, size: int = 2, max_renders: int = 200, max_pages: int = 4):
+        self.size = max(1, size)
+        self.max_renders = max(1, max_renders)
+        self.max_pages = max(1, max_pages)
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        # The members below are only touched from the pool loop.
+        self._playwright = None
+        self._cond: asyncio.Condition | None = None
+        self._slots: list[_PooledBrowser | None] = [None] * self.size
+        # Retired browsers that left their slot but still have leased pages.
+        self._draining: list[_PooledBrowser] = []
+        self._tasks: set[asyncio.Task] = set()
+        self._launches = 0
+        self._recycles = 0
+
+    # ------------------------------------------------------------------
+    # Public API (any thread)
+    # ------------------------------------------------------------------
+
+    def submit(self, job: RenderJob, acquire: bool = True) -> Future:
+        """
+        Schedule a render job on the pool loop and return a concurrent Future.
+
+        acquire=False runs the job without a browser slot (it receives None);
+        for jobs that only drive pages already covered by a PageLease.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._run_job(job, acquire), loop)
+
+    def run(self, job: RenderJob, timeout: float | None = None, acquire: bool = True) -> Any:
+        """Run a render job and block until it finishes (or `timeout` seconds pass)."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BrowserPool.run() must not be called from the pool loop")
+        future = self.submit(job, acquire)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def arun(self, job: RenderJob, timeout: float | None = None, acquire: bool = True) -> Any:
+        """Await a render job from any event loop without blocking a thread."""
+        future = asyncio.wrap_future(self.submit(job, acquire))
+        return await asyncio.wait_for(future, timeout)
+
+    def warm(self) -> Future:
+        """Launch every browser slot in the background (non-blocking)."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._warm(), loop)
+        future.add_done_callback(_log_warm_result)
+        return future
+
+    def stats(self) -> dict:
+        """Snapshot of pool state, for logging and health reporting."""
+        slots = [s for s in self._slots if s is not None]
+        return {
+            "size": self.size,
+            "browsers": len(slots),
+            "active_renders": sum(s.active for s in slots),
+            "leased_pages": sum(len(s.leases) for s in slots + self._draining),
+            "launches": self._launches,
+            "recycles": self._recycles,
+        }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Close all browsers, stop Playwright and the pool thread."""
+        with self._start_lock:
+            self._closed = True
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        except Exception as e:
+            logger.warning("[browser_pool] Shutdown did not complete cleanly: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        logger.info("[browser_pool] Closed")
+
+    # ------------------------------------------------------------------
+    # Loop thread
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+                loop.close()
+
+            thread = threading.Thread(target=_run_loop, name="lumi-browser-pool", daemon=True)
+            thread.start()
+            started.wait()
+            self._loop, self._thread = loop, thread
+            logger.info(
+                "[browser_pool] Started (size=%d, max_pages=%d, max_renders=%d)",
+                self.size, self.max_pages, self.max_renders,
+            )
+            return loop
+
+    # ------------------------------------------------------------------
+    # Page leases (pool loop only)
+    # ------------------------------------------------------------------
+
+    def lease(
+        self,
+        browser,
+        on_retire: Callable[[], Awaitable[None]] | None = None,
+        from_job: bool = False,
+    ) -> PageLease | None:
+        """
+        Reserve page capacity on `browser` for a page that outlives its render job.
+
+        At most max_pages - 1 pages per browser are leased, so renders always
+        have room. from_job: the caller is a render job on `browser` handing
+        its own page over to the lease (it is already counted as active).
+
+        Returns None when the browser is retiring, gone or full.
+        """
+        pooled = next((p for p in self._slots if p is not None and p.browser is browser), None)
+        if pooled is None or pooled.retiring or not browser.is_connected():
+            return None
+        if len(pooled.leases) >= self.max_pages - 1:
+            return None
+        if pooled.pages - (1 if from_job else 0) >= self.max_pages:
+            return None
+        lease = PageLease(pooled, on_retire)
+        pooled.leases.append(lease)
+        return lease
+
+    async def release_lease(self, lease: PageLease) -> None:
+        """Give back a lease (idempotent); closes its browser if that was retiring and idle."""
+        pooled = lease.pooled
+        if lease not in pooled.leases:
+            return
+        pooled.leases.remove(lease)
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            close_now = self._drained_locked(pooled)
+            self._cond.notify_all()
+        if close_now:
+            await self._close_browser(pooled, reason=f"recycled after {pooled.renders} renders")
+
+    # ------------------------------------------------------------------
+    # Slot management (pool loop only)
+    # ------------------------------------------------------------------
+
+    async def _run_job(self, job: RenderJob, acquire: bool = True) -> Any:
+        if not acquire:
+            return await job(None)
+        pooled = await self._acquire()
+        try:
+            return await job(pooled.browser)
+        finally:
+            await self._release(pooled)
+
+    async def _acquire(self) -> _PooledBrowser:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            while True:
+                pooled = await self._pick_locked()
+                if pooled is not None:
+                    pooled.active += 1
+                    return pooled
+                await self._cond.wait()
+
+    async def _pick_locked(self) -> _PooledBrowser | None:
+        """Pick an idle browser, else launch into a free slot, else the least busy one."""
+        candidates: list[_PooledBrowser] = []
+        free_slot: int | None = None
+        for i, pooled in enumerate(self._slots):
+            if pooled is not None and not pooled.browser.is_connected():
+                logger.warning("[browser_pool] Browser in slot %d failed health check, replacing", i)
+                self._slots[i] = pooled = None
+            if pooled is None:
+                if free_slot is None:
+                    free_slot = i
+                continue
+            if not pooled.retiring and pooled.pages < self.max_pages:
+                candidates.append(pooled)
+
+        for pooled in candidates:
+            if pooled.active == 0:
+                return pooled
+        if free_slot is not None:
+            self._slots[free_slot] = await self._launch(free_slot)
+            return self._slots[free_slot]
+        if candidates:
+            return min(candidates, key=lambda p: p.pages)
+        return None
+
+    async def _release(self, pooled: _PooledBrowser) -> None:
+        async with self._cond:
+            pooled.active -= 1
+            pooled.renders += 1
+            if pooled.renders >= self.max_renders and not pooled.retiring:
+                pooled.retiring = True
+                self._recycles += 1
+                self._notify_retiring(pooled)
+            close_now = self._drained_locked(pooled)
+            self._cond.notify_all()
+        if close_now:
+            await self._close_browser(pooled, reason=f"recycled after {pooled.renders} renders")
+
+    def _drained_locked(self, pooled: _PooledBrowser) -> bool:
+        """Free a retiring browser's slot once no render uses it; True when it can be closed."""
+        if not pooled.retiring or pooled.active:
+            return False
+        if self._slots[pooled.slot] is pooled:
+            self._slots[pooled.slot] = None
+            if pooled.leases:
+                self._draining.append(pooled)
+        if pooled.leases:
+            return False
+        if pooled in self._draining:
+            self._draining.remove(pooled)
+        return True
+
+    def _notify_retiring(self, pooled: _PooledBrowser) -> None:
+        """Ask the holders of a retiring browser's leases to let go."""
+        for lease in list(pooled.leases):
+            if lease.on_retire is not None:
+                task = asyncio.get_running_loop().create_task(lease.on_retire())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _launch(self, slot: int) -> _PooledBrowser:
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        self._launches += 1
+        logger.info("[browser_pool] Launched browser in slot %d (launches=%d)", slot, self._launches)
+        return _PooledBrowser(slot=slot, browser=browser)
+
+    async def _close_browser(self, pooled: _PooledBrowser, reason: str) -> None:
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug("[browser_pool] Browser close failed (slot %d): %s", pooled.slot, e)
+        logger.info("[browser_pool] Closed browser in slot %d (%s)", pooled.slot, reason)
+
+    async def _warm(self) -> None:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            for i, pooled in enumerate(self._slots):
+                if pooled is None or not pooled.browser.is_connected():
+                    self._slots[i] = await self._launch(i)
+
+    async def _shutdown(self) -> None:
+        for i, pooled in enumerate(self._slots):
+            if pooled is not None:
+                self._slots[i] = None
+                await self._close_browser(pooled, reason="shutdown")
+        for pooled in self._draining:
+            await self._close_browser(pooled, reason="shutdown")
+        self._draining.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+def _log_warm_result(future: Future) -> None:
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.warning("[browser_pool] Prewarm failed: %s", error)
+    else:
+        logger.info("[browser_pool] Prewarm done")
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_pool: BrowserPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide BrowserPool (created lazily from settings)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            _pool = BrowserPool(
+                size=settings.render_pool_size,
+                max_renders=settings.render_pool_max_renders,
+                max_pages=settings.render_pool_max_pages,
+            )
+        return _pool
+
+
+def shutdown_browser_pool() -> None:
+    """Close the process-wide pool if it was started. Call from lifespan shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,207 @@
+"""
+Output encoding for rendered screenshots.
+
+Chromium always hands us a full-quality PNG. This module re-encodes it into
+the configured (or per-call) output format:
+
+- png:            Chromium's PNG as-is (no re-encode).
+- png_optimized:  Lossless PNG recompression (zlib level 9 + optimize).
+- png_quantized:  256-colour palette PNG; much smaller for flat UI/charts.
+- webp:           WebP at `quality` (100 = lossless).
+- jpeg:           JPEG at `quality` (alpha flattened onto white).
+
+Multi-resolution output (device scale factors, thumbnails) is produced by
+encode_variants: one decode of the high-DPI capture, then a Lanczos
+downsample and encode per target size.
+
+Re-encoding is CPU-heavy, so it runs in a process pool
+(render_encode_workers); with 0 workers it runs in a thread instead. Other
+CPU-heavy render steps (font subsetting) share the pool via
+run_in_encode_pool.
+Pillow is optional: without it every format falls back to plain PNG.
+"""
+
+import io
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Format name -> (file extension, MIME type)
+OUTPUT_FORMATS = {
+    "png": (".png", "image/png"),
+    "png_optimized": (".png", "image/png"),
+    "png_quantized": (".png", "image/png"),
+    "webp": (".webp", "image/webp"),
+    "jpeg": (".jpg", "image/jpeg"),
+}
+
+
+def resolve_output_format(output_format: str | None) -> str:
+    """Normalize a requested format, falling back to the configured default."""
+    fmt = (output_format or get_settings().render_output_format or "png").strip().lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}")
+    if fmt != "png" and not _pillow_available():
+        logger.warning("[encoder] Pillow not installed, output format %s falls back to png", fmt)
+        return "png"
+    return fmt
+
+
+def encode_image(png_bytes: bytes, output_format: str, quality: int) -> bytes:
+    """Re-encode Chromium PNG bytes into `output_format` (runs in a worker process)."""
+    if output_format == "png":
+        return png_bytes
+
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        return _save(image, output_format, quality)
+
+
+def encode_variants(
+    png_bytes: bytes,
+    sizes: list[tuple[int, int]],
+    output_format: str,
+    quality: int,
+) -> list[bytes]:
+    """
+    Downsample one capture to each (width, height) in `sizes` and encode it
+    (runs in a worker process). A size equal to the source is encoded as-is.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        image.load()
+        encoded = []
+        for size in sizes:
+            if tuple(size) == image.size:
+                encoded.append(png_bytes if output_format == "png" else _save(image, output_format, quality))
+            else:
+                encoded.append(_save(image.resize(size, Image.Resampling.LANCZOS), output_format, quality))
+        return encoded
+
+
+def _save(image, output_format: str, quality: int) -> bytes:
+    """Encode a decoded Pillow image into `output_format`."""
+    from PIL import Image
+
+    out = io.BytesIO()
+    if output_format == "png":
+        image.save(out, format="PNG")
+    elif output_format == "png_optimized":
+        image.save(out, format="PNG", optimize=True, compress_level=9)
+    elif output_format == "png_quantized":
+        rgba = image.convert("RGBA")
+        rgba.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(out, format="PNG", optimize=True)
+    elif output_format == "webp":
+        if quality >= 100:
+            image.save(out, format="WEBP", lossless=True, method=4)
+        else:
+            image.save(out, format="WEBP", quality=quality, method=4)
+    elif output_format == "jpeg":
+        rgb = image.convert("RGBA")
+        flattened = Image.new("RGB", rgb.size, (255, 255, 255))
+        flattened.paste(rgb, mask=rgb.getchannel("A"))
+        flattened.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    return out.getvalue()
+
+
+async def encode_image_async(png_bytes: bytes, output_format: str) -> tuple[bytes, int]:
+    """Encode off the event loop. Returns (encoded bytes, encode time in ms)."""
+    if output_format == "png":
+        return png_bytes, 0
+
+    quality = get_settings().render_output_quality
+    started = time.monotonic()
+    data = await run_in_encode_pool(encode_image, png_bytes, output_format, quality)
+    return data, int((time.monotonic() - started) * 1000)
+
+
+async def encode_variants_async(
+    png_bytes: bytes,
+    sizes: list[tuple[int, int]],
+    output_format: str,
+) -> tuple[list[bytes], int]:
+    """Downsample + encode off the event loop. Returns (one blob per size, time in ms)."""
+    quality = get_settings().render_output_quality
+    started = time.monotonic()
+    data = await run_in_encode_pool(encode_variants, png_bytes, sizes, output_format, quality)
+    return data, int((time.monotonic() - started) * 1000)
+
+
+async def run_in_encode_pool(func, *args):
+    """Run `func(*args)` in the encode pool, or a thread when the pool is off or broken."""
+    executor = get_encode_executor()
+    if executor is None:
+        return await asyncio.to_thread(func, *args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool as e:
+        logger.warning("[encoder] Encode pool broken (%s), encoding in a thread", e)
+        _discard_executor(executor)
+        return await asyncio.to_thread(func, *args)
+
+
+def _pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Process-wide encode pool
+# ---------------------------------------------------------------------------
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_encode_executor() -> ProcessPoolExecutor | None:
+    """Return the shared encode process pool, or None when render_encode_workers is 0."""
+    global _executor
+    workers = get_settings().render_encode_workers
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: the API process is multi-threaded (browser pool loop,
+            # threadpool), which makes fork unsafe.
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("[encoder] Encode pool started (%d workers)", workers)
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next encode starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_encode_executor() -> None:
+    """Stop the encode pool. Call from lifespan shutdown."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,240 @@
+"""
+Local font service: subset CJK fonts per page and serve them to Chromium.
+
+Pages are told to use "Microsoft YaHei" / "SimHei" / "PingFang SC"; in the
+container those resolve through Chromium's font fallback to the multi-MB
+WQY CJK files, which every fresh browser context has to locate and load.
+With render_fonts_enabled the renderer instead:
+
+1. picks the families from render_font_map that the HTML mentions,
+2. subsets each font file to the characters of the page source plus
+   printable ASCII (subset_font, run in the encode pool),
+3. injects @font-face rules for those families pointing at FONT_URL_PREFIX
+   (web fonts shadow installed fonts of the same name), and
+4. serves the subset bytes to the page via route interception.
+
+Subsets are cached by (font file, character set) in memory and on disk
+(<render_font_cache_dir>/<key>.ttf), so repeated cards cost nothing after
+the first render. Text built at runtime from characters missing in the
+source falls back to the system fonts as before.
+
+The service is off by default: an exact-charset subset is keyed by every
+character on the page, so most new pages pay for a fresh subset of a
+multi-MB collection. Enable it only where the benchmark shows a gain.
+fontTools is optional: without it the service is off.
+"""
+
+import io
+import os
+import re
+import html
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from ..config import get_settings
+from .encoder import run_in_encode_pool
+from .page_scripts import insert_into_head
+
+logger = logging.getLogger(__name__)
+
+# Fonts are served from this (never resolved) origin by route interception.
+FONT_URL_PREFIX = "https://lumi-fonts.local/"
+# Subsets kept in memory (each is typically tens of KB).
+_MEMORY_ENTRIES = 64
+# Always included so digits/Latin produced at runtime keep the same face.
+_BASE_CHARS = "".join(chr(c) for c in range(0x20, 0x7F))
+# font-family declarations: CSS / inline styles and ECharts textStyle.fontFamily.
+_FONT_FAMILY_RE = re.compile(r"font-?family\s*[:=]\s*([^;{}<>]+)", re.IGNORECASE)
+
+
+def font_service_available() -> bool:
+    """Subsetting needs fontTools; renders use the system fonts without it."""
+    try:
+        import fontTools.subset  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parse_font_map(spec: str) -> dict[str, str]:
+    """Parse 'Family=/path/font.ttc,Other Family=/path/other.ttf' into {family: path}."""
+    fonts = {}
+    for entry in spec.split(","):
+        family, sep, path = entry.partition("=")
+        if sep and family.strip() and path.strip():
+            fonts[family.strip()] = path.strip()
+    return fonts
+
+
+def page_chars(html_content: str) -> str:
+    """Sorted characters a page can display from its source (entities decoded) plus ASCII."""
+    chars = set(html.unescape(html_content)) | set(_BASE_CHARS)
+    return "".join(sorted(c for c in chars if c.isprintable()))
+
+
+def subset_font(path: str, text: str) -> bytes:
+    """TrueType subset of font `path` (first face of a collection) covering `text`."""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    # Tables fontTools cannot subset are dropped; that is expected, not worth a warning.
+    logging.getLogger("fontTools.subset").setLevel(logging.ERROR)
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    options.hinting = False
+    options.font_number = 0
+    with TTFont(path, fontNumber=0, lazy=True) as font:
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(text=text)
+        subsetter.subset(font)
+        out = io.BytesIO()
+        font.save(out)
+    return out.getvalue()
+
+
+def inject_style(html_content: str, css: str, style_id: str = "__lumi_fonts__") -> str:
+    """Insert a <style> block at the start of <head> (or <html>), keeping any doctype first."""
+    return insert_into_head(html_content, f'<style id="{style_id}">{css}</style>')
+
+
+@dataclass
+class FontPlan:
+    """Fonts for one page: the @font-face CSS and the subset URLs it references."""
+
+    css: str
+    urls: dict[str, str]  # URL -> subset cache key
+
+
+class FontService:
+    """Per-page font subsets with a memory + disk cache keyed by glyph set."""
+
+    def __init__(self, font_map: dict[str, str], cache_dir: str):
+        self.font_map = {family: path for family, path in font_map.items() if os.path.isfile(path)}
+        for family in font_map.keys() - self.font_map.keys():
+            logger.warning("[font_service] Font file for %r not found: %s", family, font_map[family])
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+
+    def families_for(self, html_content: str) -> list[tuple[str, str]]:
+        """
+        Configured (family, path) pairs the page will actually render with.
+
+        Per font-family list (CSS, inline styles, ECharts fontFamily) only the
+        first configured family is used; later ones are fallbacks Chromium
+        never reaches for covered glyphs. Without any declaration, every
+        configured family named in the page counts.
+        """
+        configured = {family.lower(): family for family in self.font_map}
+        used: list[str] = []
+        for declaration in _FONT_FAMILY_RE.findall(html_content):
+            for name in declaration.split(","):
+                family = configured.get(name.strip().strip("'\"").strip().lower())
+                if family is not None:
+                    if family not in used:
+                        used.append(family)
+                    break
+        if not _FONT_FAMILY_RE.search(html_content):
+            lower = html_content.lower()
+            used = [family for family in self.font_map if family.lower() in lower]
+        return [(family, self.font_map[family]) for family in used]
+
+    async def prepare(self, html_content: str) -> FontPlan | None:
+        """Build (or reuse) the subsets a page needs; None when it uses no configured family."""
+        families = self.families_for(html_content)
+        if not families:
+            return None
+        text = page_chars(html_content)
+        rules, urls = [], {}
+        for family, path in families:
+            key = _subset_key(path, text)
+            await self._ensure(key, path, text)
+            url = f"{FONT_URL_PREFIX}{key}.ttf"
+            urls[url] = key
+            rules.append(
+                f'@font-face{{font-family:"{family}";src:url("{url}") format("truetype");font-display:block}}'
+            )
+        return FontPlan(css="".join(rules), urls=urls)
+
+    def get(self, key: str) -> bytes | None:
+        """Subset bytes by cache key (memory, then disk)."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"memory_entries": len(self._memory), "hits": self.hits, "builds": self.builds}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _ensure(self, key: str, path: str, text: str) -> None:
+        if self.get(key) is not None:
+            with self._lock:
+                self.hits += 1
+            return
+        data = await run_in_encode_pool(subset_font, path, text)
+        with self._lock:
+            self.builds += 1
+        self._remember(key, data)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning("[font_service] Could not persist subset %s: %s", key[:12], e)
+        logger.info(
+            "[font_service] Subset %s: %d chars, %d bytes", os.path.basename(path), len(text), len(data),
+        )
+
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > _MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.ttf")
+
+
+def _subset_key(path: str, text: str) -> str:
+    stat = os.stat(path)
+    digest = hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n{text}".encode("utf-8"))
+    return digest.hexdigest()[:40]
+
+
+_service: FontService | None = None
+_service_lock = threading.Lock()
+
+
+def get_font_service() -> FontService | None:
+    """Return the process-wide FontService, or None when disabled or fontTools is missing."""
+    global _service
+    settings = get_settings()
+    if not settings.render_fonts_enabled or not font_service_available():
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = FontService(parse_font_map(settings.render_font_map), settings.render_font_cache_dir)
+        return _service
@@ -0,0 +1,187 @@
+"""
+In-memory store for rendered images.
+
+A render used to write every image to render_output_dir, after which the
+uploader read it back to copy / SFTP it and check_image_quality read it a
+third time to base64 it. With render_in_memory on, the encoded bytes are
+kept here under their local_path instead and handed to the uploader and the
+QA tool directly; the path stays the image's identifier in tool results.
+
+- The store is an LRU bounded by render_memory_max_mb. Images evicted from
+  it (or larger than the whole budget) spill over to their local_path on
+  disk when render_spill_to_disk is on, and are dropped otherwise.
+- read_image() checks memory first and falls back to disk, so spilled
+  images, render cache hits and renders with the store disabled all read
+  the same way.
+- Images leave the store once nothing will read them again: render tools
+  hold an agent run's images under its conversation until the run ends
+  (uploads queued, QA done; see hold_images / release_images), and
+  discard them right after the upload outside a run.
+
+Each process has its own store; render workers send their images back to
+the API process with the results (see renderer.py).
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ImageStore:
+    """Byte-bounded LRU of rendered images keyed by local path, spilling to disk."""
+
+    def __init__(self, max_bytes: int, spill_to_disk: bool = True):
+        self.max_bytes = max_bytes
+        self.spill_to_disk = spill_to_disk
+        self._lock = threading.Lock()
+        self._images: OrderedDict[str, bytes] = OrderedDict()
+        self._total_bytes = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    def put(self, path: str, data: bytes) -> None:
+        """Keep `data` as the image at `path`, spilling least recently used images over budget."""
+        if len(data) > self.max_bytes:
+            self._evict(path, data)
+            return
+        evicted = []
+        with self._lock:
+            self._total_bytes += len(data) - len(self._images.get(path, b""))
+            self._images[path] = data
+            self._images.move_to_end(path)
+            while self._total_bytes > self.max_bytes:
+                old_path, old_data = self._images.popitem(last=False)
+                self._total_bytes -= len(old_data)
+                evicted.append((old_path, old_data))
+        for old_path, old_data in evicted:
+            self._evict(old_path, old_data)
+
+    def get(self, path: str) -> bytes | None:
+        """Image bytes for `path` if held in memory."""
+        with self._lock:
+            data = self._images.get(path)
+            if data is not None:
+                self._images.move_to_end(path)
+            return data
+
+    def take(self, paths: list[str]) -> dict[str, bytes]:
+        """Remove and return the in-memory images among `paths`."""
+        taken = {}
+        with self._lock:
+            for path in paths:
+                data = self._images.pop(path, None)
+                if data is not None:
+                    self._total_bytes -= len(data)
+                    taken[path] = data
+        return taken
+
+    def discard(self, paths: list[str]) -> None:
+        """Forget the in-memory images among `paths` without spilling them."""
+        self.take(paths)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "images": len(self._images),
+                "bytes": self._total_bytes,
+                "spilled": self.spilled,
+                "dropped": self.dropped,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _evict(self, path: str, data: bytes) -> None:
+        if not self.spill_to_disk:
+            with self._lock:
+                self.dropped += 1
+            logger.warning("[image_store] Dropped %s (%d bytes) over the memory budget", path, len(data))
+            return
+        try:
+            _write_file(path, data)
+        except OSError as e:
+            with self._lock:
+                self.dropped += 1
+            logger.warning("[image_store] Could not spill %s to disk: %s", path, e)
+            return
+        with self._lock:
+            self.spilled += 1
+        logger.debug("[image_store] Spilled %s (%d bytes) to disk", path, len(data))
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton and helpers
+# ---------------------------------------------------------------------------
+
+_store: ImageStore | None = None
+_store_lock = threading.Lock()
+_held: dict[str, list[str]] = {}
+
+
+def get_image_store() -> ImageStore | None:
+    """Return the process-wide ImageStore, or None when images go straight to disk."""
+    global _store
+    settings = get_settings()
+    if not settings.render_in_memory:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore(
+                max_bytes=settings.render_memory_max_mb * 1024 * 1024,
+                spill_to_disk=settings.render_spill_to_disk,
+            )
+        return _store
+
+
+def write_image(path: str, data: bytes) -> None:
+    """Store a rendered image: in memory when enabled, else at `path` on disk."""
+    store = get_image_store()
+    if store is None:
+        _write_file(path, data)
+    else:
+        store.put(path, data)
+
+
+def read_image(path: str) -> bytes | None:
+    """Bytes of a rendered image from memory or disk, or None if it does not exist."""
+    store = get_image_store()
+    if store is not None:
+        data = store.get(path)
+        if data is not None:
+            return data
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def discard_images(paths: list[str]) -> None:
+    """Drop rendered images from memory once they are uploaded and no longer read."""
+    store = get_image_store()
+    if store is not None:
+        store.discard(paths)
+
+
+def hold_images(key: str, paths: list[str]) -> None:
+    """Keep the images at `paths` in memory until release_images(key), e.g. for an agent run."""
+    with _store_lock:
+        _held.setdefault(key, []).extend(paths)
+
+
+def release_images(key: str) -> None:
+    """Drop the images held under `key` from memory."""
+    with _store_lock:
+        paths = _held.pop(key, [])
+    if paths:
+        discard_images(paths)
@@ -0,0 +1,165 @@
+"""
+Conversation-affine live pages.
+
+With render_live_pages on, the last page rendered through the VFS tool is
+kept open per conversation instead of being closed after the screenshot.
+Small follow-up edits (CSS rules, text, attributes, chart options) are
+then applied to that page in place by patch_live_page in renderer.py and
+re-captured, without the model re-emitting the file and without a reload.
+
+- Keyed by conversation_id; a new full render replaces the old page.
+- Entries expire after `ttl` seconds without use and the store holds at
+  most `max_pages` pages (least recently used evicted first).
+- Each page holds a PageLease on its pooled browser (see browser_pool.py):
+  it counts against render_pool_max_pages and keeps the browser from being
+  closed under it. When the browser starts retiring the entry is dropped
+  (after a running patch finishes); when it crashes the entry is dropped
+  too. Callers then fall back to a full render.
+
+All methods run on the browser pool loop.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LivePage:
+    """A kept-alive page and the render settings it was opened with."""
+
+    loaded: Any  # renderer._LoadedPage
+    html_content: str
+    viewport_width: int
+    output_format: str
+    scales: list[float]
+    thumbnails: list[int]
+    patches: int = 0
+    # Text added by patches (JSON of the patch ops), for font subsetting.
+    patched_text: str = ""
+    last_used: float = field(default_factory=time.monotonic)
+    # Serializes patches on one page (concurrent turns of one conversation
+    # are already locked by the API, this guards direct callers).
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Gives the page's browser capacity back; awaited once the page is closed.
+    release: Callable[[], Awaitable[None]] | None = None
+    retired: bool = False
+
+    def alive(self) -> bool:
+        return (
+            not self.retired
+            and not self.loaded.page.is_closed()
+            and self.loaded.context.browser.is_connected()
+        )
+
+
+class LivePageStore:
+    """Per-conversation live pages with TTL expiry and an LRU cap."""
+
+    def __init__(self, max_pages: int = 16, ttl: float = 600.0):
+        self.max_pages = max(1, max_pages)
+        self.ttl = ttl
+        self._pages: OrderedDict[str, LivePage] = OrderedDict()
+        self._sweeper: asyncio.Task | None = None
+        self.opened = 0
+        self.evicted = 0
+        self.expired = 0
+
+    async def put(self, key: str, live: LivePage) -> None:
+        """Keep `live` for conversation `key`, closing any page it replaces."""
+        previous = self._pages.pop(key, None)
+        if previous is not None:
+            await _close_quietly(previous)
+        self._pages[key] = live
+        self.opened += 1
+        while len(self._pages) > self.max_pages:
+            old_key, old = self._pages.popitem(last=False)
+            self.evicted += 1
+            logger.info("[live_pages] Evicting live page of %s (LRU cap %d)", old_key, self.max_pages)
+            await _close_quietly(old)
+        self._ensure_sweeper()
+
+    async def get(self, key: str) -> LivePage | None:
+        """The live page of `key` if it is still open and fresh (refreshes its TTL)."""
+        await self._sweep()
+        live = self._pages.get(key)
+        if live is None:
+            return None
+        if not live.alive():
+            del self._pages[key]
+            logger.info("[live_pages] Live page of %s is gone (browser recycled or crashed)", key)
+            await _close_quietly(live)
+            return None
+        live.last_used = time.monotonic()
+        self._pages.move_to_end(key)
+        return live
+
+    async def drop(self, key: str) -> None:
+        live = self._pages.pop(key, None)
+        if live is not None:
+            await _close_quietly(live)
+
+    async def retire(self, key: str, live: LivePage) -> None:
+        """The browser of `live` is being recycled: drop it now, or once its running patch ends."""
+        live.retired = True
+        if self._pages.get(key) is live and not live.lock.locked():
+            del self._pages[key]
+            logger.info("[live_pages] Live page of %s dropped (browser recycled)", key)
+            await _close_quietly(live)
+
+    def stats(self) -> dict:
+        return {
+            "live_pages": len(self._pages),
+            "opened": self.opened,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _sweep(self) -> None:
+        now = time.monotonic()
+        for key, live in list(self._pages.items()):
+            if now - live.last_used > self.ttl and not live.lock.locked():
+                del self._pages[key]
+                self.expired += 1
+                logger.info("[live_pages] Live page of %s expired", key)
+                await _close_quietly(live)
+
+    def _ensure_sweeper(self) -> None:
+        """Expire idle pages in the background while any are kept."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def _sweep_loop(self) -> None:
+        while self._pages:
+            await asyncio.sleep(max(1.0, self.ttl / 4))
+            await self._sweep()
+
+
+async def _close_quietly(live: LivePage) -> None:
+    try:
+        await live.loaded.context.close()
+    except Exception:
+        pass
+    if live.release is not None:
+        release, live.release = live.release, None
+        await release()
+
+
+_store: LivePageStore | None = None
+
+
+def get_live_page_store(max_pages: int, ttl: float) -> LivePageStore:
+    """Return the process-wide LivePageStore (pool loop only)."""
+    global _store
+    if _store is None:
+        _store = LivePageStore(max_pages, ttl)
+    return _store
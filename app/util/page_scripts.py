@@ -0,0 +1,349 @@
+"""
+In-page JavaScript used by the renderer.
+
+Kept separate from renderer.py so the browser-side helpers (warm pages,
+readiness probes) can share them without import cycles. preflight.py and
+font_service.py both add markup to a page with insert_into_head().
+"""
+
+import re
+
+_HEAD_RE = re.compile(r"<head\b[^>]*>|<html\b[^>]*>|<!doctype[^>]*>", re.IGNORECASE)
+
+# enhanced_web instrumentation, installed before any page script runs.
+# Wraps echarts.init (whether window.echarts is assigned before or after its
+# init function is attached, as the UMD bundle does) and counts each chart
+# instance's first 'finished' event in window.__LUMI_CHARTS__. In
+# deterministic mode (window.__LUMI_NO_ANIMATION__, see DETERMINISTIC_JS)
+# every setOption is forced to animation: false. Like the readiness probes
+# it times with the real clock (window.__LUMI_NOW__ once the page clocks are
+# frozen).
+ECHARTS_INSTRUMENT_JS = """(() => {
+    if (window.__LUMI_CHARTS__) return;
+    const now = () => (window.__LUMI_NOW__ ? window.__LUMI_NOW__() : performance.now());
+    const state = { total: 0, finished: 0, lastChange: now() };
+    window.__LUMI_CHARTS__ = state;
+
+    const track = (chart) => {
+        if (!chart || typeof chart.on !== 'function' || chart.__lumiTracked) return chart;
+        chart.__lumiTracked = true;
+        if (window.__LUMI_NO_ANIMATION__ && typeof chart.setOption === 'function') {
+            const setOption = chart.setOption;
+            chart.setOption = function (option) {
+                if (option && typeof option === 'object') {
+                    option.animation = false;
+                    const series = Array.isArray(option.series) ? option.series : [option.series];
+                    for (const item of series) {
+                        if (item && typeof item === 'object') item.animation = false;
+                    }
+                }
+                return setOption.apply(this, arguments);
+            };
+        }
+        state.total++;
+        state.lastChange = now();
+        let done = false;
+        chart.on('finished', () => {
+            if (done) return;
+            done = true;
+            state.finished++;
+            state.lastChange = now();
+        });
+        return chart;
+    };
+    const wrapInit = (init) => {
+        if (typeof init !== 'function' || init.__lumiWrapped) return init;
+        const wrapped = function () { return track(init.apply(this, arguments)); };
+        wrapped.__lumiWrapped = true;
+        return wrapped;
+    };
+    const instrument = (lib) => {
+        if (!lib || (typeof lib !== 'object' && typeof lib !== 'function') || lib.__lumiInstrumented) return;
+        try {
+            Object.defineProperty(lib, '__lumiInstrumented', { value: true });
+            let init = wrapInit(lib.init);
+            Object.defineProperty(lib, 'init', {
+                configurable: true,
+                enumerable: true,
+                get() { return init; },
+                set(value) { init = wrapInit(value); },
+            });
+        } catch (e) {
+            // Frozen or exotic module object: fall back to the manual signal.
+        }
+    };
+
+    let echartsRef = window.echarts;
+    instrument(echartsRef);
+    Object.defineProperty(window, 'echarts', {
+        configurable: true,
+        enumerable: true,
+        get() { return echartsRef; },
+        set(value) { echartsRef = value; instrument(value); },
+    });
+})()"""
+
+# Deterministic renders (render_deterministic): evaluated before the content
+# is loaded, on every page including warm ones. Turns chart animations off
+# (see ECHARTS_INSTRUMENT_JS), reseeds Math.random and freezes the page
+# clocks: new Date() / Date.now() report DETERMINISTIC_EPOCH_MS and
+# performance.now() reports 0, so the same HTML paints the same pixels on
+# every render (dates printed on a card included). The real
+# performance.now stays available to our probes as window.__LUMI_NOW__.
+DETERMINISTIC_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+DETERMINISTIC_JS = """(() => {
+    window.__LUMI_NO_ANIMATION__ = true;
+    if (!window.__LUMI_NOW__) {
+        Object.defineProperty(window, '__LUMI_NOW__', { value: performance.now.bind(performance) });
+        const RealDate = Date;
+        const epoch = %d;
+        const FrozenDate = function Date(...args) {
+            if (!new.target) return new RealDate(epoch).toString();
+            return Reflect.construct(RealDate, args.length ? args : [epoch], new.target);
+        };
+        FrozenDate.prototype = RealDate.prototype;
+        FrozenDate.now = () => epoch;
+        FrozenDate.parse = RealDate.parse;
+        FrozenDate.UTC = RealDate.UTC;
+        window.Date = FrozenDate;
+        performance.now = () => 0;
+    }
+    let seed = 0x2F6B1D3A;
+    Math.random = () => {
+        seed = (seed + 0x6D2B79F5) | 0;
+        let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+        t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+})()""" % DETERMINISTIC_EPOCH_MS
+
+# Deterministic renders: CSS animations and transitions jump to their end
+# state, and the text caret is hidden.
+DETERMINISTIC_CSS = (
+    "*,*::before,*::after{animation-delay:0s!important;animation-duration:0s!important;"
+    "animation-iteration-count:1!important;transition-delay:0s!important;"
+    "transition-duration:0s!important;caret-color:transparent!important}"
+)
+
+# enhanced_web ready predicate: the manual __LUMI_RENDER_DONE__ flag always
+# wins; otherwise all instrumented charts must have finished after load. A
+# page that has created no chart `idleMs` after load is ready as well (when
+# idleMs is set), so chart-less pages do not sit out the whole timeout.
+READY_JS = """({ autoCharts, settleMs, idleMs }) => {
+    if (window.__LUMI_RENDER_DONE__ === true) return 'signal';
+    const charts = window.__LUMI_CHARTS__;
+    if (!autoCharts || !charts || document.readyState !== 'complete') return false;
+    const now = window.__LUMI_NOW__ ? window.__LUMI_NOW__() : performance.now();
+    if (document.__lumiLoadedAt === undefined) document.__lumiLoadedAt = now;
+    if (charts.total > 0) {
+        if (charts.finished >= charts.total && now - charts.lastChange >= settleMs) return 'charts';
+    } else if (idleMs != null && now - document.__lumiLoadedAt >= idleMs) {
+        return 'no-charts';
+    }
+    return false;
+}"""
+
+# pure_css readiness probe. Resolves once web fonts are loaded, every <img>
+# is decoded and the layout box stays unchanged for `quietFrames`
+# consecutive animation frames, or when `timeoutMs` elapses.
+LAYOUT_STABLE_JS = """async ({ timeoutMs, quietFrames }) => {
+    const now = () => (window.__LUMI_NOW__ ? window.__LUMI_NOW__() : performance.now());
+    const start = now();
+    const nextFrame = () => new Promise(resolve => requestAnimationFrame(resolve));
+    const layoutBox = () => {
+        const root = document.documentElement;
+        const body = document.body;
+        const rect = body ? body.getBoundingClientRect() : { width: 0, height: 0 };
+        return [root.scrollWidth, root.scrollHeight, rect.width, rect.height].join(',');
+    };
+    const settle = (async () => {
+        if (document.fonts && document.fonts.ready) {
+            await document.fonts.ready;
+        }
+        await Promise.all(Array.from(document.images).map(
+            img => img.decode ? img.decode().catch(() => null) : null
+        ));
+        let last = layoutBox();
+        let quiet = 0;
+        while (quiet < quietFrames) {
+            await nextFrame();
+            const current = layoutBox();
+            if (current === last) {
+                quiet++;
+            } else {
+                quiet = 0;
+                last = current;
+            }
+        }
+        return 'stable';
+    })();
+    const deadline = new Promise(resolve => setTimeout(() => resolve('timeout'), timeoutMs));
+    const state = await Promise.race([settle, deadline]);
+    return { state: state, waitedMs: Math.round(now() - start) };
+}"""
+
+# Heuristic page-content probe run before the screenshot.
+CONTENT_CHECK_JS = """() => {
+    const body = document.body;
+    if (!body) return { hasContent: false, reason: 'no body element' };
+    const text = body.innerText.trim();
+    const children = body.children.length;
+    const images = document.querySelectorAll('img, svg, canvas').length;
+    const visibleElements = document.querySelectorAll('div, p, h1, h2, h3, h4, h5, h6, span, table, ul, ol, section, article, header, nav, main, footer, aside');
+    let visibleCount = 0;
+    for (const el of visibleElements) {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        if (rect.width > 0 && rect.height > 0 && style.display !== 'none' && style.visibility !== 'hidden') {
+            visibleCount++;
+        }
+    }
+    return {
+        hasContent: text.length > 0 || images > 0 || visibleCount > 2,
+        textLength: text.length,
+        childCount: children,
+        imageCount: images,
+        visibleCount: visibleCount
+    };
+}"""
+
+# Replace the current document in place (same mechanism as Playwright's
+# set_content). The Window survives document.open(), so globals evaluated
+# beforehand - e.g. ECharts on a warm page - stay available.
+REPLACE_DOCUMENT_JS = """(html) => {
+    document.open();
+    document.write(html);
+    document.close();
+}"""
+
+# Set (creating it at the start of <head> if needed) the text of a <style>
+# element; live pages use it to swap the @font-face rules after a patch.
+SET_STYLE_JS = """({ id, css }) => {
+    let style = document.getElementById(id);
+    if (!style) {
+        style = document.createElement('style');
+        style.id = id;
+        (document.head || document.documentElement).prepend(style);
+    }
+    style.textContent = css;
+}"""
+
+# Warm page self-check: ECharts evaluated and instrumented.
+ECHARTS_READY_JS = """() => !!(window.echarts && typeof window.echarts.init === 'function' && window.__LUMI_CHARTS__)"""
+
+# Live-page patching (see live_pages.py). Every patch is resolved first and
+# nothing is changed unless all of them match something, so a bad selector
+# never leaves the page half-patched. Ops:
+#   css           {css}                       append rules to a patch <style>
+#   text / html   {selector, text | html}     set textContent / innerHTML
+#   attr          {selector, name, value}     set (value null: remove) an attribute
+#   replace_text  {find, replace}             replace in every body text node
+#   chart         {selector?, option, replace?}  ECharts setOption (merge unless
+#                                             replace) on matched / all charts
+# Resolves after changed charts fire 'finished' (or `timeoutMs`), returning
+# {applied, results: [{op, matched, error?}]}.
+LIVE_PATCH_JS = """async ({ patches, timeoutMs }) => {
+    const all = (selector) => Array.from(document.querySelectorAll(selector));
+    const charts = (patch) => {
+        const lib = window.echarts;
+        if (!lib || typeof lib.getInstanceByDom !== 'function') return [];
+        const nodes = patch.selector ? all(patch.selector) : all('[_echarts_instance_]');
+        return nodes.map(el => lib.getInstanceByDom(el)).filter(Boolean);
+    };
+    const textNodes = (find) => {
+        const found = [];
+        if (!document.body || !find) return found;
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+        while (walker.nextNode()) {
+            if (walker.currentNode.nodeValue.includes(find)) found.push(walker.currentNode);
+        }
+        return found;
+    };
+
+    const targets = patches.map(patch => {
+        try {
+            switch (patch.op) {
+                case 'css': return { items: [null] };
+                case 'text': case 'html': case 'attr': return { items: all(patch.selector) };
+                case 'replace_text': return { items: textNodes(patch.find) };
+                case 'chart': return { items: charts(patch) };
+                default: return { items: [], error: 'unknown op' };
+            }
+        } catch (e) {
+            return { items: [], error: String(e) };
+        }
+    });
+    const results = patches.map((patch, i) => {
+        const result = { op: patch.op, matched: targets[i].items.length };
+        if (targets[i].error) result.error = targets[i].error;
+        return result;
+    });
+    if (results.some(r => r.matched === 0 || r.error)) return { applied: false, results };
+
+    const finished = [];
+    patches.forEach((patch, i) => {
+        for (const item of targets[i].items) {
+            if (patch.op === 'css') {
+                let style = document.getElementById('__lumi_live_patch__');
+                if (!style) {
+                    style = document.createElement('style');
+                    style.id = '__lumi_live_patch__';
+                    (document.head || document.documentElement).appendChild(style);
+                }
+                style.appendChild(document.createTextNode(patch.css + '\\n'));
+            } else if (patch.op === 'text') {
+                item.textContent = patch.text;
+            } else if (patch.op === 'html') {
+                item.innerHTML = patch.html;
+            } else if (patch.op === 'attr') {
+                if (patch.value === null || patch.value === undefined) item.removeAttribute(patch.name);
+                else item.setAttribute(patch.name, String(patch.value));
+            } else if (patch.op === 'replace_text') {
+                item.nodeValue = item.nodeValue.split(patch.find).join(patch.replace);
+            } else if (patch.op === 'chart') {
+                finished.push(new Promise(resolve => {
+                    const done = () => { item.off('finished', done); resolve(); };
+                    item.on('finished', done);
+                }));
+                item.setOption(patch.option, { notMerge: !!patch.replace });
+            }
+        }
+    });
+    if (finished.length) {
+        const deadline = new Promise(resolve => setTimeout(resolve, timeoutMs));
+        await Promise.race([Promise.all(finished), deadline]);
+    }
+    return { applied: true, results };
+}"""
+
+# Pre-flight fix for chart containers without a height (see preflight.py),
+# inserted as an inline <script> right before the first script calling
+# echarts.init. Gives containers that would be 0px tall / wide at init time
+# a default size; sized containers are left alone. Installed once per
+# window (warm pages keep it across documents).
+CHART_SIZE_GUARD_JS = """(() => {
+    const lib = window.echarts;
+    if (!lib || typeof lib.init !== 'function' || lib.__lumiSizeGuard) return;
+    lib.__lumiSizeGuard = true;
+    const init = lib.init;
+    lib.init = function (dom) {
+        if (dom && dom.style) {
+            if (dom.clientHeight === 0) dom.style.height = '400px';
+            if (dom.clientWidth === 0) dom.style.width = '100%';
+        }
+        return init.apply(this, arguments);
+    };
+})();"""
+
+
+
+def insert_into_head(html_content: str, markup: str) -> str:
+    """Insert markup at the start of <head> (or <html>) before any page script, keeping a doctype first."""
+    match = None
+    for candidate in _HEAD_RE.finditer(html_content):
+        match = candidate
+        if candidate.group(0)[1:5].lower() == "head":
+            break
+    if match is None:
+        return markup + html_content
+    return html_content[:match.end()] + markup + html_content[match.end():]
@@ -0,0 +1,37 @@
+"""
+Prefetch whitelisted CDN assets into the render asset cache.
+
+Run at image build time so renders on air-gapped nodes never touch the CDN:
+    python -m app.util.prefetch_assets app/static/asset_manifest.txt
+"""
+
+import sys
+import logging
+import argparse
+
+from ..config import get_settings
+from .asset_cache import AssetCache, read_manifest
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Prefetch CDN assets into the render asset cache")
+    parser.add_argument("manifest", help="Text file with one URL per line")
+    parser.add_argument("--cache-dir", default=None, help="Override RENDER_ASSET_CACHE_DIR")
+    parser.add_argument("--refresh", action="store_true", help="Re-download URLs already cached")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    settings = get_settings()
+    cache = AssetCache(
+        args.cache_dir or settings.render_asset_cache_dir,
+        max_bytes=settings.render_asset_cache_max_mb * 1024 * 1024,
+    )
+    counts = cache.prefetch(read_manifest(args.manifest), refresh=args.refresh)
+    logger.info("[prefetch_assets] Done into %s: %s", cache.cache_dir, counts)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Static pre-flight analysis of HTML before it is rendered.
+
+Some failures are predictable from the source alone and otherwise cost a
+full browser render plus the ready-signal timeout. analyze_html() checks
+enhanced_web pages with a handful of regex passes (no browser, no DOM) and
+either fixes an issue when that is safe or reports it:
+
+    ECHARTS_NOT_LOADED       echarts.init is called but no ECharts bundle is
+                             included -> fixed: the warm bundle URL is
+                             added to <head>
+    ECHARTS_HOST_NOT_ALLOWED the ECharts bundle comes from a host outside
+                             render_allowed_hosts -> fixed: loaded from the
+                             warm bundle URL instead
+    CHART_SIZE_MISSING       a chart container has no height in its inline
+                             style or any CSS rule naming it -> fixed: a
+                             guard gives containers that are 0px at
+                             echarts.init time a default size
+    READY_SIGNAL_MISSING     charts without __LUMI_RENDER_DONE__ while
+                             render_auto_detect_charts is off -> error
+    SCRIPT_HOST_NOT_ALLOWED  other external scripts from non-whitelisted
+                             hosts -> warning (they may not load)
+    EXTERNAL_IMAGE_BLOCKED   images render_block_external_images will
+                             block -> warning
+
+With autofix off, fixable issues are reported as warnings and the HTML is
+left unchanged. Errors stop the render with error_code PREFLIGHT_FAILED.
+"""
+
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from .page_scripts import CHART_SIZE_GUARD_JS, insert_into_head
+
+# ECharts distribution bundle file names (echarts.js, echarts.min.js,
+# echarts.common.min.js, ...).
+_ECHARTS_BUNDLE_RE = re.compile(r"echarts(\.(common|simple))?(\.min)?\.js")
+_SCRIPT_RE = re.compile(r"<script\b([^>]*)>(.*?)</script\s*>", re.IGNORECASE | re.DOTALL)
+_STYLE_BLOCK_RE = re.compile(r"<style\b[^>]*>(.*?)</style\s*>", re.IGNORECASE | re.DOTALL)
+_IMG_SRC_RE = re.compile(r"""<img\b[^>]*?\bsrc\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+_CSS_URL_RE = re.compile(r"""url\(\s*["']?([^"')\s]+)""", re.IGNORECASE)
+_CSS_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_ID_TAG_RE = re.compile(
+    r"""<[a-zA-Z][\w-]*\b[^>]*?(?<![\w-])id\s*=\s*["']?([^"'\s>]+)["']?[^>]*>""", re.IGNORECASE,
+)
+# Insertion points for markup in <head>, in order of preference.
+_ECHARTS_INIT_RE = re.compile(r"echarts\s*\.\s*init\s*\(\s*([^,)]*)([^;\n]*)")
+_DOM_LOOKUP_RE = re.compile(
+    r"""document\s*\.\s*(?:getElementById\(\s*["']([^"']+)["']|querySelector\(\s*["']#([\w-]+)["'])"""
+)
+_DOM_VAR_RE = re.compile(
+    r"""(?:const|let|var)\s+(\w+)\s*=\s*document\s*\.\s*"""
+    r"""(?:getElementById\(\s*["']([^"']+)["']|querySelector\(\s*["']#([\w-]+)["'])\s*\)"""
+)
+# Declarations that give an element a height (or let layout derive one).
+_SIZING_RE = re.compile(r"\b(height|flex|aspect-ratio|inset)\b", re.IGNORECASE)
+# Scripts that size elements themselves.
+_SCRIPT_SIZING_RE = re.compile(r"""\.style\.(height|cssText)\b|setAttribute\(\s*["']style""", re.IGNORECASE)
+_FONT_URL_RE = re.compile(r"\.(woff2?|ttf|otf|eot)([?#].*)?$", re.IGNORECASE)
+
+
+def is_echarts_bundle_url(path: str) -> bool:
+    """Does a URL path point at an ECharts distribution bundle (not any 'echarts' URL)?"""
+    return _ECHARTS_BUNDLE_RE.fullmatch(path.rsplit("/", 1)[-1]) is not None
+
+
+@dataclass
+class PreflightOptions:
+    """Renderer settings the checks depend on."""
+
+    allowed_hosts: set[str]
+    block_external_images: bool = True
+    auto_detect_charts: bool = True
+    echarts_url: str = ""  # whitelisted bundle used for fixes ("" = no bundle fixes)
+    local_echarts: bool = False  # every ECharts bundle URL is served locally
+    autofix: bool = True
+
+
+@dataclass
+class PreflightIssue:
+    code: str
+    severity: str  # error | warning | fixed
+    message: str
+
+    def to_dict(self) -> dict:
+        return {"code": self.code, "severity": self.severity, "message": self.message}
+
+
+@dataclass
+class PreflightReport:
+    """Issues found and the (possibly fixed) HTML to render."""
+
+    html: str
+    issues: list[PreflightIssue] = field(default_factory=list)
+
+    @property
+    def errors(self) -> list[PreflightIssue]:
+        return [issue for issue in self.issues if issue.severity == "error"]
+
+    def notes(self) -> list[dict]:
+        """Warnings and applied fixes, for the render result."""
+        return [issue.to_dict() for issue in self.issues if issue.severity != "error"]
+
+
+def analyze_html(html_content: str, options: PreflightOptions) -> PreflightReport:
+    """Check an enhanced_web page and apply the safe fixes allowed by `options`."""
+    report = PreflightReport(html_content)
+    scripts = [(_attr(attrs, "src"), body) for attrs, body in _SCRIPT_RE.findall(html_content)]
+    inline_js = "\n".join(body for src, body in scripts if src is None)
+    uses_charts = _ECHARTS_INIT_RE.search(inline_js) is not None
+
+    _check_echarts_bundle(report, scripts, inline_js, uses_charts, options)
+    if uses_charts:
+        _check_chart_sizes(report, inline_js, options)
+        if not options.auto_detect_charts and "__LUMI_RENDER_DONE__" not in inline_js:
+            report.issues.append(PreflightIssue(
+                "READY_SIGNAL_MISSING", "error",
+                "The page draws ECharts charts but never sets window.__LUMI_RENDER_DONE__ = true; "
+                "set it once every chart has rendered (e.g. in the chart's 'finished' event).",
+            ))
+    _check_external_scripts(report, scripts, options)
+    _check_external_images(report, html_content, options)
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+def _check_echarts_bundle(
+    report: PreflightReport,
+    scripts: list[tuple[str | None, str]],
+    inline_js: str,
+    uses_charts: bool,
+    options: PreflightOptions,
+) -> None:
+    bundles = [src for src, _ in scripts if src and is_echarts_bundle_url(urlparse(src).path)]
+    can_fix = options.autofix and bool(options.echarts_url)
+
+    if uses_charts and not bundles and not re.search(r"\bimport\b[^;\n]*echarts", inline_js):
+        if can_fix:
+            tag = f'<script src="{options.echarts_url}"></script>'
+            report.html = insert_into_head(report.html, tag)
+            report.issues.append(PreflightIssue(
+                "ECHARTS_NOT_LOADED", "fixed",
+                f"echarts.init is used but no ECharts bundle is included; added {options.echarts_url}.",
+            ))
+        else:
+            report.issues.append(PreflightIssue(
+                "ECHARTS_NOT_LOADED", "error",
+                "echarts.init is used but no ECharts bundle is included; add "
+                '<script src="https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"></script> to <head>.',
+            ))
+
+    if options.local_echarts:
+        return  # every bundle URL is served from the local file
+    for src in bundles:
+        host = _external_host(src)
+        if host is None or host in options.allowed_hosts:
+            continue
+        if can_fix:
+            report.html = report.html.replace(src, options.echarts_url)
+            report.issues.append(PreflightIssue(
+                "ECHARTS_HOST_NOT_ALLOWED", "fixed",
+                f"ECharts from {host} is not allowed; loaded {options.echarts_url} instead.",
+            ))
+        else:
+            report.issues.append(PreflightIssue(
+                "ECHARTS_HOST_NOT_ALLOWED", "warning",
+                f"ECharts from {host} is not in the allowed hosts and may fail to load; "
+                f"use one of: {', '.join(sorted(options.allowed_hosts))}.",
+            ))
+
+
+def _check_chart_sizes(report: PreflightReport, inline_js: str, options: PreflightOptions) -> None:
+    if _SCRIPT_SIZING_RE.search(inline_js):
+        return  # scripts size elements themselves; can't tell statically
+    variables = {match.group(1): match.group(2) or match.group(3) for match in _DOM_VAR_RE.finditer(inline_js)}
+    container_ids = []
+    for target, rest in _ECHARTS_INIT_RE.findall(inline_js):
+        if "height" in rest:
+            continue  # echarts.init(dom, theme, {height: ...})
+        lookup = _DOM_LOOKUP_RE.search(target)
+        container_id = (lookup.group(1) or lookup.group(2)) if lookup else variables.get(target.strip())
+        if container_id and container_id not in container_ids:
+            container_ids.append(container_id)
+
+    elements = {match.group(1): match.group(0) for match in _ID_TAG_RE.finditer(report.html)}
+    rules = [
+        (selector, body)
+        for css in _STYLE_BLOCK_RE.findall(report.html)
+        for selector, body in _CSS_RULE_RE.findall(css)
+    ]
+    unsized = [
+        container_id for container_id in container_ids
+        if container_id in elements and not _is_sized(container_id, elements[container_id], rules)
+    ]
+    if not unsized:
+        return
+
+    names = ", ".join(f"#{container_id}" for container_id in unsized)
+    if options.autofix:
+        report.html = _insert_before_first_chart(report.html, f"<script>{CHART_SIZE_GUARD_JS}</script>")
+        report.issues.append(PreflightIssue(
+            "CHART_SIZE_MISSING", "fixed",
+            f"Chart container(s) {names} have no height; containers that are 0px tall at init get 400px.",
+        ))
+    else:
+        report.issues.append(PreflightIssue(
+            "CHART_SIZE_MISSING", "warning",
+            f"Chart container(s) {names} have no height and may render empty; give them an explicit height.",
+        ))
+
+
+def _check_external_scripts(
+    report: PreflightReport, scripts: list[tuple[str | None, str]], options: PreflightOptions,
+) -> None:
+    hosts = []
+    for src, _ in scripts:
+        if not src or is_echarts_bundle_url(urlparse(src).path):
+            continue
+        host = _external_host(src)
+        if host is not None and host not in options.allowed_hosts and host not in hosts:
+            hosts.append(host)
+    if hosts:
+        report.issues.append(PreflightIssue(
+            "SCRIPT_HOST_NOT_ALLOWED", "warning",
+            f"Scripts from {', '.join(hosts)} are not in the allowed hosts and may fail to load; "
+            f"use one of: {', '.join(sorted(options.allowed_hosts))}, or inline the code.",
+        ))
+
+
+def _check_external_images(report: PreflightReport, html_content: str, options: PreflightOptions) -> None:
+    if not options.block_external_images:
+        return
+    css = "\n".join(_STYLE_BLOCK_RE.findall(html_content)) + "\n" + " ".join(
+        re.findall(r"""\bstyle\s*=\s*["']([^"']*url\([^"']*)["']""", html_content, re.IGNORECASE)
+    )
+    urls = _IMG_SRC_RE.findall(html_content) + [
+        url for url in _CSS_URL_RE.findall(css) if not _FONT_URL_RE.search(url)
+    ]
+    blocked = []
+    for url in urls:
+        host = _external_host(url)
+        if host is not None and host not in options.allowed_hosts and url not in blocked:
+            blocked.append(url)
+    if blocked:
+        shown = ", ".join(blocked[:3]) + (f" (+{len(blocked) - 3} more)" if len(blocked) > 3 else "")
+        report.issues.append(PreflightIssue(
+            "EXTERNAL_IMAGE_BLOCKED", "warning",
+            f"External images are blocked and will not appear: {shown}; "
+            "use inline SVG, CSS or data: URLs instead.",
+        ))
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _attr(attrs: str, name: str) -> str | None:
+    match = re.search(rf"""(?<![\w-]){name}\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", attrs, re.IGNORECASE)
+    if match is None:
+        return None
+    return next(group for group in match.groups() if group is not None)
+
+
+def _external_host(url: str) -> str | None:
+    """Host of an http(s) or protocol-relative URL, else None."""
+    if not url.startswith(("http://", "https://", "//")):
+        return None
+    return urlparse(url if not url.startswith("//") else f"https:{url}").netloc or None
+
+
+def _is_sized(container_id: str, tag: str, rules: list[tuple[str, str]]) -> bool:
+    """Inline style or a CSS rule naming the element's id / a class of it sets a size."""
+    style = _attr(tag, "style") or ""
+    if _SIZING_RE.search(style):
+        return True
+    names = [f"#{re.escape(container_id)}"] + [
+        rf"\.{re.escape(cls)}" for cls in (_attr(tag, "class") or "").split()
+    ]
+    pattern = re.compile(rf"(?:{'|'.join(names)})(?![\w-])")
+    return any(pattern.search(selector) and _SIZING_RE.search(body) for selector, body in rules)
+
+
+def _insert_before_first_chart(html_content: str, markup: str) -> str:
+    """Insert markup before the first inline script that calls echarts.init."""
+    for match in _SCRIPT_RE.finditer(html_content):
+        if _attr(match.group(1), "src") is None and _ECHARTS_INIT_RE.search(match.group(2)):
+            return html_content[:match.start()] + markup + html_content[match.start():]
+    return html_content
@@ -0,0 +1,225 @@
+"""
+Write-behind image publishing.
+
+Render tools do not need to wait for the upload to hand a URL to the
+agent: with image_publish_async on and image_api_url_base set they queue
+the upload here and return the image's URL on this API's GET
+/images/{name} route (image_api_url_base + name) at once:
+
+- The image bytes are pinned in the publisher until the upload finishes,
+  so image store eviction cannot lose them, and the route serves them from
+  there in the meantime. Afterwards it redirects to the published URL
+  (image_url_base + name, see routes.py), so the URL stays valid.
+- Background threads upload with upload_bytes(), retrying failed attempts
+  with exponential backoff.
+- Uploads are grouped by conversation; the agent service waits for the
+  conversation's uploads before it returns the final reply, so a URL
+  reaches the user only once the image is published (or the reply reports
+  the failure).
+
+Without a conversation to gate on, or without image_api_url_base, tools
+keep uploading synchronously.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from ..config import get_settings
+from .image_store import read_image
+from .uploader import api_image_url, upload_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePublisher:
+    """Background upload queue with retries and per-conversation completion tracking."""
+
+    def __init__(
+        self,
+        upload: Callable[[bytes, str], dict],
+        workers: int = 2,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        """
+        Args:
+            upload: upload(data, filename) -> {status, url} or {status, error}.
+            workers: Concurrent uploads.
+            retries: Extra attempts after a failed upload.
+            backoff: Delay before the first retry in seconds; doubles per retry.
+        """
+        self._upload = upload
+        self._retries = max(0, retries)
+        self._backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-publish")
+        self._lock = threading.Lock()
+        self._pending: dict[str, bytes] = {}
+        self._jobs: dict[str, list[tuple[str, Future]]] = {}
+        self._published = 0
+        self._failed = 0
+        self._retried = 0
+
+    def submit(self, key: str, local_path: str) -> str | None:
+        """
+        Queue the image at `local_path` for upload under `key`.
+
+        Returns its URL on the API image route (valid right away), or None
+        if the image is missing.
+        """
+        data = read_image(local_path)
+        if data is None:
+            return None
+        filename = os.path.basename(local_path)
+        with self._lock:
+            self._pending[filename] = data
+        future = self._executor.submit(self._publish, data, filename)
+        with self._lock:
+            self._jobs.setdefault(key, []).append((filename, future))
+        future.add_done_callback(lambda f: self._settle(key, filename, f))
+        return api_image_url(filename)
+
+    def pending(self, filename: str) -> bytes | None:
+        """Bytes of an image whose upload has not finished yet."""
+        with self._lock:
+            return self._pending.get(filename)
+
+    def wait(self, key: str, timeout: float) -> list[dict]:
+        """Block until the uploads queued under `key` finish; returns the failed ones."""
+        jobs = self._take_jobs(key)
+        if jobs:
+            concurrent.futures.wait([future for _, future in jobs], timeout=timeout)
+        return self._failures(jobs)
+
+    async def await_published(self, key: str, timeout: float) -> list[dict]:
+        """Async counterpart of wait()."""
+        jobs = self._take_jobs(key)
+        if jobs:
+            await asyncio.wait([asyncio.wrap_future(future) for _, future in jobs], timeout=timeout)
+        return self._failures(jobs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "published": self._published,
+                "failed": self._failed,
+                "retried": self._retried,
+            }
+
+    def close(self) -> None:
+        """Finish queued uploads and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def _publish(self, data: bytes, filename: str) -> dict:
+        try:
+            for attempt in range(self._retries + 1):
+                if attempt:
+                    time.sleep(self._backoff * 2 ** (attempt - 1))
+                    with self._lock:
+                        self._retried += 1
+                try:
+                    result = self._upload(data, filename)
+                except Exception as e:
+                    result = {"status": "error", "error": str(e)}
+                if result["status"] == "success":
+                    with self._lock:
+                        self._published += 1
+                    return result
+                logger.warning(
+                    "[publisher] Upload of %s failed (attempt %d/%d): %s",
+                    filename, attempt + 1, self._retries + 1, result.get("error"),
+                )
+            with self._lock:
+                self._failed += 1
+            return {"status": "error", "error": result.get("error", "Upload failed")}
+        finally:
+            with self._lock:
+                self._pending.pop(filename, None)
+
+    def _settle(self, key: str, filename: str, future: Future) -> None:
+        """Forget successful uploads right away; failures stay until the key is waited on."""
+        if future.cancelled() or future.exception() is not None or future.result()["status"] != "success":
+            return
+        with self._lock:
+            jobs = self._jobs.get(key)
+            if jobs is not None and (filename, future) in jobs:
+                jobs.remove((filename, future))
+                if not jobs:
+                    del self._jobs[key]
+
+    def _take_jobs(self, key: str) -> list[tuple[str, Future]]:
+        with self._lock:
+            return self._jobs.pop(key, [])
+
+    @staticmethod
+    def _failures(jobs: list[tuple[str, Future]]) -> list[dict]:
+        failures = []
+        for filename, future in jobs:
+            if not future.done():
+                error = "Publish timed out"
+            elif future.cancelled() or future.exception() is not None:
+                error = "Publish aborted"
+            elif future.result()["status"] != "success":
+                error = future.result()["error"]
+            else:
+                continue
+            failures.append({"status": "error", "error": error, "url": api_image_url(filename), "filename": filename})
+        return failures
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_publisher: ImagePublisher | None = None
+_publisher_lock = threading.Lock()
+
+
+def get_image_publisher() -> ImagePublisher | None:
+    """Return the process-wide publisher, or None when image_publish_async is off or image_api_url_base unset."""
+    global _publisher
+    settings = get_settings()
+    if not settings.image_publish_async or not settings.image_api_url_base:
+        return None
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = ImagePublisher(
+                upload_bytes,
+                workers=settings.image_publish_workers,
+                retries=settings.image_publish_retries,
+                backoff=settings.image_publish_backoff,
+            )
+        return _publisher
+
+
+def wait_published(key: str) -> list[dict]:
+    """Wait (up to image_publish_timeout) for the uploads queued under `key`; returns failures."""
+    with _publisher_lock:
+        publisher = _publisher
+    if publisher is None:
+        return []
+    return publisher.wait(key, get_settings().image_publish_timeout)
+
+
+async def await_published(key: str) -> list[dict]:
+    """Async counterpart of wait_published()."""
+    with _publisher_lock:
+        publisher = _publisher
+    if publisher is None:
+        return []
+    return await publisher.await_published(key, get_settings().image_publish_timeout)
+
+
+def shutdown_image_publisher() -> None:
+    """Finish queued uploads. Call from lifespan shutdown, before shutdown_sftp_pool."""
+    global _publisher
+    with _publisher_lock:
+        publisher, _publisher = _publisher, None
+    if publisher is not None:
+        publisher.close()
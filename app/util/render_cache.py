@@ -0,0 +1,288 @@
+"""
+Content-addressed render cache.
+
+Identical renders (same HTML, viewport width, rendering mode, output
+encoding and renderer version) are served from a previously rendered image
+instead of a new Chromium render.
+
+- Entries live on disk as <key>.img + <key>.json (width/height/format and
+  the rest of the render result, so a hit is shaped like a miss: it keeps
+  truncated / page_height and gets its own timings and counters).
+- Eviction is LRU, bounded by total bytes and entry count.
+- Concurrent identical requests collapse into one in-flight render
+  (single-flight): the first caller renders, the others wait for it.
+
+The in-flight registry uses concurrent.futures.Future so that sync callers
+(threadpool tools) and async callers (event loop) can share one flight.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from ..config import get_settings
+from .image_store import get_image_store
+from .render_metrics import RenderTimer, log_render_metrics
+
+logger = logging.getLogger(__name__)
+
+# Result fields that describe one call rather than the image; a hit sets its own.
+_CALL_FIELDS = (
+    "status", "local_path", "file_size", "cached", "encode_ms", "ready_wait_ms",
+    "queue_ms", "timings", "counters", "preflight",
+)
+
+
+def render_cache_key(
+    html_content: str,
+    viewport_width: int,
+    use_enhanced: bool,
+    version: str,
+    output_variant: str = "png",
+) -> str:
+    """Hash of everything that determines the rendered image bytes."""
+    h = hashlib.sha256()
+    h.update(f"{version}\0{viewport_width}\0{int(use_enhanced)}\0{output_variant}\0".encode("utf-8"))
+    h.update(html_content.encode("utf-8"))
+    return h.hexdigest()
+
+
+class RenderCache:
+    """On-disk LRU cache of rendered images with single-flight deduplication."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_entries: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] = OrderedDict()  # key -> image bytes, LRU order
+        self._total_bytes = 0
+        self._loaded = False
+        self._inflight: dict[str, Future] = {}
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+
+    def lookup(self, key: str, dest_path: str) -> dict | None:
+        """
+        Return a success render result for `key` with the image placed at dest_path,
+        or None on a miss.
+
+        The result replays the stored render result with this call's
+        timings (phase "cache") and counters ({"cache_hit": 1}), and is
+        logged to the render metrics like a rendered one.
+        """
+        timer = RenderTimer()
+        with self._lock:
+            self._ensure_loaded()
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+
+        image_path, meta_path = self._paths(key)
+        try:
+            with timer.phase("cache"):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                _link_or_copy(image_path, dest_path)
+                os.utime(image_path)
+                file_size = os.path.getsize(dest_path)
+        except (OSError, ValueError) as e:
+            logger.warning("[render_cache] Dropping unreadable entry %s: %s", key[:12], e)
+            with self._lock:
+                self._drop_locked(key)
+            return None
+
+        logger.info("[render_cache] Hit %s -> %s", key[:12], dest_path)
+        timer.count("cache_hit", 1)
+        result = {
+            **meta.get("result", {}),
+            "status": "success",
+            "local_path": dest_path,
+            "width": meta["width"],
+            "height": meta["height"],
+            "format": meta.get("format", "png"),
+            "file_size": file_size,
+            "encode_ms": 0,
+            "ready_wait_ms": 0,
+            "cached": True,
+            **timer.report(),
+        }
+        log_render_metrics(result)
+        return result
+
+    def store(
+        self,
+        key: str,
+        image_path: str,
+        width: int,
+        height: int,
+        output_format: str = "png",
+        result: dict | None = None,
+    ) -> None:
+        """
+        Add a rendered image (in memory or on disk) to the cache and evict old entries if over budget.
+
+        result: the render result dict; its image-describing fields
+        (truncated, page_height, ...) are replayed on hits.
+        """
+        cache_image, meta_path = self._paths(key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_image = f"{cache_image}.{threading.get_ident()}.tmp"
+        store = get_image_store()
+        data = store.get(image_path) if store is not None else None
+        if data is None:
+            _link_or_copy(image_path, tmp_image)
+        else:
+            with open(tmp_image, "wb") as f:
+                f.write(data)
+        os.replace(tmp_image, cache_image)
+        tmp_meta = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({
+                "width": width,
+                "height": height,
+                "format": output_format,
+                "result": {k: v for k, v in (result or {}).items() if k not in _CALL_FIELDS},
+            }, f)
+        os.replace(tmp_meta, meta_path)
+
+        size = os.path.getsize(cache_image)
+        with self._lock:
+            self._ensure_loaded()
+            self._total_bytes += size - self._index.get(key, 0)
+            self._index[key] = size
+            self._index.move_to_end(key)
+            self._evict_locked()
+
+    # ------------------------------------------------------------------
+    # Single-flight
+    # ------------------------------------------------------------------
+
+    def join(self, key: str) -> tuple[Future, bool]:
+        """
+        Join the in-flight render for `key`.
+
+        Returns (future, is_leader). The leader must render and call complete();
+        followers wait on the future and pass its result to follow().
+        """
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = Future()
+            self._inflight[key] = flight
+            return flight, True
+
+    def complete(self, key: str, flight: Future, result: dict) -> None:
+        """Store a successful leader result and release all followers."""
+        try:
+            # Multi-image renders (split parts, scale/thumbnail variants) are not
+            # cached; followers share the leader's files.
+            if result.get("status") == "success" and not result.get("parts") and not result.get("variants"):
+                self.store(
+                    key, result["local_path"], result["width"], result["height"],
+                    result.get("format", "png"), result,
+                )
+        except Exception as e:
+            logger.warning("[render_cache] Store failed for %s: %s", key[:12], e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set_result(result)
+
+    def follow(self, key: str, result: dict, dest_path: str) -> dict:
+        """Turn the leader's result into this follower's result."""
+        if result.get("status") != "success":
+            return result
+        cached = self.lookup(key, dest_path)
+        return cached if cached is not None else dict(result)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.img", f"{base}.json"
+
+    def _ensure_loaded(self) -> None:
+        """Build the LRU index from disk once (oldest mtime first)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".img"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        self._evict_locked()
+        logger.info(
+            "[render_cache] Loaded %d entries (%d bytes) from %s",
+            len(self._index), self._total_bytes, self.cache_dir,
+        )
+
+    def _evict_locked(self) -> None:
+        while self._index and (
+            len(self._index) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            key = next(iter(self._index))
+            self._drop_locked(key)
+            logger.debug("[render_cache] Evicted %s", key[:12])
+
+    def _drop_locked(self, key: str) -> None:
+        self._total_bytes -= self._index.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hard-link src to dst (same filesystem), falling back to a copy."""
+    try:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_cache: RenderCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache | None:
+    """Return the process-wide RenderCache, or None when caching is disabled."""
+    global _cache
+    settings = get_settings()
+    if not settings.render_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache(
+                cache_dir=settings.render_cache_dir,
+                max_bytes=settings.render_cache_max_mb * 1024 * 1024,
+                max_entries=settings.render_cache_max_entries,
+            )
+        return _cache
@@ -0,0 +1,91 @@
+"""
+Per-render phase timings and counters.
+
+Every page render carries a RenderTimer from the moment it is dispatched.
+The renderer records where the time went and what the page did, and the
+result dict gets:
+
+    "timings": {phase: ms, ..., "total": ms}
+    "counters": {name: int, ...}
+
+Phases (absent when not reached or not applicable):
+    queue          waiting for a render scheduler slot (added by the renderer)
+    cache          serving a render cache hit (the only phase of a hit)
+    acquire        waiting for a pooled browser / page slot, including browser launch
+    context        new context + page (or taking a warm page)
+    rasterize      drawing an SVG fast-lane page in process (no browser phases)
+    fonts          font subsetting (see font_service.py)
+    load           set_content / document replacement
+    patch          applying live-page patches
+    ready_wait     ready signal or layout stability wait
+    content_check  blank-page and size checks in the page
+    screenshot     capturing (and stitching) the image strips
+    blank_check    pixel statistics on the capture
+    encode         re-encoding and resizing (wall time, encode pool included)
+    store          handing the images to the image store / disk
+    upload         publishing the images (added by the tools)
+    total          dispatch to result, excluding queue and upload
+
+log_render_metrics() writes one JSON object per render to the logger
+("[render_metrics] {...}") for log-based aggregation.
+"""
+
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class RenderTimer:
+    """Accumulates phase durations (ms) and counters for one render."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the block as `name` (repeated phases add up)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def add(self, name: str, ms: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + ms
+
+    def count(self, name: str, value: int) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def report(self) -> dict:
+        """{"timings", "counters"} for a result dict; total is measured now."""
+        timings = {name: round(ms, 1) for name, ms in self.timings.items()}
+        timings["total"] = round(self.elapsed_ms(), 1)
+        return {"timings": timings, "counters": dict(self.counters)}
+
+
+def log_render_metrics(result: dict) -> None:
+    """Emit one machine-parseable line for a finished (or failed) render."""
+    if "timings" not in result:
+        return
+    record = {
+        "status": result.get("status"),
+        "error_code": result.get("error_code"),
+        "format": result.get("format"),
+        "width": result.get("width"),
+        "height": result.get("height"),
+        "file_size": result.get("file_size"),
+        "timings": result["timings"],
+        "counters": result.get("counters", {}),
+    }
+    logger.info("[render_metrics] %s", json.dumps(
+        {key: value for key, value in record.items() if value is not None},
+        separators=(",", ":"), sort_keys=True,
+    ))
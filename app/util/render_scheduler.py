@@ -0,0 +1,179 @@
+"""
+Render admission control.
+
+Every render that actually reaches a browser (cache hits and single-flight
+followers do not) must first get one of `max_concurrent` slots:
+
+- A free slot is taken immediately.
+- Otherwise the caller joins a FIFO wait queue of at most `max_queue`
+  entries and waits up to `queue_timeout` seconds for a slot.
+- A full queue or an expired wait fails fast with RenderBusy, which the
+  renderer reports as error_code RENDER_BUSY.
+
+Waiters are concurrent.futures.Future objects, so sync callers block on
+them and async callers await them (asyncio.wrap_future) with the same
+bookkeeping. A released slot is handed straight to the oldest waiter.
+
+stats() exposes the queue depth for /api/v1/health.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import asynccontextmanager, contextmanager
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class RenderBusy(Exception):
+    """No render slot became available (queue full or wait timed out)."""
+
+
+class RenderScheduler:
+    """Concurrency limit plus bounded wait queue for renders."""
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32, queue_timeout: float = 30.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: deque[Future] = deque()
+        self._admitted = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._queue_ms_total = 0.0
+        self._queue_ms_max = 0.0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one render slot for the duration of the block (blocking wait).
+
+        Yields the time spent queued in ms. Raises RenderBusy.
+        """
+        started = time.perf_counter()
+        waiter = self._enqueue()
+        if waiter is not None:
+            try:
+                waiter.result(self.queue_timeout)
+            except FutureTimeout:
+                self._abandon(waiter)
+        queue_ms = self._admit(started)
+        try:
+            yield queue_ms
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Async counterpart of slot(); waits without blocking the event loop."""
+        started = time.perf_counter()
+        waiter = self._enqueue()
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(waiter)), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._abandon(waiter)
+            except asyncio.CancelledError:
+                self._abandon(waiter, cancelled=True)
+                raise
+        queue_ms = self._admit(started)
+        try:
+            yield queue_ms
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_queue_ms": round(self._queue_ms_total / self._admitted, 1) if self._admitted else 0.0,
+                "max_queue_ms": round(self._queue_ms_max, 1),
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _enqueue(self) -> Future | None:
+        """Take a free slot (returns None) or join the queue (returns the waiter)."""
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self._rejected += 1
+                queued = len(self._waiters)
+            else:
+                waiter = Future()
+                self._waiters.append(waiter)
+                return waiter
+        logger.warning("[render_scheduler] Rejecting render: %d active, %d queued", self.max_concurrent, queued)
+        raise RenderBusy(f"Renderer busy: {self.max_concurrent} renders running and {queued} queued")
+
+    def _abandon(self, waiter: Future, cancelled: bool = False) -> None:
+        """Leave the queue after a timeout; raises RenderBusy unless the slot was granted meanwhile."""
+        with self._lock:
+            granted = waiter.done()
+            if not granted:
+                self._waiters.remove(waiter)
+                if not cancelled:
+                    self._timeouts += 1
+        if granted and cancelled:
+            self._release()
+        if not granted and not cancelled:
+            raise RenderBusy(f"Renderer busy: no render slot within {self.queue_timeout:.0f}s")
+
+    def _admit(self, started: float) -> float:
+        queue_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._admitted += 1
+            self._queue_ms_total += queue_ms
+            self._queue_ms_max = max(self._queue_ms_max, queue_ms)
+        return round(queue_ms, 1)
+
+    def _release(self) -> None:
+        """Hand the slot to the oldest waiter, or free it."""
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set_result(None)
+            else:
+                self._active -= 1
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_scheduler: RenderScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_render_scheduler() -> RenderScheduler:
+    """Return the process-wide render scheduler (created on first use)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            settings = get_settings()
+            _scheduler = RenderScheduler(
+                max_concurrent=settings.render_max_concurrent,
+                max_queue=settings.render_max_queue,
+                queue_timeout=settings.render_queue_timeout,
+            )
+        return _scheduler
@@ -0,0 +1,352 @@
+"""
+Out-of-process render workers.
+
+With render_workers > 0 every page render runs in a supervised worker
+process instead of the API process, so a Chromium hang, a leak or a crash
+only takes down one worker:
+
+- Each worker is a spawn-context process with its own BrowserPool (and
+  thus its own Playwright driver and Chromium). The API process talks to
+  it over a multiprocessing Pipe: ("render", {jobs, timeout}) in,
+  ("result", [render results]) out.
+- A worker handles one request at a time. Callers wait for an idle worker
+  (or for a free slot to start one).
+- A request that is not answered within its deadline gets the worker's
+  whole process tree (driver and Chromium included) killed with SIGKILL.
+- After max_renders requests, or once the tree's RSS passes max_rss_mb,
+  a worker is retired gracefully and replaced on demand.
+
+Render caching, single-flight dedup and uploads stay in the API process;
+only the browser work is shipped to workers (see renderer.py).
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Any
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds a new worker may take to import the app and start its browser pool.
+_START_TIMEOUT = 60
+# Extra seconds after the render timeout before the worker is killed, so the
+# worker's own timeout error normally arrives first.
+_KILL_GRACE = 5
+# Seconds a retiring worker gets to shut its browsers down cleanly.
+_STOP_TIMEOUT = 10
+
+
+class WorkerTimeout(TimeoutError):
+    """The worker missed its deadline and was killed."""
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker process died while rendering."""
+
+
+@dataclass
+class _Worker:
+    """One render worker process and its end of the IPC pipe."""
+    process: Any
+    conn: Connection
+    renders: int = 0
+
+
+class RenderWorkerPool:
+    """Supervised pool of render worker processes (one request per worker at a time)."""
+
+    def __init__(self, size: int, max_renders: int = 100, max_rss_mb: int = 1536, target=None):
+        self.size = max(1, size)
+        self.max_renders = max(1, max_renders)
+        self.max_rss_mb = max_rss_mb
+        self._target = target or _worker_main  # process entry point, takes the child pipe end
+        self._ctx = multiprocessing.get_context("spawn")
+        self._cond = threading.Condition()
+        self._idle: list[_Worker] = []
+        self._live = 0  # idle + busy + starting
+        self._closed = False
+        self._launches = 0
+        self._recycles = 0
+        self._kills = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def run(self, jobs: list[dict], timeout: float) -> Any:
+        """
+        Render `jobs` in one worker and return its reply.
+
+        Raises:
+            TimeoutError: no worker became available within `timeout`.
+            WorkerTimeout: the worker missed the deadline and was killed.
+            WorkerCrashed: the worker died mid-render.
+        """
+        worker = self._acquire(timeout)
+        healthy = False
+        try:
+            worker.conn.send(("render", {"jobs": jobs, "timeout": timeout}))
+            if not worker.conn.poll(timeout + _KILL_GRACE):
+                raise WorkerTimeout(f"Render worker {worker.process.pid} exceeded {timeout:.0f}s and was killed")
+            _, reply = worker.conn.recv()
+            worker.renders += 1
+            healthy = True
+            return reply
+        except WorkerTimeout:
+            raise
+        except (EOFError, OSError) as e:
+            raise WorkerCrashed(f"Render worker {worker.process.pid} died: {e or 'connection closed'}") from e
+        finally:
+            self._release(worker, healthy)
+
+    def warm(self) -> None:
+        """Start every worker slot in the background."""
+        def _start_one():
+            try:
+                self._release(self._acquire(_START_TIMEOUT), healthy=True)
+            except Exception as e:
+                logger.warning("[render_workers] Prewarm failed: %s", e)
+
+        for _ in range(self.size):
+            threading.Thread(target=_start_one, name="render-worker-warm", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "live": self._live,
+                "idle": len(self._idle),
+                "launches": self._launches,
+                "recycles": self._recycles,
+                "kills": self._kills,
+            }
+
+    def close(self) -> None:
+        """Stop idle workers; busy workers are stopped when they are released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in idle:
+            self._stop(worker)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _acquire(self, timeout: float) -> _Worker:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Render worker pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._live < self.size:
+                    self._live += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No render worker available within {timeout:.0f}s")
+                self._cond.wait(remaining)
+
+        try:
+            return self._start()
+        except Exception:
+            self._forget()
+            raise
+
+    def _start(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=self._target, args=(child_conn,), name="render-worker", daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _Worker(process=process, conn=parent_conn)
+        if not parent_conn.poll(_START_TIMEOUT):
+            self._kill_process(worker)
+            raise RuntimeError(f"Render worker did not start within {_START_TIMEOUT}s")
+        try:
+            parent_conn.recv()  # ("ready", pid)
+        except EOFError as e:
+            self._kill_process(worker)
+            raise RuntimeError(f"Render worker exited during start-up (exit code {process.exitcode})") from e
+        with self._cond:
+            self._launches += 1
+        logger.info("[render_workers] Worker %d started", process.pid)
+        return worker
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        if not healthy:
+            logger.warning("[render_workers] Killing worker %d", worker.process.pid)
+            self._kill_process(worker)
+            with self._cond:
+                self._kills += 1
+            self._forget()
+            return
+
+        reason = None
+        if worker.renders >= self.max_renders:
+            reason = f"{worker.renders} renders"
+        elif self.max_rss_mb > 0:
+            rss_mb = _tree_rss_mb(worker.process.pid)
+            if rss_mb > self.max_rss_mb:
+                reason = f"RSS {rss_mb:.0f}MB > {self.max_rss_mb}MB"
+
+        with self._cond:
+            if reason is None and not self._closed:
+                self._idle.append(worker)
+                self._cond.notify()
+                return
+            if reason is not None:
+                self._recycles += 1
+        if reason is not None:
+            logger.info("[render_workers] Recycling worker %d (%s)", worker.process.pid, reason)
+        self._forget()
+        threading.Thread(target=self._stop, args=(worker,), name="render-worker-stop", daemon=True).start()
+
+    def _forget(self) -> None:
+        """Free a slot so another worker can be started."""
+        with self._cond:
+            self._live -= 1
+            self._cond.notify()
+
+    def _stop(self, worker: _Worker) -> None:
+        """Ask a worker to exit cleanly, killing it if it does not."""
+        try:
+            worker.conn.send(("stop", None))
+        except OSError:
+            pass
+        worker.process.join(_STOP_TIMEOUT)
+        if worker.process.is_alive():
+            self._kill_process(worker)
+        worker.conn.close()
+
+    @staticmethod
+    def _kill_process(worker: _Worker) -> None:
+        """SIGKILL the worker and every descendant (Playwright driver, Chromium)."""
+        for pid in [worker.process.pid, *_descendants(worker.process.pid)]:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        worker.process.join(5)
+        worker.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+def _worker_main(conn: Connection) -> None:
+    """Entry point of a worker process: render requests until told to stop."""
+    # Encoding already runs outside the API process here; no nested pool.
+    os.environ["RENDER_ENCODE_WORKERS"] = "0"
+    os.environ["RENDER_WORKERS"] = "0"
+
+    settings = get_settings()
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper(), logging.INFO),
+        format="%(asctime)s - %(name)s[%(process)d] - %(levelname)s - %(message)s",
+    )
+
+    from .browser_pool import get_browser_pool, shutdown_browser_pool
+    from .renderer import render_jobs_in_process
+
+    if settings.render_pool_prewarm:
+        get_browser_pool().warm()
+    conn.send(("ready", os.getpid()))
+    try:
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except EOFError:
+                break
+            if kind == "stop":
+                break
+            conn.send(("result", render_jobs_in_process(payload["jobs"], payload["timeout"])))
+    finally:
+        shutdown_browser_pool()
+
+
+# ---------------------------------------------------------------------------
+# /proc helpers (Linux; elsewhere RSS limits are not enforced)
+# ---------------------------------------------------------------------------
+
+def _process_table() -> dict[int, tuple[int, int]]:
+    """pid -> (ppid, rss pages) for every visible process."""
+    table = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return table
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                fields = f.read().rsplit(b")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # Fields after "(comm)": state ppid ... rss is field 24 overall.
+        table[int(entry)] = (int(fields[1]), int(fields[21]))
+    return table
+
+
+def _descendants(pid: int, table: dict[int, tuple[int, int]] | None = None) -> list[int]:
+    table = _process_table() if table is None else table
+    children: dict[int, list[int]] = {}
+    for child, (parent, _) in table.items():
+        children.setdefault(parent, []).append(child)
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def _tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all its descendants, in MB."""
+    table = _process_table()
+    pages = sum(table.get(p, (0, 0))[1] for p in [pid, *_descendants(pid, table)])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_workers: RenderWorkerPool | None = None
+_workers_lock = threading.Lock()
+
+
+def get_render_workers() -> RenderWorkerPool | None:
+    """Return the process-wide worker pool, or None when rendering in-process."""
+    global _workers
+    settings = get_settings()
+    if settings.render_workers <= 0:
+        return None
+    with _workers_lock:
+        if _workers is None:
+            _workers = RenderWorkerPool(
+                size=settings.render_workers,
+                max_renders=settings.render_worker_max_renders,
+                max_rss_mb=settings.render_worker_max_rss_mb,
+            )
+        return _workers
+
+
+def shutdown_render_workers() -> None:
+    """Stop the worker pool if it was started. Call from lifespan shutdown."""
+    global _workers
+    with _workers_lock:
+        workers, _workers = _workers, None
+    if workers is not None:
+        workers.close()
@@ -1,30 +1,150 @@
 """
 Playwright rendering engine.
 
-Provides HTML code to PNG image rendering with two modes:
+Provides HTML code to image rendering (PNG, or re-encoded per
+render_output_format, see encoder.py) with two modes:
 - pure_css: No JavaScript allowed (legacy mode).
 - enhanced_web: Allows controlled JS execution (ECharts etc.) with
-  CDN whitelist, ready-signal protocol, and local bundle fallback.
+  CDN whitelist, ready-signal protocol (manual flag or automatic ECharts
+  'finished' tracking), local bundle fallback, and pre-warmed pages that
+  already have ECharts evaluated.
 
-Uses headless Chromium, Docker-compatible.
+Before an enhanced_web render, a static pre-flight pass (preflight.py)
+fixes predictable problems in the HTML or rejects it with PREFLIGHT_FAILED.
+
+While a page loads and is captured, a CDP watchdog enforces its script time
+and JS heap budgets and terminates runaway scripts with
+SCRIPT_BUDGET_EXCEEDED (see script_budget.py).
+
+Tall pages are captured in strips and capped at render_max_height by
+truncating or splitting into several images (see tiling.py).
+
+Uses headless Chromium from a warm, process-wide browser pool, Docker-compatible.
+With render_workers > 0 the browser work runs in supervised worker
+processes instead (see render_workers.py). Either way, renders are admitted
+by the render scheduler (concurrency limit + bounded queue, see
+render_scheduler.py) and fail fast with RENDER_BUSY under overload.
+
+Encoded images are kept in memory under their local_path for the uploader
+and the QA tool, spilling to render_output_dir only over budget (see
+image_store.py).
+
+With render_deterministic on, CSS animations / transitions and ECharts
+animations are switched off and Math.random is seeded before the content
+loads, so pages reach their final state at once and identical HTML gives
+byte-identical images.
+
+Pages that are a single self-contained <svg> are drawn in process without
+a browser when render_svg_fast_lane is on (see svg_fast_lane.py).
+
+Fonts named in the page (render_font_map) are subset to the page's
+characters and served locally via @font-face (see font_service.py).
+
+Live pages (render_live_page / patch_live_page): the last page rendered
+for a conversation can be kept open and edited in place with small
+patches, then captured again without a reload (see live_pages.py).
 """
 
+import io
 import os
+import re
+import json
+import time
+import struct
 import uuid
+import asyncio
 import logging
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
 from urllib.parse import urlparse
 
 from ..config import get_settings
+from .browser_pool import get_browser_pool
+from .render_cache import get_render_cache, render_cache_key
+from .render_workers import WorkerCrashed, WorkerTimeout, get_render_workers
+from .render_scheduler import RenderBusy, get_render_scheduler
+from .asset_cache import get_asset_cache
+from .warm_pages import get_warm_page_stock
+from .live_pages import LivePage, get_live_page_store
+from .image_store import get_image_store, write_image
+from .render_metrics import RenderTimer, log_render_metrics
+from .script_budget import ScriptBudgetExceeded, ScriptWatchdog, start_script_watchdog
+from .encoder import (
+    OUTPUT_FORMATS,
+    encode_image_async,
+    encode_variants_async,
+    resolve_output_format,
+    run_in_encode_pool,
+)
+from .tiling import PngStripWriter, plan_parts, plan_strips, tiling_available
+from .blank_check import analyze_image, blank_check_available
+from .font_service import FONT_URL_PREFIX, FontPlan, get_font_service, inject_style
+from .preflight import PreflightOptions, PreflightReport, analyze_html, is_echarts_bundle_url
+from .svg_fast_lane import SvgPagePlan, classify_svg_page, rasterize_svg_page, svg_fast_lane_available
+from .page_scripts import (
+    CONTENT_CHECK_JS,
+    DETERMINISTIC_CSS,
+    DETERMINISTIC_JS,
+    ECHARTS_INSTRUMENT_JS,
+    LAYOUT_STABLE_JS,
+    LIVE_PATCH_JS,
+    READY_JS,
+    REPLACE_DOCUMENT_JS,
+    SET_STYLE_JS,
+)
 
 logger = logging.getLogger(__name__)
 
-# Minimum file size (bytes) for a valid rendered image.
-# A blank 1200x800 white PNG is ~4-5KB; anything meaningful is larger.
+# Part of the render cache key: bump whenever a change to the rendering
+# pipeline alters output pixels, so stale cached images are not served.
+RENDERER_VERSION = "1"
+
+# Minimum PNG size (bytes) for a valid render when Pillow is unavailable for
+# pixel-based blank detection. A blank 1200x800 white PNG is ~4-5KB.
 _MIN_IMAGE_SIZE = 8000
 
 # Path to local ECharts bundle (fallback for air-gapped environments).
 _ECHARTS_LOCAL_PATH = os.path.join(os.path.dirname(__file__), "..", "static", "echarts.min.js")
 _echarts_local_cache: bytes | None = None
+# External <script src="..."></script> tags (for warm-page bundle stripping).
+_SCRIPT_SRC_RE = re.compile(
+    r"""<script\b[^>]*?\bsrc\s*=\s*["']([^"']+)["'][^>]*>\s*</script\s*>""",
+    re.IGNORECASE,
+)
+# Warm-page bundle key when the local ECharts bundle is in use.
+_LOCAL_BUNDLE_URL = "local:echarts.min.js"
+
+# Multi-resolution output limits (see _resolve_variants).
+_MAX_DEVICE_SCALE = 4.0
+_MIN_THUMBNAIL_WIDTH = 16
+_MAX_THUMBNAIL_WIDTH = 2048
+_MAX_VARIANTS = 8
+
+# Live-page patch ops and their required fields (see LIVE_PATCH_JS).
+_LIVE_PATCH_FIELDS = {
+    "css": ("css",),
+    "text": ("selector", "text"),
+    "html": ("selector", "html"),
+    "attr": ("selector", "name"),
+    "replace_text": ("find", "replace"),
+    "chart": ("option",),
+}
+_MAX_LIVE_PATCHES = 50
+
+# Upper bound (seconds) a caller waits for one pooled render job.
+_RENDER_JOB_TIMEOUT = 120
+
+# pure_css readiness: layout must be unchanged for this many animation frames.
+_STABLE_QUIET_FRAMES = 2
+
+# enhanced_web: once every tracked chart has finished, wait this long for
+# charts created later (e.g. from setTimeout) before declaring the page ready.
+_CHARTS_SETTLE_MS = 100
+
+# enhanced_web: a page that has created no chart this long after load is
+# ready, unless its own scripts set the __LUMI_RENDER_DONE__ signal.
+_NO_CHARTS_IDLE_MS = 1000
 
 
 def _ensure_output_dir() -> str:
@@ -49,6 +169,76 @@ def _load_local_echarts() -> bytes | None:
     return None
 
 
+async def _serve_cached_asset(route, asset_cache) -> None:
+    """Fulfil a whitelisted request from the asset cache, filling it on a miss."""
+    url = route.request.url
+    hit = asset_cache.get(url)
+    if hit is None and route.request.method == "GET":
+        try:
+            response = await route.fetch()
+            if not response.ok:
+                await route.fulfill(response=response)
+                return
+            body = await response.body()
+            content_type = response.headers.get("content-type", "application/octet-stream")
+            await asyncio.to_thread(asset_cache.put, url, body, content_type)
+            hit = (body, content_type)
+        except Exception as e:
+            logger.warning("[renderer] Asset fetch failed for %s: %s", url, e)
+
+    if hit is None:
+        await route.continue_()
+        return
+
+    body, content_type = hit
+    await route.fulfill(
+        status=200,
+        content_type=content_type,
+        body=body,
+        headers={"access-control-allow-origin": "*"},
+    )
+    logger.debug("[renderer] Served cached asset %s (%d bytes)", url, len(body))
+
+
+def _warm_echarts_bundle(settings) -> tuple[str, bytes] | None:
+    """
+    (bundle_url, bundle) evaluated on warm pages, or None if unavailable.
+
+    With render_use_local_echarts every ECharts bundle URL is served the
+    local file anyway, so warm pages carry it under _LOCAL_BUNDLE_URL;
+    otherwise they carry the asset-cached copy of render_warm_echarts_url.
+    """
+    if settings.render_use_local_echarts:
+        bundle = _load_local_echarts()
+        return (_LOCAL_BUNDLE_URL, bundle) if bundle else None
+    asset_cache = get_asset_cache()
+    hit = asset_cache.get(settings.render_warm_echarts_url) if asset_cache else None
+    return (settings.render_warm_echarts_url, hit[0]) if hit else None
+
+
+def _strip_warm_echarts_tags(html_content: str, bundle_url: str) -> str | None:
+    """
+    Remove the ECharts bundle <script src> tags a warm page already provides.
+
+    Returns None when the page loads no ECharts bundle, or one a warm page
+    cannot stand in for (another version/build), so it renders normally.
+    """
+    found = False
+    for match in _SCRIPT_SRC_RE.finditer(html_content):
+        src = match.group(1)
+        if not is_echarts_bundle_url(urlparse(src).path):
+            continue
+        if bundle_url != _LOCAL_BUNDLE_URL and src != bundle_url:
+            return None
+        found = True
+    if not found:
+        return None
+    return _SCRIPT_SRC_RE.sub(
+        lambda m: "" if is_echarts_bundle_url(urlparse(m.group(1)).path) else m.group(0),
+        html_content,
+    )
+
+
 def _detect_enhanced_content(html_content: str) -> bool:
     """Heuristic: does the HTML reference JS libraries that need enhanced mode?"""
     indicators = ["echarts", "setOption", "__LUMI_RENDER_DONE__", "<script"]
@@ -56,35 +246,808 @@ def _detect_enhanced_content(html_content: str) -> bool:
     return any(ind.lower() in lower for ind in indicators)
 
 
+def _preflight(html_content: str, prepared: dict) -> tuple[str, PreflightReport]:
+    """
+    Static checks before an enhanced_web render (see preflight.py).
+
+    Returns the HTML to render (with safe fixes applied) and the report;
+    pure_css pages and render_preflight off get an empty report.
+    """
+    settings = get_settings()
+    if not settings.render_preflight or not prepared["use_enhanced"]:
+        return html_content, PreflightReport(html_content)
+    report = analyze_html(html_content, PreflightOptions(
+        allowed_hosts={h.strip() for h in settings.render_allowed_hosts.split(",") if h.strip()},
+        block_external_images=settings.render_block_external_images,
+        auto_detect_charts=settings.render_auto_detect_charts,
+        echarts_url=settings.render_warm_echarts_url,
+        local_echarts=settings.render_use_local_echarts,
+        autofix=settings.render_preflight_autofix,
+    ))
+    for issue in report.issues:
+        logger.info("[renderer] Pre-flight %s (%s): %s", issue.code, issue.severity, issue.message)
+    return report.html, report
+
+
+def _preflight_error(report: PreflightReport) -> dict:
+    return {
+        "status": "error",
+        "error_code": "PREFLIGHT_FAILED",
+        "error": " ".join(issue.message for issue in report.errors),
+        "issues": [issue.to_dict() for issue in report.issues],
+    }
+
+
+def _with_preflight(result: dict, report: PreflightReport | None) -> dict:
+    """Attach pre-flight warnings / applied fixes to a render result."""
+    notes = report.notes() if report is not None else []
+    if notes and result.get("error_code") != "PREFLIGHT_FAILED":
+        result["preflight"] = notes
+    return result
+
+
 def render_html_to_image(
     html_content: str,
     viewport_width: int = 1200,
     enhanced: bool | None = None,
+    output_format: str | None = None,
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
 ) -> dict:
     """
-    Render HTML content to a PNG image.
+    Render HTML content to an image.
+
+    The render runs in a fresh browser context on the process-wide warm
+    browser pool (see browser_pool.py), or in a render worker process when
+    render_workers > 0 (see render_workers.py); this call blocks until it finishes.
+    Identical renders are served from the render cache (see render_cache.py)
+    and concurrent identical requests share one in-flight render.
 
     Args:
         html_content: Complete HTML code.
         viewport_width: Viewport width in pixels (default 1200).
         enhanced: Force enhanced_web mode (True/False), or None for auto-detect
                   based on config + HTML content heuristics.
+        output_format: png | png_optimized | png_quantized | webp | jpeg,
+                       or None for render_output_format (see encoder.py).
+        scales: device_scale_factor targets (default [1]); the first one is
+                stored as local_path. Layout runs once at the largest scale
+                and the others are downsampled from that capture.
+        thumbnails: Thumbnail widths in pixels (aspect ratio kept).
+
+    Returns:
+        dict with {status, local_path, width, height, format, file_size, encode_ms,
+        ready_wait_ms, queue_ms, timings, counters} (per-phase ms and page counters,
+        see render_metrics.py; a cache hit replays the stored result with cached=True
+        and only the "cache" phase timed), plus `variants`
+        (every scale/thumbnail image) when more than one image was requested and
+        `preflight` (pre-flight warnings / applied fixes, see preflight.py), or
+        {status, error, error_code} (PREFLIGHT_FAILED with `issues` when the HTML
+        fails pre-flight, RENDER_BUSY when the render queue is full,
+        SCRIPT_BUDGET_EXCEEDED when page scripts ran over their budgets).
+    """
+    prepared = _prepare_render(html_content, enhanced, output_format, scales, thumbnails)
+    if "status" in prepared:
+        return prepared
+    html_content, preflight = _preflight(html_content, prepared)
+    if preflight.errors:
+        return _preflight_error(preflight)
+    return _with_preflight(_render_cached(html_content, viewport_width, prepared), preflight)
+
+
+def _render_cached(html_content: str, viewport_width: int, prepared: dict) -> dict:
+    """One render through the render cache and single-flight dedup (when enabled)."""
+    local_path = prepared["local_path"]
+    item = _BatchItem(html_content, viewport_width, prepared=prepared)
+
+    cache = get_render_cache()
+    if cache is None:
+        return _first(_run_pages([item]))
+
+    key = render_cache_key(
+        html_content, viewport_width, prepared["use_enhanced"], RENDERER_VERSION,
+        _output_variant(prepared),
+    )
+    cached = cache.lookup(key, local_path)
+    if cached is not None:
+        return cached
+
+    flight, is_leader = cache.join(key)
+    if not is_leader:
+        logger.info("[renderer] Identical render in flight, waiting (key=%s)", key[:12])
+        try:
+            return cache.follow(key, flight.result(_RENDER_JOB_TIMEOUT), local_path)
+        except Exception as e:
+            return {"status": "error", "error": f"HTML render failed: {e}"}
+
+    result = {"status": "error", "error": "HTML render failed: interrupted"}
+    try:
+        result = _first(_run_pages([item]))
+    finally:
+        cache.complete(key, flight, result)
+    return result
+
+
+async def render_html_to_image_async(
+    html_content: str,
+    viewport_width: int = 1200,
+    enhanced: bool | None = None,
+    output_format: str | None = None,
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
+) -> dict:
+    """
+    Async counterpart of render_html_to_image.
+
+    Awaits the render on the warm browser pool without holding a worker
+    thread, so many renders can be in flight on one event loop. Arguments,
+    result dict and error codes are identical to the sync version.
+    """
+    prepared = _prepare_render(html_content, enhanced, output_format, scales, thumbnails)
+    if "status" in prepared:
+        return prepared
+    html_content, preflight = _preflight(html_content, prepared)
+    if preflight.errors:
+        return _preflight_error(preflight)
+    return _with_preflight(await _arender_cached(html_content, viewport_width, prepared), preflight)
+
+
+async def _arender_cached(html_content: str, viewport_width: int, prepared: dict) -> dict:
+    """Async counterpart of _render_cached."""
+    local_path = prepared["local_path"]
+    item = _BatchItem(html_content, viewport_width, prepared=prepared)
+
+    cache = get_render_cache()
+    if cache is None:
+        return _first(await _arun_pages([item]))
+
+    key = render_cache_key(
+        html_content, viewport_width, prepared["use_enhanced"], RENDERER_VERSION,
+        _output_variant(prepared),
+    )
+    cached = cache.lookup(key, local_path)
+    if cached is not None:
+        return cached
+
+    flight, is_leader = cache.join(key)
+    if not is_leader:
+        logger.info("[renderer] Identical render in flight, waiting (key=%s)", key[:12])
+        try:
+            leader_result = await asyncio.wait_for(asyncio.wrap_future(flight), _RENDER_JOB_TIMEOUT)
+            return cache.follow(key, leader_result, local_path)
+        except Exception as e:
+            return {"status": "error", "error": f"HTML render failed: {e}"}
+
+    result = {"status": "error", "error": "HTML render failed: interrupted"}
+    try:
+        result = _first(await _arun_pages([item]))
+    finally:
+        cache.complete(key, flight, result)
+    return result
+
+
+def render_html_batch(
+    jobs: list[tuple[str, int]],
+    enhanced: bool | None = None,
+    output_format: str | None = None,
+) -> list[dict]:
+    """
+    Render several (html, viewport_width) variants concurrently in one pooled browser.
+
+    All pages of the batch run in parallel (at most render_pool_max_pages at
+    a time) inside a single pool job, so a batch holds one browser slot
+    instead of one per variant. Every item goes through the render cache and
+    single-flight dedup like a single render, and a failing item only fails
+    its own entry.
+
+    Returns:
+        One result dict per job, in input order, shaped like render_html_to_image's.
+    """
+    items = _plan_batch(jobs, enhanced, output_format)
+    leaders = [item for item in items if item.leader]
+    results: list[dict] | dict = {"status": "error", "error": "HTML render failed: interrupted"}
+    try:
+        if leaders:
+            results = _run_pages(leaders, timeout=_batch_timeout(len(leaders)))
+    finally:
+        _finish_batch(leaders, results)
+
+    cache = get_render_cache()
+    for item in items:
+        if item.result is None:
+            try:
+                leader_result = item.flight.result(_RENDER_JOB_TIMEOUT)
+                item.result = cache.follow(item.key, leader_result, item.prepared["local_path"])
+            except Exception as e:
+                item.result = {"status": "error", "error": f"HTML render failed: {e}"}
+    return [_with_preflight(item.result, item.preflight) for item in items]
+
+
+async def render_html_batch_async(
+    jobs: list[tuple[str, int]],
+    enhanced: bool | None = None,
+    output_format: str | None = None,
+) -> list[dict]:
+    """Async counterpart of render_html_batch (same arguments and results)."""
+    items = _plan_batch(jobs, enhanced, output_format)
+    leaders = [item for item in items if item.leader]
+    results: list[dict] | dict = {"status": "error", "error": "HTML render failed: interrupted"}
+    try:
+        if leaders:
+            results = await _arun_pages(leaders, timeout=_batch_timeout(len(leaders)))
+    finally:
+        _finish_batch(leaders, results)
+
+    cache = get_render_cache()
+    for item in items:
+        if item.result is None:
+            try:
+                leader_result = await asyncio.wait_for(asyncio.wrap_future(item.flight), _RENDER_JOB_TIMEOUT)
+                item.result = cache.follow(item.key, leader_result, item.prepared["local_path"])
+            except Exception as e:
+                item.result = {"status": "error", "error": f"HTML render failed: {e}"}
+    return [_with_preflight(item.result, item.preflight) for item in items]
+
+
+def render_live_page(
+    conversation_id: str,
+    html_content: str,
+    viewport_width: int = 1200,
+    enhanced: bool | None = None,
+    output_format: str | None = None,
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
+) -> dict:
+    """
+    Render HTML like render_html_to_image and keep the page open for the conversation.
+
+    The page replaces the conversation's previous live page (see
+    live_pages.py) and is the target of later patch_live_page calls. Live
+    renders skip the render cache and always run on this process's browser
+    pool, since the page has to outlive the call; admission control still
+    applies. The kept page counts against its browser's render_pool_max_pages;
+    when the browser has no capacity left the image is still returned but no
+    live page is kept.
+
+    Returns:
+        Same result dict as render_html_to_image.
+    """
+    prepared = _prepare_render(html_content, enhanced, output_format, scales, thumbnails)
+    if "status" in prepared:
+        return prepared
+    html_content, preflight = _preflight(html_content, prepared)
+    if preflight.errors:
+        return _preflight_error(preflight)
+    job = _live_render_job(conversation_id, html_content, viewport_width, prepared)
+    return _with_preflight(_run_admitted(lambda: _run_render(job)), preflight)
+
+
+async def render_live_page_async(
+    conversation_id: str,
+    html_content: str,
+    viewport_width: int = 1200,
+    enhanced: bool | None = None,
+    output_format: str | None = None,
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
+) -> dict:
+    """Async counterpart of render_live_page (same arguments and result)."""
+    prepared = _prepare_render(html_content, enhanced, output_format, scales, thumbnails)
+    if "status" in prepared:
+        return prepared
+    html_content, preflight = _preflight(html_content, prepared)
+    if preflight.errors:
+        return _preflight_error(preflight)
+    job = _live_render_job(conversation_id, html_content, viewport_width, prepared)
+    return _with_preflight(await _arun_admitted(lambda: _arun_render(job)), preflight)
+
+
+def patch_live_page(conversation_id: str, patches: list[dict]) -> dict:
+    """
+    Apply DOM / CSS / chart patches to the conversation's live page and capture it again.
+
+    Patch ops are documented at LIVE_PATCH_JS (page_scripts.py). Nothing is
+    changed unless every patch matches something. The image uses the output
+    format, scales and thumbnails of the render that opened the page.
+
+    Returns:
+        dict like render_html_to_image's plus {patches: per-patch match counts,
+        patch_count}, or {status, error, error_code} with error_code
+        LIVE_PAGE_NOT_FOUND (expired / never opened: render the full HTML again),
+        INVALID_PATCH or PATCH_NOT_APPLIED.
+    """
+    error = _validate_patches(patches)
+    if error is not None:
+        return {"status": "error", "error_code": "INVALID_PATCH", "error": error}
+    return _run_admitted(lambda: _run_render(_live_patch_job(conversation_id, patches), acquire=False))
+
+
+async def patch_live_page_async(conversation_id: str, patches: list[dict]) -> dict:
+    """Async counterpart of patch_live_page (same arguments and result)."""
+    error = _validate_patches(patches)
+    if error is not None:
+        return {"status": "error", "error_code": "INVALID_PATCH", "error": error}
+    return await _arun_admitted(lambda: _arun_render(_live_patch_job(conversation_id, patches), acquire=False))
+
+
+def _live_store():
+    settings = get_settings()
+    return get_live_page_store(settings.render_live_page_max, settings.render_live_page_ttl)
+
+
+def _live_render_job(conversation_id: str, html_content: str, viewport_width: int, prepared: dict):
+    """Pool job rendering a page and handing it to the live page store."""
+    timer = RenderTimer()
+
+    async def _job(browser):
+        store = _live_store()
+        pool = get_browser_pool()
+
+        async def _keep(loaded: _LoadedPage) -> bool:
+            # The conversation's previous page is superseded; free its capacity first.
+            await store.drop(conversation_id)
+            live = LivePage(
+                loaded, html_content, viewport_width,
+                prepared["output_format"], prepared["scales"], prepared["thumbnails"],
+            )
+            # The page stays on this browser: lease it so it counts against
+            # max_pages and the browser is not closed under it.
+            lease = pool.lease(browser, on_retire=lambda: store.retire(conversation_id, live), from_job=True)
+            if lease is None:
+                logger.info("[renderer] No browser page capacity left to keep the live page of %s", conversation_id)
+                return False
+            live.release = lambda: pool.release_lease(lease)
+            await store.put(conversation_id, live)
+            return True
+
+        try:
+            result = await _render_page(
+                browser, html_content, viewport_width, **prepared, keep_page=_keep, timer=timer,
+            )
+        except BaseException:
+            await store.drop(conversation_id)
+            raise
+        if result["status"] != "success":
+            await store.drop(conversation_id)
+        return result
+
+    return _job
+
+
+def _live_patch_job(conversation_id: str, patches: list[dict]):
+    """
+    Pool job patching the conversation's live page in place and capturing it.
+
+    Runs without a browser slot (acquire=False): the page's lease already
+    covers it and pins its browser.
+    """
+    timer = RenderTimer()
+
+    async def _job(_browser):
+        settings = get_settings()
+        timer.add("acquire", timer.elapsed_ms())
+        store = _live_store()
+        live = await store.get(conversation_id)
+        if live is None:
+            return {
+                "status": "error",
+                "error_code": "LIVE_PAGE_NOT_FOUND",
+                "error": "No live page for this conversation (expired or not rendered yet); render the full HTML again.",
+            }
+        async with live.lock:
+            loaded = live.loaded
+            loaded.timer = timer
+            loaded.console_errors.clear()
+            loaded.blocked_requests.clear()
+            wait_started = time.monotonic()
+            with timer.phase("patch"):
+                outcome = await loaded.page.evaluate(
+                    LIVE_PATCH_JS, {"patches": patches, "timeoutMs": settings.render_ready_timeout_ms},
+                )
+            if not outcome["applied"]:
+                return {
+                    "status": "error",
+                    "error_code": "PATCH_NOT_APPLIED",
+                    "error": "Some patches matched nothing or failed; the page was left unchanged.",
+                    "patches": outcome["results"],
+                    **loaded.report(),
+                }
+            live.patches += len(patches)
+            live.patched_text += json.dumps(patches, ensure_ascii=False)
+            with timer.phase("fonts"):
+                await _refresh_live_fonts(live)
+            with timer.phase("ready_wait"):
+                await loaded.page.evaluate(LAYOUT_STABLE_JS, {
+                    "timeoutMs": settings.render_stable_timeout_ms,
+                    "quietFrames": _STABLE_QUIET_FRAMES,
+                })
+            loaded.ready_wait_ms = int((time.monotonic() - wait_started) * 1000)
+
+            capture = await _capture_loaded(loaded, live.html_content)
+            if not isinstance(capture, _Capture):
+                return {**capture, **loaded.report()}
+            result = await _write_render(
+                loaded, capture, live.html_content, _new_output_path(live.output_format),
+                live.output_format, live.scales, live.thumbnails,
+            )
+        if live.retired:
+            await store.retire(conversation_id, live)
+        if result["status"] == "success":
+            result["patches"] = outcome["results"]
+            result["patch_count"] = live.patches
+        return result
+
+    return _job
+
+
+async def _refresh_live_fonts(live: LivePage) -> None:
+    """Re-subset a live page's fonts so they cover the text its patches added."""
+    font_plan = await _prepare_fonts(live.html_content + live.patched_text)
+    loaded = live.loaded
+    if font_plan is None or (loaded.font_plan is not None and font_plan.urls == loaded.font_plan.urls):
+        return
+    if loaded.font_plan is not None:
+        await loaded.page.unroute(f"{FONT_URL_PREFIX}**")
+    await loaded.page.route(f"{FONT_URL_PREFIX}**", _font_route(font_plan))
+    await loaded.page.evaluate(SET_STYLE_JS, {"id": "__lumi_fonts__", "css": font_plan.css})
+    loaded.font_plan = font_plan
+
+
+def _validate_patches(patches: list[dict]) -> str | None:
+    """Shape check for live-page patches; returns an error message or None."""
+    if not isinstance(patches, list) or not patches:
+        return "patches must be a non-empty list"
+    if len(patches) > _MAX_LIVE_PATCHES:
+        return f"Too many patches ({len(patches)}), at most {_MAX_LIVE_PATCHES} per call"
+    for index, patch in enumerate(patches):
+        if not isinstance(patch, dict) or patch.get("op") not in _LIVE_PATCH_FIELDS:
+            return f"patches[{index}]: op must be one of {', '.join(_LIVE_PATCH_FIELDS)}"
+        for name in _LIVE_PATCH_FIELDS[patch["op"]]:
+            if name not in patch:
+                return f"patches[{index}]: '{patch['op']}' needs '{name}'"
+            if name != "option" and not isinstance(patch[name], str):
+                return f"patches[{index}]: '{name}' must be a string"
+        if "selector" in patch and not isinstance(patch["selector"], str):
+            return f"patches[{index}]: 'selector' must be a string"
+        if patch["op"] == "chart" and not isinstance(patch["option"], dict):
+            return f"patches[{index}]: 'option' must be an object"
+    return None
+
+
+@dataclass
+class _BatchItem:
+    """One variant of a batch render and its cache / single-flight state."""
+
+    html_content: str
+    viewport_width: int
+    prepared: dict | None = None
+    key: str | None = None
+    flight: Future | None = None
+    leader: bool = False  # rendered by this batch
+    result: dict | None = None
+    preflight: PreflightReport | None = None
+
+
+def _plan_batch(
+    jobs: list[tuple[str, int]],
+    enhanced: bool | None,
+    output_format: str | None,
+) -> list[_BatchItem]:
+    """Prepare every job and resolve cache hits; the rest become leaders or followers."""
+    cache = get_render_cache()
+    items = []
+    for html_content, viewport_width in jobs:
+        item = _BatchItem(html_content, viewport_width)
+        items.append(item)
+        prepared = _prepare_render(html_content, enhanced, output_format)
+        if "status" in prepared:
+            item.result = prepared
+            continue
+        item.html_content, item.preflight = _preflight(html_content, prepared)
+        if item.preflight.errors:
+            item.result = _preflight_error(item.preflight)
+            continue
+        item.prepared = prepared
+        if cache is None:
+            item.leader = True
+            continue
+
+        item.key = render_cache_key(
+            item.html_content, viewport_width, prepared["use_enhanced"], RENDERER_VERSION,
+            _output_variant(prepared),
+        )
+        cached = cache.lookup(item.key, prepared["local_path"])
+        if cached is not None:
+            item.result = cached
+            continue
+        item.flight, item.leader = cache.join(item.key)
+    return items
+
+
+def _batch_job(items: list[_BatchItem]):
+    """Pool job rendering all items as parallel pages of one browser."""
+
+    timers = {id(item): RenderTimer() for item in items}
+
+    async def _job(browser):
+        limit = asyncio.Semaphore(max(1, get_settings().render_pool_max_pages))
+
+        async def _render_item(item: _BatchItem) -> dict:
+            async with limit:
+                try:
+                    return await _render_page(
+                        browser, item.html_content, item.viewport_width, **item.prepared, timer=timers[id(item)],
+                    )
+                except Exception as e:
+                    logger.error("[renderer] HTML render failed: %s", e, exc_info=True)
+                    return {"status": "error", "error": f"HTML render failed: {e}"}
+
+        return await asyncio.gather(*(_render_item(item) for item in items))
+
+    return _job
+
+
+def _batch_timeout(count: int) -> float:
+    """Job timeout for `count` pages rendered render_pool_max_pages at a time."""
+    waves = -(-count // max(1, get_settings().render_pool_max_pages))
+    return _RENDER_JOB_TIMEOUT * waves
+
+
+def _finish_batch(leaders: list[_BatchItem], results: list[dict] | dict) -> None:
+    """Assign leader results (a whole-job error applies to every item) and release their flights."""
+    cache = get_render_cache()
+    for index, item in enumerate(leaders):
+        item.result = results[index] if isinstance(results, list) else dict(results)
+        if item.flight is not None:
+            cache.complete(item.key, item.flight, item.result)
+
+
+def render_jobs_in_process(jobs: list[dict], timeout: float) -> list[dict] | dict:
+    """
+    Render prepared jobs on this process's browser pool (render worker entry point).
+
+    Args:
+        jobs: [{html_content, viewport_width, prepared}] as built by _run_pages.
+        timeout: Pool job timeout in seconds.
+    """
+    items = [_BatchItem(job["html_content"], job["viewport_width"], prepared=job["prepared"]) for job in jobs]
+    return _export_images(_run_render(_batch_job(items), timeout=timeout))
+
+
+def _run_pages(items: list[_BatchItem], timeout: float = _RENDER_JOB_TIMEOUT) -> list[dict] | dict:
+    """
+    Render prepared items: fast-lane SVG pages in process (see svg_fast_lane.py),
+    the rest in a browser once admitted by the render scheduler (one slot per call).
+    """
+    plans = _fast_lane_plans(items)
+    drawn = asyncio.run(_draw_fast_lane(plans)) if plans else {}
+    rest = [item for item in items if id(item) not in drawn]
+    results = _run_admitted(lambda: _dispatch_pages(rest, timeout)) if rest else []
+    return _merge_fast_lane(items, drawn, rest, results)
+
+
+async def _arun_pages(items: list[_BatchItem], timeout: float = _RENDER_JOB_TIMEOUT) -> list[dict] | dict:
+    """Async counterpart of _run_pages."""
+    drawn = await _draw_fast_lane(_fast_lane_plans(items))
+    rest = [item for item in items if id(item) not in drawn]
+    results = await _arun_admitted(lambda: _adispatch_pages(rest, timeout)) if rest else []
+    return _merge_fast_lane(items, drawn, rest, results)
+
+
+def _fast_lane_plans(items: list[_BatchItem]) -> list[tuple[_BatchItem, SvgPagePlan]]:
+    """Items the SVG fast lane can draw without a browser, with their plans."""
+    settings = get_settings()
+    if not settings.render_svg_fast_lane or not svg_fast_lane_available():
+        return []
+    plans = []
+    for item in items:
+        plan = classify_svg_page(item.html_content, item.viewport_width)
+        if plan is not None and not (0 < settings.render_max_height < plan.page_height):
+            plans.append((item, plan))
+    return plans
+
+
+async def _draw_fast_lane(plans: list[tuple[_BatchItem, SvgPagePlan]]) -> dict[int, dict]:
+    """Fast-lane results by item id; items whose drawing failed are left to the browser."""
+    results = await asyncio.gather(*(_draw_svg_page(item, plan) for item, plan in plans))
+    return {id(item): _log_metrics(result) for (item, _), result in zip(plans, results) if result is not None}
+
+
+async def _draw_svg_page(item: _BatchItem, plan: SvgPagePlan) -> dict | None:
+    """Rasterize a classified page and write it like a browser capture, or None to fall back."""
+    prepared = item.prepared
+    timer = RenderTimer()
+    capture_scale = max(prepared["scales"])
+    try:
+        with timer.phase("rasterize"):
+            png_bytes = await run_in_encode_pool(rasterize_svg_page, plan, capture_scale)
+    except Exception as e:
+        logger.info("[renderer] SVG fast lane failed, rendering in the browser: %s", e)
+        return None
+    timer.count("fast_lane", 1)
+    loaded = _LoadedPage(None, None, prepared["use_enhanced"], capture_scale, [], [], timer=timer)
+    capture = _Capture([png_bytes], {"width": plan.page_width, "height": plan.page_height}, truncated=False)
+    return await _write_render(
+        loaded, capture, item.html_content, prepared["local_path"],
+        prepared["output_format"], prepared["scales"], prepared["thumbnails"],
+    )
+
+
+def _merge_fast_lane(
+    items: list[_BatchItem], drawn: dict[int, dict], rest: list[_BatchItem], results: list[dict] | dict,
+) -> list[dict] | dict:
+    """Browser results for `rest` and fast-lane results back in item order."""
+    if not drawn:
+        return results
+    merged = dict(drawn)
+    for index, item in enumerate(rest):
+        merged[id(item)] = results[index] if isinstance(results, list) else dict(results)
+    return [merged[id(item)] for item in items]
+
+
+def _run_admitted(run) -> list[dict] | dict:
+    """Call `run()` holding a render scheduler slot; RENDER_BUSY when none is available."""
+    try:
+        with get_render_scheduler().slot() as queue_ms:
+            results = run()
+    except RenderBusy as e:
+        return _busy_error(e)
+    return _log_metrics(_with_queue_ms(results, queue_ms))
+
+
+async def _arun_admitted(run) -> list[dict] | dict:
+    """Async counterpart of _run_admitted; `run()` returns an awaitable."""
+    try:
+        async with get_render_scheduler().aslot() as queue_ms:
+            results = await run()
+    except RenderBusy as e:
+        return _busy_error(e)
+    return _log_metrics(_with_queue_ms(results, queue_ms))
+
+
+def _dispatch_pages(items: list[_BatchItem], timeout: float) -> list[dict] | dict:
+    """Render prepared items in a worker process when enabled, else on the local pool."""
+    workers = get_render_workers()
+    if workers is None:
+        return _run_render(_batch_job(items), timeout=timeout)
+    try:
+        return _adopt_images(workers.run(_worker_jobs(items), timeout))
+    except Exception as e:
+        return _worker_error(e)
+
+
+async def _adispatch_pages(items: list[_BatchItem], timeout: float) -> list[dict] | dict:
+    """Async counterpart of _dispatch_pages; worker IPC is waited on in a thread."""
+    workers = get_render_workers()
+    if workers is None:
+        return await _arun_render(_batch_job(items), timeout=timeout)
+    try:
+        return _adopt_images(await asyncio.to_thread(workers.run, _worker_jobs(items), timeout))
+    except Exception as e:
+        return _worker_error(e)
+
+
+def _busy_error(e: RenderBusy) -> dict:
+    return {"status": "error", "error": str(e), "error_code": "RENDER_BUSY"}
+
+
+def _with_queue_ms(results: list[dict] | dict, queue_ms: float) -> list[dict] | dict:
+    """Record admission wait time on every result (and in its timings)."""
+    for result in results if isinstance(results, list) else [results]:
+        result["queue_ms"] = queue_ms
+        if "timings" in result:
+            result["timings"]["queue"] = queue_ms
+    return results
+
+
+def _log_metrics(results: list[dict] | dict) -> list[dict] | dict:
+    for result in results if isinstance(results, list) else [results]:
+        log_render_metrics(result)
+    return results
+
+
+def _worker_jobs(items: list[_BatchItem]) -> list[dict]:
+    return [
+        {"html_content": item.html_content, "viewport_width": item.viewport_width, "prepared": item.prepared}
+        for item in items
+    ]
+
+
+def _output_paths(result: dict) -> list[str]:
+    """Every image path of a render result (main image, split parts, variants)."""
+    if result.get("status") != "success":
+        return []
+    images = result.get("parts") or result.get("variants") or []
+    return list(dict.fromkeys([result["local_path"], *(image["local_path"] for image in images)]))
+
+
+def _export_images(results: list[dict] | dict) -> list[dict] | dict:
+    """Worker side: move in-memory images into the results sent to the API process."""
+    store = get_image_store()
+    if store is not None:
+        for result in results if isinstance(results, list) else [results]:
+            images = store.take(_output_paths(result))
+            if images:
+                result["_images"] = images
+    return results
+
+
+def _adopt_images(results: list[dict] | dict) -> list[dict] | dict:
+    """API side: keep images returned by a worker in this process's store."""
+    for result in results if isinstance(results, list) else [results]:
+        for path, data in result.pop("_images", {}).items():
+            write_image(path, data)
+    return results
+
+
+def _worker_error(e: Exception) -> dict:
+    """Map a render worker failure to an error dict."""
+    logger.error("[renderer] HTML render failed in worker: %s", e)
+    result = {"status": "error", "error": f"HTML render failed: {e}"}
+    if isinstance(e, WorkerTimeout):
+        result["error_code"] = "RENDER_TIMEOUT"
+    elif isinstance(e, WorkerCrashed):
+        result["error_code"] = "WORKER_CRASHED"
+    return result
+
+
+def _first(results: list[dict] | dict) -> dict:
+    """Result of a one-item _run_pages call."""
+    return results[0] if isinstance(results, list) else results
+
+
+def _run_render(job, timeout: float = _RENDER_JOB_TIMEOUT, acquire: bool = True):
+    """Run a render job on the browser pool, blocking; exceptions become error dicts."""
+    try:
+        return get_browser_pool().run(job, timeout=timeout, acquire=acquire)
+    except Exception as e:
+        logger.error("[renderer] HTML render failed: %s", e, exc_info=True)
+        return {"status": "error", "error": f"HTML render failed: {e}"}
+
+
+async def _arun_render(job, timeout: float = _RENDER_JOB_TIMEOUT, acquire: bool = True):
+    """Await a render job on the browser pool; exceptions become error dicts."""
+    try:
+        return await get_browser_pool().arun(job, timeout=timeout, acquire=acquire)
+    except Exception as e:
+        logger.error("[renderer] HTML render failed: %s", e, exc_info=True)
+        return {"status": "error", "error": f"HTML render failed: {e}"}
+
+
+def _prepare_render(
+    html_content: str,
+    enhanced: bool | None,
+    output_format: str | None,
+    scales: list[float] | None = None,
+    thumbnails: list[int] | None = None,
+) -> dict:
+    """
+    Resolve rendering mode, output format, output variants and output path
+    shared by the sync/async entry points.
 
     Returns:
-        dict with {status, local_path, width, height} or {status, error, error_code}.
+        dict with {use_enhanced, local_path, output_format, scales, thumbnails},
+        or an error dict with "status".
     """
     try:
-        from playwright.sync_api import sync_playwright
+        import playwright.async_api  # noqa: F401
     except ImportError:
         return {
             "status": "error",
             "error": "playwright not installed. Run: pip install playwright && playwright install chromium",
         }
 
+    try:
+        fmt = resolve_output_format(output_format)
+    except ValueError as e:
+        return {"status": "error", "error_code": "INVALID_FORMAT", "error": str(e)}
+    try:
+        scales, thumbnails = _resolve_variants(scales, thumbnails)
+    except ValueError as e:
+        return {"status": "error", "error_code": "INVALID_VARIANT", "error": str(e)}
+
     settings = get_settings()
-    output_dir = _ensure_output_dir()
-    filename = f"{uuid.uuid4().hex}.png"
-    local_path = os.path.join(output_dir, filename)
+    local_path = _new_output_path(fmt)
 
     # Determine rendering mode
     if enhanced is None:
@@ -95,201 +1058,668 @@ def render_html_to_image(
     else:
         use_enhanced = enhanced
 
+    return {
+        "use_enhanced": use_enhanced,
+        "local_path": local_path,
+        "output_format": fmt,
+        "scales": scales,
+        "thumbnails": thumbnails,
+    }
+
+
+def _new_output_path(output_format: str) -> str:
+    """Fresh file path in the output directory for one rendered image."""
+    return os.path.join(_ensure_output_dir(), f"{uuid.uuid4().hex}{OUTPUT_FORMATS[output_format][0]}")
+
+
+def _resolve_variants(
+    scales: list[float] | None,
+    thumbnails: list[int] | None,
+) -> tuple[list[float], list[int]]:
+    """Validate and de-duplicate scale / thumbnail targets (order of scales is kept)."""
+    resolved_scales = list(dict.fromkeys(float(s) for s in (scales or [1.0])))
+    for scale in resolved_scales:
+        if not 0 < scale <= _MAX_DEVICE_SCALE:
+            raise ValueError(f"Scale {scale:g} out of range (0, {_MAX_DEVICE_SCALE:g}]")
+    resolved_thumbnails = sorted({int(w) for w in (thumbnails or [])})
+    for width in resolved_thumbnails:
+        if not _MIN_THUMBNAIL_WIDTH <= width <= _MAX_THUMBNAIL_WIDTH:
+            raise ValueError(
+                f"Thumbnail width {width} out of range [{_MIN_THUMBNAIL_WIDTH}, {_MAX_THUMBNAIL_WIDTH}]"
+            )
+    if len(resolved_scales) + len(resolved_thumbnails) > _MAX_VARIANTS:
+        raise ValueError(f"At most {_MAX_VARIANTS} scale/thumbnail variants per render")
+    return resolved_scales, resolved_thumbnails
+
+
+def _output_variant(prepared: dict) -> str:
+    """Render cache key component for output and pipeline settings (encoding, height cap, variants, ...)."""
+    settings = get_settings()
+    output_format = prepared["output_format"]
+    variant = output_format
+    if output_format in ("webp", "jpeg"):
+        variant = f"{output_format}:q{settings.render_output_quality}"
+    if settings.render_max_height > 0:
+        variant += f"|h{settings.render_max_height}:{settings.render_overflow_mode}"
+    if _wants_variants(prepared["scales"], prepared["thumbnails"]):
+        variant += f"|s{prepared['scales']}|t{prepared['thumbnails']}"
+    if get_font_service() is not None:
+        variant += "|fonts"
+    if settings.render_deterministic:
+        variant += "|det"
+    if prepared["use_enhanced"]:
+        # Network interception settings change what enhanced pages load.
+        variant += f"|echarts:{'local' if settings.render_use_local_echarts else 'cdn'}"
+        if settings.render_block_external_images:
+            variant += "|noimg"
+    if settings.render_svg_fast_lane and svg_fast_lane_available():
+        variant += "|svg"  # SVG pages may be drawn by cairo instead of Chromium
+    return variant
+
+
+async def _render_page(
+    browser,
+    html_content: str,
+    viewport_width: int,
+    use_enhanced: bool,
+    local_path: str,
+    output_format: str,
+    scales: list[float],
+    thumbnails: list[int],
+    keep_page=None,
+    timer: RenderTimer | None = None,
+) -> dict:
+    """
+    Render one page in a fresh (or pre-warmed) context of a pooled browser and write the image(s).
+
+    keep_page: optional async callback; when the capture succeeds it receives
+    the _LoadedPage and returns True if it took ownership (used by live
+    pages), otherwise the context is closed here.
+    timer: started when the render was dispatched; the wait until now is
+    recorded as the acquire phase (see render_metrics.py).
+    """
+    if timer is None:
+        timer = RenderTimer()
+    else:
+        timer.add("acquire", timer.elapsed_ms())
+    # Layout runs once; the capture uses the largest requested device scale
+    # factor and smaller scales / thumbnails are downsampled from it.
+    try:
+        loaded = await _load_page(browser, html_content, viewport_width, use_enhanced, max(scales), timer)
+    except ScriptBudgetExceeded as e:
+        return {**_budget_error(e), **timer.report()}
+    kept = False
+    try:
+        try:
+            capture = await _guarded(loaded.watchdog, _capture_loaded(loaded, html_content))
+        except ScriptBudgetExceeded as e:
+            capture = _budget_error(e)
+        finally:
+            if loaded.watchdog is not None:
+                await loaded.watchdog.stop()
+        if keep_page is not None and isinstance(capture, _Capture):
+            kept = await keep_page(loaded)
+    finally:
+        if not kept:
+            await loaded.context.close()
+    if not isinstance(capture, _Capture):
+        return {**capture, **loaded.report()}
+    return await _write_render(loaded, capture, html_content, local_path, output_format, scales, thumbnails)
+
+
+@dataclass
+class _LoadedPage:
+    """A browser page with HTML loaded and ready to capture, plus load diagnostics."""
+
+    context: Any
+    page: Any
+    use_enhanced: bool
+    capture_scale: float
+    console_errors: list[str]
+    blocked_requests: list[str]
+    ready_wait_ms: int = 0
+    timer: RenderTimer = field(default_factory=RenderTimer)
+    watchdog: ScriptWatchdog | None = None
+    font_plan: FontPlan | None = None
+
+    def report(self) -> dict:
+        """Timings and counters of the render so far (see render_metrics.py)."""
+        self.timer.counters["console_errors"] = len(self.console_errors)
+        self.timer.counters["blocked_requests"] = len(self.blocked_requests)
+        if self.watchdog is not None:
+            self.timer.counters.update(self.watchdog.counters())
+        return self.timer.report()
+
+
+@dataclass
+class _Capture:
+    """In-memory PNG screenshots of one page (one per output part)."""
+
+    part_pngs: list[bytes]
+    dimensions: dict
+    truncated: bool
+
+
+async def _load_page(
+    browser,
+    html_content: str,
+    viewport_width: int,
+    use_enhanced: bool,
+    capture_scale: float,
+    timer: RenderTimer | None = None,
+) -> _LoadedPage:
+    """Open a context, load the HTML and wait until it is ready; the caller closes the context."""
+    settings = get_settings()
+    timer = timer or RenderTimer()
+    context_started = time.perf_counter()
+
+    # Chart pages whose only ECharts dependency is the warm bundle reuse a
+    # page that already evaluated it; the bundle <script> tag is dropped.
+    # Warm pages are 1x contexts, so high-DPI captures always start cold.
+    warm = None
+    if use_enhanced and settings.render_warm_echarts_pages > 0 and capture_scale == 1:
+        bundle = _warm_echarts_bundle(settings)
+        stripped_html = _strip_warm_echarts_tags(html_content, bundle[0]) if bundle else None
+        if stripped_html is not None:
+            stock = get_warm_page_stock(settings.render_warm_echarts_pages)
+            warm = await stock.take(browser, *bundle)
+
+    if warm is not None:
+        context, page = warm
+    else:
+        context = await browser.new_context(
+            viewport={"width": viewport_width, "height": 800},
+            device_scale_factor=capture_scale,
+        )
+    watchdog = None
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--disable-gpu",
-                ],
+        if warm is not None:
+            await page.set_viewport_size({"width": viewport_width, "height": 800})
+            timer.count("warm_page", 1)
+            logger.debug("[renderer] Using warm ECharts page")
+        else:
+            page = await context.new_page()
+        timer.add("context", (time.perf_counter() - context_started) * 1000)
+
+        # Script time / JS heap budgets for everything the page runs from here on.
+        watchdog = await start_script_watchdog(context, page)
+
+        # Capture console errors for diagnostics
+        console_errors: list[str] = []
+        page.on("console", lambda msg: console_errors.append(msg.text) if msg.type == "error" else None)
+        page.on("pageerror", lambda err: console_errors.append(str(err)))
+
+        # --- Enhanced mode: set up network interception ---
+        blocked_requests: list[str] = []
+        if use_enhanced:
+            allowed_hosts = set(h.strip() for h in settings.render_allowed_hosts.split(",") if h.strip())
+            echarts_bundle = _load_local_echarts() if settings.render_use_local_echarts else None
+            asset_cache = get_asset_cache()
+
+            async def _handle_route(route):
+                url = route.request.url
+                # Always allow data:/blob:/about: URLs
+                if url.startswith(("data:", "blob:", "about:")):
+                    await route.continue_()
+                    return
+
+                parsed = urlparse(url)
+                host = parsed.netloc
+
+                # Same-origin (no host = inline content from setContent)
+                if not host:
+                    await route.continue_()
+                    return
+
+                # Local ECharts bundle intercept
+                if echarts_bundle and is_echarts_bundle_url(parsed.path):
+                    await route.fulfill(
+                        content_type="application/javascript",
+                        body=echarts_bundle,
+                    )
+                    logger.debug("[renderer] Served local ECharts bundle for %s", url)
+                    return
+
+                # Whitelist check (served from the local asset cache when enabled)
+                if host in allowed_hosts:
+                    if asset_cache is not None:
+                        await _serve_cached_asset(route, asset_cache)
+                    else:
+                        await route.continue_()
+                    return
+
+                # Block external images if configured
+                if settings.render_block_external_images and route.request.resource_type == "image":
+                    blocked_requests.append(f"[blocked-image] {url}")
+                    await route.abort()
+                    return
+
+                # Allow other resources but log them
+                blocked_requests.append(f"[unwhitelisted] {url}")
+                await route.continue_()
+
+            await page.route("**/*", _handle_route)
+
+            if (settings.render_auto_detect_charts or settings.render_deterministic) and warm is None:
+                # Init script covers later navigations; evaluate covers the
+                # current document, which set_content rewrites in place.
+                # (Deterministic mode needs it to switch chart animations off.)
+                await page.add_init_script(ECHARTS_INSTRUMENT_JS)
+                await page.evaluate(ECHARTS_INSTRUMENT_JS)
+
+            logger.info(
+                "[renderer] Enhanced mode: allowed_hosts=%s, local_echarts=%s, asset_cache=%s",
+                allowed_hosts, echarts_bundle is not None, asset_cache is not None,
             )
-            page = browser.new_page(viewport={"width": viewport_width, "height": 800})
 
-            # Capture console errors for diagnostics
-            console_errors: list[str] = []
-            page.on("console", lambda msg: console_errors.append(msg.text) if msg.type == "error" else None)
-            page.on("pageerror", lambda err: console_errors.append(str(err)))
+        # --- Local fonts: subset @font-face served by route interception ---
+        # (registered last, so it takes precedence over the "**/*" route)
+        with timer.phase("fonts"):
+            font_plan = await _prepare_fonts(html_content)
+        if font_plan is not None:
+            await page.route(f"{FONT_URL_PREFIX}**", _font_route(font_plan))
+            html_content = inject_style(html_content, font_plan.css)
+            if warm is not None:
+                stripped_html = inject_style(stripped_html, font_plan.css)
 
-            # --- Enhanced mode: set up network interception ---
-            blocked_requests: list[str] = []
-            if use_enhanced:
-                allowed_hosts = set(h.strip() for h in settings.render_allowed_hosts.split(",") if h.strip())
-                echarts_bundle = _load_local_echarts() if settings.render_use_local_echarts else None
-
-                def _handle_route(route):
-                    url = route.request.url
-                    # Always allow data:/blob:/about: URLs
-                    if url.startswith(("data:", "blob:", "about:")):
-                        route.continue_()
-                        return
-
-                    parsed = urlparse(url)
-                    host = parsed.netloc
-
-                    # Same-origin (no host = inline content from setContent)
-                    if not host:
-                        route.continue_()
-                        return
-
-                    # Local ECharts bundle intercept
-                    if echarts_bundle and "echarts" in url and url.endswith(".js"):
-                        route.fulfill(
-                            content_type="application/javascript",
-                            body=echarts_bundle,
-                        )
-                        logger.debug("[renderer] Served local ECharts bundle for %s", url)
-                        return
-
-                    # Whitelist check
-                    if host in allowed_hosts:
-                        route.continue_()
-                        return
-
-                    # Block external images if configured
-                    if settings.render_block_external_images and route.request.resource_type == "image":
-                        blocked_requests.append(f"[blocked-image] {url}")
-                        route.abort()
-                        return
-
-                    # Allow other resources but log them
-                    blocked_requests.append(f"[unwhitelisted] {url}")
-                    route.continue_()
-
-                page.route("**/*", _handle_route)
-
-                logger.info(
-                    "[renderer] Enhanced mode: allowed_hosts=%s, local_echarts=%s",
-                    allowed_hosts, echarts_bundle is not None,
-                )
+        # --- Deterministic mode: no animations, seeded Math.random, frozen clocks ---
+        if settings.render_deterministic:
+            if warm is None:
+                await page.add_init_script(DETERMINISTIC_JS)
+            await page.evaluate(DETERMINISTIC_JS)
+            html_content = inject_style(html_content, DETERMINISTIC_CSS, "__lumi_static__")
+            if warm is not None:
+                stripped_html = inject_style(stripped_html, DETERMINISTIC_CSS, "__lumi_static__")
 
+        async def _load_and_wait() -> int:
             # --- Load content ---
-            if use_enhanced:
-                page.set_content(html_content, wait_until="domcontentloaded", timeout=15000)
-            else:
-                page.set_content(html_content, wait_until="networkidle", timeout=30000)
-                page.wait_for_load_state("domcontentloaded")
+            with timer.phase("load"):
+                if warm is not None:
+                    await page.evaluate(REPLACE_DOCUMENT_JS, stripped_html)
+                elif use_enhanced:
+                    await page.set_content(html_content, wait_until="domcontentloaded", timeout=15000)
+                else:
+                    await page.set_content(html_content, wait_until="load", timeout=30000)
 
             # --- Wait strategy ---
+            wait_started = time.monotonic()
             if use_enhanced:
-                # Wait for application-level ready signal
-                ready_signal_found = False
+                # Wait for the application-level ready signal, or (when chart
+                # instrumentation is on) for every ECharts instance to finish.
                 try:
-                    page.wait_for_function(
-                        "() => window.__LUMI_RENDER_DONE__ === true",
+                    ready_handle = await page.wait_for_function(
+                        READY_JS,
+                        arg=_ready_arg(html_content),
                         timeout=settings.render_ready_timeout_ms,
                     )
-                    ready_signal_found = True
-                    logger.debug("[renderer] Ready signal received")
+                    logger.debug("[renderer] Ready (%s)", await ready_handle.json_value())
                 except Exception:
                     logger.warning("[renderer] Ready signal timeout (%dms), trying fallback selectors",
                                    settings.render_ready_timeout_ms)
                     # Fallback: wait for canvas/svg elements (ECharts renders to canvas)
                     try:
-                        page.wait_for_selector("canvas, svg.echarts-svg, [_echarts_instance_]", timeout=5000)
+                        await page.wait_for_selector("canvas, svg.echarts-svg, [_echarts_instance_]", timeout=5000)
                         logger.debug("[renderer] Fallback selector found")
                     except Exception:
                         # Final fallback: fixed wait
-                        page.wait_for_timeout(2000)
+                        await page.wait_for_timeout(2000)
                         logger.warning("[renderer] Fallback selector timeout, using fixed wait")
             else:
-                page.wait_for_timeout(800)
-
-            # --- Content check ---
-            content_check = page.evaluate("""() => {
-                const body = document.body;
-                if (!body) return { hasContent: false, reason: 'no body element' };
-                const text = body.innerText.trim();
-                const children = body.children.length;
-                const images = document.querySelectorAll('img, svg, canvas').length;
-                const visibleElements = document.querySelectorAll('div, p, h1, h2, h3, h4, h5, h6, span, table, ul, ol, section, article, header, nav, main, footer, aside');
-                let visibleCount = 0;
-                for (const el of visibleElements) {
-                    const rect = el.getBoundingClientRect();
-                    const style = window.getComputedStyle(el);
-                    if (rect.width > 0 && rect.height > 0 && style.display !== 'none' && style.visibility !== 'hidden') {
-                        visibleCount++;
-                    }
-                }
-                return {
-                    hasContent: text.length > 0 || images > 0 || visibleCount > 2,
-                    textLength: text.length,
-                    childCount: children,
-                    imageCount: images,
-                    visibleCount: visibleCount
-                };
-            }""")
-
-            if not content_check.get("hasContent", True):
-                browser.close()
-                errors_info = "; ".join(console_errors[:5]) if console_errors else "none"
-                blocked_info = "; ".join(blocked_requests[:5]) if blocked_requests else "none"
-                logger.warning(
-                    "[renderer] HTML rendered blank page. Console errors: %s | Blocked: %s | Content check: %s | HTML snippet: %s",
-                    errors_info, blocked_info, content_check, html_content[:500],
-                )
+                # Event-driven: fonts loaded, images decoded, layout quiet for N frames
+                stability = await page.evaluate(LAYOUT_STABLE_JS, {
+                    "timeoutMs": settings.render_stable_timeout_ms,
+                    "quietFrames": _STABLE_QUIET_FRAMES,
+                })
+                if stability.get("state") != "stable":
+                    logger.warning("[renderer] Layout not stable after %dms, capturing anyway",
+                                   settings.render_stable_timeout_ms)
+            ready_wait_ms = int((time.monotonic() - wait_started) * 1000)
+            timer.add("ready_wait", ready_wait_ms)
+            return ready_wait_ms
 
-                error_code = "BLANK_PAGE"
-                if any("echarts" in e.lower() for e in console_errors):
-                    error_code = "LIB_LOAD_FAILED"
+        ready_wait_ms = await _guarded(watchdog, _load_and_wait())
+    except BaseException:
+        if watchdog is not None:
+            await watchdog.stop()
+        await context.close()
+        raise
+    return _LoadedPage(
+        context, page, use_enhanced, capture_scale, console_errors, blocked_requests, ready_wait_ms, timer,
+        watchdog, font_plan,
+    )
 
-                return {
-                    "status": "error",
-                    "error_code": error_code,
-                    "error": (
-                        f"HTML rendered a blank page (no visible content). "
-                        f"Console errors: [{errors_info}]. "
-                        f"Blocked requests: [{blocked_info}]. "
-                        f"Please check that all external libraries load correctly "
-                        f"and that window.__LUMI_RENDER_DONE__ = true is set after rendering."
-                    ),
-                }
 
-            page.screenshot(path=local_path, full_page=True)
+def _ready_arg(html_content: str) -> dict:
+    """READY_JS argument for a page: chart detection and the no-charts idle shortcut."""
+    return {
+        "autoCharts": get_settings().render_auto_detect_charts,
+        "settleMs": _CHARTS_SETTLE_MS,
+        "idleMs": None if "__LUMI_RENDER_DONE__" in html_content else _NO_CHARTS_IDLE_MS,
+    }
 
-            dimensions = page.evaluate("""() => ({
-                width: document.documentElement.scrollWidth,
-                height: document.documentElement.scrollHeight
-            })""")
 
-            browser.close()
+async def _guarded(watchdog: ScriptWatchdog | None, awaitable):
+    """Await a page step under the page's script budgets (when any)."""
+    if watchdog is None:
+        return await awaitable
+    return await watchdog.guard(awaitable)
 
-        # Secondary check: verify the image file is not suspiciously small (blank)
-        file_size = os.path.getsize(local_path)
-        if file_size < _MIN_IMAGE_SIZE:
-            logger.warning(
-                "[renderer] Image file too small (%d bytes), likely blank. HTML snippet: %s",
-                file_size, html_content[:300],
-            )
-            return {
-                "status": "error",
-                "error_code": "FILE_TOO_SMALL",
-                "error": (
-                    f"Rendered image is likely blank ({file_size} bytes, expected >={_MIN_IMAGE_SIZE}). "
-                    f"Please ensure the HTML contains visible content. "
-                    f"If using ECharts, ensure the chart container has explicit width/height "
-                    f"and window.__LUMI_RENDER_DONE__ = true is set after setOption()."
-                ),
-            }
 
-        if console_errors:
-            logger.warning("[renderer] Console errors during render: %s", console_errors[:5])
-        if blocked_requests:
-            logger.info("[renderer] Blocked/unwhitelisted requests: %s", blocked_requests[:5])
+def _budget_error(e: ScriptBudgetExceeded) -> dict:
+    what = "script time" if e.budget == "script_time" else "JavaScript heap"
+    unit = "ms" if e.budget == "script_time" else "MB"
+    return {
+        "status": "error",
+        "error_code": "SCRIPT_BUDGET_EXCEEDED",
+        "error": (
+            f"Page scripts exceeded the {what} budget ({e.used:.0f}{unit} > {e.limit:.0f}{unit}) "
+            f"and were terminated. Check for infinite loops or unbounded data generation; "
+            f"use a small, precomputed dataset instead of generating it in JavaScript."
+        ),
+    }
+
+
+async def _prepare_fonts(html_content: str) -> FontPlan | None:
+    """Font subsets for the page, or None (service off, no configured family, or subsetting failed)."""
+    fonts = get_font_service()
+    if fonts is None:
+        return None
+    try:
+        return await fonts.prepare(html_content)
+    except Exception as e:
+        logger.warning("[renderer] Font subsetting failed, using system fonts: %s", e)
+        return None
+
+
+def _font_route(font_plan: FontPlan):
+    """Route handler serving the page's font subsets."""
+    fonts = get_font_service()
+
+    async def _handle_font(route):
+        key = font_plan.urls.get(route.request.url)
+        data = fonts.get(key) if key is not None else None
+        if data is None:
+            await route.abort()
+            return
+        await route.fulfill(
+            status=200, body=data, content_type="font/ttf",
+            headers={"Access-Control-Allow-Origin": "*", "Cache-Control": "max-age=31536000, immutable"},
+        )
+
+    return _handle_font
+
+
+async def _capture_loaded(loaded: _LoadedPage, html_content: str) -> _Capture | dict:
+    """Check a loaded page for content and screenshot it (tiled, capped); errors come back as dicts."""
+    settings = get_settings()
+    page = loaded.page
+    console_errors, blocked_requests = loaded.console_errors, loaded.blocked_requests
+    timer = loaded.timer
+
+    # --- Content check ---
+    content_check_started = time.perf_counter()
+    content_check = await page.evaluate(CONTENT_CHECK_JS)
+    timer.add("content_check", (time.perf_counter() - content_check_started) * 1000)
 
-        logger.info(
-            "[renderer] HTML done: %s (%dx%d, %d bytes, enhanced=%s)",
-            local_path, dimensions["width"], dimensions["height"], file_size, use_enhanced,
+    if not content_check.get("hasContent", True):
+        errors_info = "; ".join(console_errors[:5]) if console_errors else "none"
+        blocked_info = "; ".join(blocked_requests[:5]) if blocked_requests else "none"
+        logger.warning(
+            "[renderer] HTML rendered blank page. Console errors: %s | Blocked: %s | Content check: %s | HTML snippet: %s",
+            errors_info, blocked_info, content_check, html_content[:500],
         )
+
+        error_code = "BLANK_PAGE"
+        if any("echarts" in e.lower() for e in console_errors):
+            error_code = "LIB_LOAD_FAILED"
+
         return {
-            "status": "success",
-            "local_path": local_path,
-            "width": dimensions["width"],
-            "height": dimensions["height"],
+            "status": "error",
+            "error_code": error_code,
+            "error": (
+                f"HTML rendered a blank page (no visible content). "
+                f"Console errors: [{errors_info}]. "
+                f"Blocked requests: [{blocked_info}]. "
+                f"Please check that all external libraries load correctly "
+                f"and that window.__LUMI_RENDER_DONE__ = true is set after rendering."
+            ),
         }
 
-    except Exception as e:
-        logger.error("[renderer] HTML render failed: %s", e, exc_info=True)
-        return {"status": "error", "error": f"HTML render failed: {e}"}
+    with timer.phase("content_check"):
+        dimensions = await page.evaluate("""() => ({
+            width: document.documentElement.scrollWidth,
+            height: document.documentElement.scrollHeight
+        })""")
+
+    # --- Capture (tiled for tall pages, capped at render_max_height) ---
+    parts, truncated = plan_parts(
+        dimensions["height"], settings.render_max_height, settings.render_overflow_mode,
+    )
+    if truncated:
+        logger.warning(
+            "[renderer] Page height %dpx exceeds render_max_height, truncating to %dpx",
+            dimensions["height"], parts[0][1],
+        )
+    part_pngs = []
+    with timer.phase("screenshot"):
+        for top, height in parts:
+            part_pngs.append(await _capture_region(
+                page, dimensions["width"], top, height, whole_page=len(parts) == 1 and not truncated,
+            ))
+    return _Capture(part_pngs, dimensions, truncated)
+
+
+async def _write_render(
+    loaded: _LoadedPage,
+    capture: _Capture,
+    html_content: str,
+    local_path: str,
+    output_format: str,
+    scales: list[float],
+    thumbnails: list[int],
+) -> dict:
+    """Blank-check, encode and store a capture (see image_store.py); returns the render result dict."""
+    part_pngs, dimensions, truncated = capture.part_pngs, capture.dimensions, capture.truncated
+    capture_scale = loaded.capture_scale
+    console_errors, blocked_requests = loaded.console_errors, loaded.blocked_requests
+    use_enhanced, ready_wait_ms = loaded.use_enhanced, loaded.ready_wait_ms
+    timer = loaded.timer
+
+    # Secondary check: pixel statistics on the in-memory screenshot; nothing
+    # is encoded or written until it passes.
+    png_size = sum(len(png) for png in part_pngs)
+    with timer.phase("blank_check"):
+        blank_error = await _check_blank_image(part_pngs, html_content)
+    if blank_error is not None:
+        return {**blank_error, **loaded.report()}
+
+    if len(part_pngs) == 1 and _wants_variants(scales, thumbnails):
+        outputs, encode_ms = await _write_variants(
+            part_pngs[0], local_path, output_format, scales, thumbnails, capture_scale, timer,
+        )
+    else:
+        if len(part_pngs) > 1 and _wants_variants(scales, thumbnails):
+            logger.warning("[renderer] Split render: extra scales/thumbnails skipped, parts kept at %gx", capture_scale)
+        outputs, encode_ms = [], 0
+        for path, png_bytes in zip(_part_paths(local_path, len(part_pngs)), part_pngs):
+            with timer.phase("encode"):
+                image_bytes, part_encode_ms = await encode_image_async(png_bytes, output_format)
+            with timer.phase("store"):
+                await asyncio.to_thread(write_image, path, image_bytes)
+            width, height = _png_size(png_bytes)
+            outputs.append({"local_path": path, "width": width, "height": height, "file_size": len(image_bytes)})
+            encode_ms += part_encode_ms
+    file_size = sum(output["file_size"] for output in outputs)
+    timer.count("images", len(outputs))
+    timer.count("png_bytes", png_size)
+    timer.count("output_bytes", file_size)
+
+    if console_errors:
+        logger.warning("[renderer] Console errors during render: %s", console_errors[:5])
+    if blocked_requests:
+        logger.info("[renderer] Blocked/unwhitelisted requests: %s", blocked_requests[:5])
+
+    logger.info(
+        "[renderer] HTML done: %s (%dx%d in %d image(s), %s %d bytes from %d PNG bytes in %dms, "
+        "enhanced=%s, ready_wait=%dms)",
+        local_path, dimensions["width"], dimensions["height"], len(outputs), output_format,
+        file_size, png_size, encode_ms, use_enhanced, ready_wait_ms,
+    )
+    result = {
+        "status": "success",
+        "local_path": local_path,
+        "width": outputs[0]["width"],
+        "height": outputs[0]["height"],
+        "format": output_format,
+        "file_size": file_size,
+        "encode_ms": encode_ms,
+        "ready_wait_ms": ready_wait_ms,
+    }
+    if truncated:
+        result["truncated"] = True
+        result["page_height"] = dimensions["height"]
+    if len(part_pngs) > 1:
+        result["page_height"] = dimensions["height"]
+        result["parts"] = outputs
+    elif len(outputs) > 1:
+        result["variants"] = outputs
+    result.update(loaded.report())
+    return result
+
+
+def _wants_variants(scales: list[float], thumbnails: list[int]) -> bool:
+    return scales != [1.0] or bool(thumbnails)
+
+
+async def _write_variants(
+    png_bytes: bytes,
+    local_path: str,
+    output_format: str,
+    scales: list[float],
+    thumbnails: list[int],
+    capture_scale: float,
+    timer: RenderTimer | None = None,
+) -> tuple[list[dict], int]:
+    """
+    Derive every scale / thumbnail variant from one capture at capture_scale.
+
+    The first scale is stored as local_path, other scales as <name>@<s>x.<ext>
+    and thumbnails (fixed width, aspect kept, never upscaled) to
+    <name>_thumb<w>.<ext>. Returns (variant dicts, encode time in ms).
+    """
+    source_width, source_height = _png_size(png_bytes)
+    root, ext = os.path.splitext(local_path)
+    specs = []
+    for index, scale in enumerate(scales):
+        ratio = scale / capture_scale
+        specs.append({
+            "kind": "scale",
+            "scale": scale,
+            "local_path": local_path if index == 0 else f"{root}@{scale:g}x{ext}",
+            "width": max(1, round(source_width * ratio)),
+            "height": max(1, round(source_height * ratio)),
+        })
+    for thumb_width in thumbnails:
+        width = min(thumb_width, source_width)
+        specs.append({
+            "kind": "thumbnail",
+            "local_path": f"{root}_thumb{thumb_width}{ext}",
+            "width": width,
+            "height": max(1, round(source_height * width / source_width)),
+        })
+
+    timer = timer or RenderTimer()
+    with timer.phase("encode"):
+        blobs, encode_ms = await encode_variants_async(
+            png_bytes, [(spec["width"], spec["height"]) for spec in specs], output_format,
+        )
+    with timer.phase("store"):
+        for spec, blob in zip(specs, blobs):
+            await asyncio.to_thread(write_image, spec["local_path"], blob)
+            spec["file_size"] = len(blob)
+    return specs, encode_ms
+
+
+def _png_size(png_bytes: bytes) -> tuple[int, int]:
+    """(width, height) from a PNG's IHDR chunk."""
+    return struct.unpack(">II", png_bytes[16:24])
+
+
+async def _capture_region(page, width: int, top: int, height: int, whole_page: bool) -> bytes:
+    """
+    Screenshot one output region as PNG bytes.
+
+    Regions taller than render_tile_height are captured in clip strips and
+    stitched by PngStripWriter, so Chromium never rasterizes more than one
+    strip at a time.
+    """
+    tile_height = get_settings().render_tile_height
+    strips = plan_strips(top, height, tile_height)
+    if len(strips) == 1 or not tiling_available():
+        if whole_page:
+            return await page.screenshot(full_page=True)
+        return await page.screenshot(full_page=True, clip={"x": 0, "y": top, "width": width, "height": height})
+
+    out = io.BytesIO()
+    writer = PngStripWriter(out)
+    for strip_top, strip_height in strips:
+        strip = await page.screenshot(
+            full_page=True, clip={"x": 0, "y": strip_top, "width": width, "height": strip_height},
+        )
+        await asyncio.to_thread(writer.add_strip, strip)
+    writer.close()
+    logger.debug("[renderer] Stitched %d strips (%dx%d px)", len(strips), writer.width, writer.height)
+    return out.getvalue()
+
+
+async def _check_blank_image(part_pngs: list[bytes], html_content: str) -> dict | None:
+    """
+    Return an error when every captured image is blank, else None.
+
+    Uses pixel statistics on a downsampled copy (see blank_check.py) and
+    reports BLANK_PAGE; without Pillow it falls back to the raw PNG size
+    heuristic and keeps reporting FILE_TOO_SMALL.
+    """
+    advice = (
+        "Please ensure the HTML contains visible content. "
+        "If using ECharts, ensure the chart container has explicit width/height "
+        "and window.__LUMI_RENDER_DONE__ = true is set after setOption()."
+    )
+    if not blank_check_available():
+        png_size = sum(len(png) for png in part_pngs)
+        if png_size >= _MIN_IMAGE_SIZE:
+            return None
+        logger.warning(
+            "[renderer] Image file too small (%d bytes), likely blank. HTML snippet: %s",
+            png_size, html_content[:300],
+        )
+        return {
+            "status": "error",
+            "error_code": "FILE_TOO_SMALL",
+            "error": f"Rendered image is likely blank ({png_size} bytes, expected >={_MIN_IMAGE_SIZE}). {advice}",
+        }
+
+    for png_bytes in part_pngs:
+        stats = await asyncio.to_thread(analyze_image, png_bytes)
+        if not stats["blank"]:
+            logger.debug("[renderer] Blank check passed: %s", stats)
+            return None
+
+    logger.warning(
+        "[renderer] Screenshot is blank (background %s, %d colours, variance %.1f). HTML snippet: %s",
+        stats["background"], stats["distinct_colors"], stats["variance"], html_content[:300],
+    )
+    return {
+        "status": "error",
+        "error_code": "BLANK_PAGE",
+        "error": (
+            f"Rendered image is blank: only background colour {stats['background']} is visible "
+            f"({stats['distinct_colors']} distinct colours, variance {stats['variance']}). {advice}"
+        ),
+    }
+
+
+def _part_paths(local_path: str, count: int) -> list[str]:
+    """Output paths for a split render: local_path, then <name>_2.<ext>, ..."""
+    root, ext = os.path.splitext(local_path)
+    return [local_path] + [f"{root}_{i}{ext}" for i in range(2, count + 1)]
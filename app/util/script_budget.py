@@ -0,0 +1,162 @@
+"""
+Per-page script time and JS heap budgets.
+
+LLM-written pages can spin in an infinite loop or build enormous data
+structures. Left alone, such a page holds a render slot (and a Chromium
+renderer) until the Playwright timeouts fire. A ScriptWatchdog polls the
+page over CDP while it loads, waits for readiness and is captured:
+
+- Performance.getMetrics gives the page's accumulated ScriptDuration and
+  JSHeapUsedSize. Script time is counted from when the watchdog started,
+  so a warm page's already-evaluated ECharts bundle is not charged.
+- While the renderer's main thread is busy, getMetrics may stop answering.
+  That unanswered time counts as script time only when the last answer
+  showed a script running (ScriptDuration growing for most of the poll).
+  Long layout, style or paint work, e.g. a huge DOM during a full-page
+  capture, does not add to ScriptDuration and is never charged.
+
+Past either budget the watchdog sends Runtime.terminateExecution (served
+even while the main thread is busy) and trips. guard() then cancels the
+step in progress and raises ScriptBudgetExceeded, which the renderer
+reports as error_code SCRIPT_BUDGET_EXCEEDED.
+"""
+
+import time
+import asyncio
+import logging
+import contextlib
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ScriptBudgetExceeded(Exception):
+    """The page went over its script time or JS heap budget and was terminated."""
+
+    def __init__(self, budget: str, used: float, limit: float):
+        self.budget, self.used, self.limit = budget, used, limit
+        unit = "ms" if budget == "script_time" else "MB"
+        super().__init__(f"{budget} budget exceeded ({used:.0f}{unit} > {limit:.0f}{unit})")
+
+
+class ScriptWatchdog:
+    """Polls one page's CDP performance metrics and terminates its scripts past budget."""
+
+    def __init__(self, cdp, max_script_ms: int, max_heap_mb: int, poll_ms: int = 200):
+        self._cdp = cdp
+        self.max_script_ms = max_script_ms
+        self.max_heap_mb = max_heap_mb
+        self._poll = poll_ms / 1000
+        self._tripped = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._base_script_s = 0.0
+        self._script_running = False
+        self.script_ms = 0.0
+        self.heap_mb = 0.0
+        self.exceeded: ScriptBudgetExceeded | None = None
+
+    async def start(self) -> None:
+        await self._cdp.send("Performance.enable")
+        metrics = await self._metrics()
+        self._base_script_s = metrics.get("ScriptDuration", 0.0)
+        self.heap_mb = metrics.get("JSHeapUsedSize", 0.0) / (1024 * 1024)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        with contextlib.suppress(Exception):
+            await self._cdp.detach()
+
+    async def guard(self, awaitable):
+        """Await `awaitable`, or cancel it and raise ScriptBudgetExceeded once the budget trips."""
+        work = asyncio.ensure_future(awaitable)
+        tripped = asyncio.ensure_future(self._tripped.wait())
+        try:
+            await asyncio.wait({work, tripped}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            tripped.cancel()
+            if not work.done():
+                work.cancel()
+                with contextlib.suppress(BaseException):
+                    await work
+        if self._tripped.is_set():
+            raise self.exceeded
+        return work.result()
+
+    def counters(self) -> dict:
+        """script_ms / heap_mb as last observed, for the render counters."""
+        return {"script_ms": int(self.script_ms), "heap_mb": int(self.heap_mb)}
+
+    async def _metrics(self) -> dict:
+        reply = await self._cdp.send("Performance.getMetrics")
+        return {m["name"]: m["value"] for m in reply.get("metrics", [])}
+
+    async def _run(self) -> None:
+        answered = time.monotonic()
+        pending = None
+        try:
+            while True:
+                await asyncio.sleep(self._poll)
+                # A metrics request is not repeated while one is outstanding: the
+                # main thread answers them in order once it is free again.
+                if pending is None:
+                    pending = asyncio.ensure_future(self._metrics())
+                await asyncio.wait({pending}, timeout=self._poll)
+                now = time.monotonic()
+                if pending.done():
+                    try:
+                        metrics = pending.result()
+                    except Exception as e:
+                        logger.debug("[script_budget] Metrics unavailable, stopping: %s", e)
+                        return
+                    script_ms = (metrics.get("ScriptDuration", 0.0) - self._base_script_s) * 1000
+                    self._script_running = script_ms - self.script_ms > (now - answered) * 1000 / 2
+                    pending, answered = None, now
+                    self.script_ms = script_ms
+                    self.heap_mb = metrics.get("JSHeapUsedSize", 0.0) / (1024 * 1024)
+                    busy_ms = 0.0
+                elif self._script_running:
+                    busy_ms = (now - answered) * 1000
+                else:
+                    busy_ms = 0.0
+
+                if self.max_script_ms > 0 and self.script_ms + busy_ms > self.max_script_ms:
+                    await self._trip("script_time", self.script_ms + busy_ms, self.max_script_ms)
+                    return
+                if self.max_heap_mb > 0 and self.heap_mb > self.max_heap_mb:
+                    await self._trip("heap", self.heap_mb, self.max_heap_mb)
+                    return
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def _trip(self, budget: str, used: float, limit: float) -> None:
+        self.exceeded = ScriptBudgetExceeded(budget, used, limit)
+        logger.warning("[script_budget] Terminating page scripts: %s", self.exceeded)
+        try:
+            await asyncio.wait_for(self._cdp.send("Runtime.terminateExecution"), timeout=2)
+        except Exception as e:
+            logger.debug("[script_budget] terminateExecution failed: %s", e)
+        self._tripped.set()
+
+
+async def start_script_watchdog(context, page) -> ScriptWatchdog | None:
+    """Watch `page` with the configured budgets, or None when budgets are off or CDP is unavailable."""
+    settings = get_settings()
+    if settings.render_script_budget_ms <= 0 and settings.render_heap_budget_mb <= 0:
+        return None
+    try:
+        cdp = await context.new_cdp_session(page)
+        watchdog = ScriptWatchdog(
+            cdp, settings.render_script_budget_ms, settings.render_heap_budget_mb,
+        )
+        await asyncio.wait_for(watchdog.start(), timeout=5)
+    except Exception as e:
+        logger.warning("[script_budget] Watchdog unavailable, rendering without budgets: %r", e)
+        return None
+    return watchdog
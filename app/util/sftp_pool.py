@@ -0,0 +1,243 @@
+"""
+Pooled, persistent SFTP sessions for the uploader.
+
+Opening an SSH connection (TCP + key exchange + auth) and an SFTP channel
+per image costs more than the upload itself on a remote link. The pool
+keeps up to `size` authenticated sessions open and hands them out to
+uploading threads:
+
+- A session is created on demand; at most `size` exist at once and
+  further uploaders wait for one to come back.
+- Each session checks (and creates, if missing) the remote directory once
+  when it is opened, then uploads by file name into it.
+- The transport sends SSH keepalives every `keepalive` seconds so idle
+  sessions survive NAT / firewall timeouts; sessions idle for longer than
+  `idle_timeout` seconds or whose transport died are closed and replaced
+  on the next acquire.
+- An upload that fails on a reused session is retried once on a freshly
+  opened one (the server may have dropped the old connection).
+
+paramiko is optional: without it SFTP upload is unavailable.
+"""
+
+import io
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def sftp_available() -> bool:
+    """SFTP upload needs paramiko."""
+    try:
+        import paramiko  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class _Session:
+    """One open SSH connection with its SFTP channel, inside the remote directory."""
+
+    ssh: Any
+    sftp: Any
+    uploads: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+    def alive(self) -> bool:
+        transport = self.ssh.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close(self) -> None:
+        for closable in (self.sftp, self.ssh):
+            try:
+                closable.close()
+            except Exception:
+                pass
+
+
+class SftpPool:
+    """Thread-safe pool of authenticated SFTP sessions into one remote directory."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        remote_dir: str,
+        size: int = 2,
+        keepalive: int = 30,
+        idle_timeout: float = 300.0,
+    ):
+        """
+        Args:
+            connect: Returns a connected paramiko.SSHClient.
+            remote_dir: Directory uploads are written to.
+            size: Maximum open sessions.
+            keepalive: SSH keepalive interval in seconds (0 = off).
+            idle_timeout: Close sessions unused for this many seconds.
+        """
+        self._connect = connect
+        self._remote_dir = remote_dir.rstrip("/") or "/"
+        self._keepalive = keepalive
+        self._idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._lock = threading.Lock()
+        self._idle: list[_Session] = []
+        self._closed = False
+        self._opened = 0
+        self._reused = 0
+
+    def upload(self, data: bytes, filename: str) -> None:
+        """Write `data` as remote_dir/filename; raises on failure."""
+        with self._session() as session:
+            reused = session.uploads > 0
+            try:
+                self._put(session, data, filename)
+                return
+            except Exception as e:
+                if not reused:
+                    raise
+                logger.info("[sftp_pool] Upload on reused session failed (%s), reconnecting", e)
+                session.close()
+                fresh = self._open()
+                session.ssh, session.sftp, session.uploads = fresh.ssh, fresh.sftp, 0
+            self._put(session, data, filename)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "opened": self._opened, "reused": self._reused}
+
+    def close(self) -> None:
+        """Close idle sessions; sessions in use are closed when returned."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+    @contextmanager
+    def _session(self):
+        """A healthy session for the duration of one upload (broken ones are discarded)."""
+        self._slots.acquire()
+        session = None
+        try:
+            session = self._take_idle() or self._open()
+            yield session
+        except BaseException:
+            if session is not None:
+                session.close()
+                session = None
+            raise
+        finally:
+            if session is not None:
+                self._give_back(session)
+            self._slots.release()
+
+    def _take_idle(self) -> _Session | None:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                session = self._idle.pop()
+            if now - session.last_used <= self._idle_timeout and session.alive():
+                with self._lock:
+                    self._reused += 1
+                return session
+            logger.debug("[sftp_pool] Dropping stale session (%d uploads)", session.uploads)
+            session.close()
+
+    def _give_back(self, session: _Session) -> None:
+        session.last_used = time.monotonic()
+        with self._lock:
+            if not self._closed:
+                self._idle.append(session)
+                return
+        session.close()
+
+    def _open(self) -> _Session:
+        started = time.monotonic()
+        ssh = self._connect()
+        try:
+            transport = ssh.get_transport()
+            if transport is not None and self._keepalive > 0:
+                transport.set_keepalive(self._keepalive)
+            sftp = ssh.open_sftp()
+            self._ensure_remote_dir(sftp)
+            sftp.chdir(self._remote_dir)
+        except BaseException:
+            ssh.close()
+            raise
+        with self._lock:
+            self._opened += 1
+        logger.info("[sftp_pool] Opened SFTP session in %dms", int((time.monotonic() - started) * 1000))
+        return _Session(ssh, sftp)
+
+    def _ensure_remote_dir(self, sftp) -> None:
+        try:
+            sftp.stat(self._remote_dir)
+        except FileNotFoundError:
+            logger.info("[sftp_pool] Creating remote directory %s", self._remote_dir)
+            sftp.mkdir(self._remote_dir)
+
+    @staticmethod
+    def _put(session: _Session, data: bytes, filename: str) -> None:
+        session.sftp.putfo(io.BytesIO(data), filename, file_size=len(data))
+        session.uploads += 1
+
+
+def _connect_from_settings():
+    import paramiko
+
+    settings = get_settings()
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh.connect(
+        settings.image_remote_host,
+        username=settings.image_sftp_username,
+        timeout=10,
+        allow_agent=True,
+        look_for_keys=True,
+    )
+    return ssh
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_pool: SftpPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_sftp_pool() -> SftpPool | None:
+    """Return the process-wide SFTP pool, or None when paramiko is missing."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if not sftp_available():
+                return None
+            settings = get_settings()
+            _pool = SftpPool(
+                _connect_from_settings,
+                settings.image_remote_dir,
+                size=settings.image_sftp_pool_size,
+                keepalive=settings.image_sftp_keepalive,
+                idle_timeout=settings.image_sftp_idle_timeout,
+            )
+        return _pool
+
+
+def shutdown_sftp_pool() -> None:
+    """Close pooled SFTP sessions. Call from lifespan shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
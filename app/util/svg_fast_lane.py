@@ -0,0 +1,321 @@
+"""
+Browserless fast lane for self-contained SVG pages.
+
+Many pages are nothing but one inline <svg> in an otherwise empty document.
+They still pay for a browser context, a page load and a screenshot. With
+render_svg_fast_lane on, classify_svg_page() recognises such pages from the
+source and rasterize_svg_page() draws them in process (cairosvg for the SVG,
+Pillow for the page canvas), reproducing what Chromium would capture: the
+viewport-wide page, its background and the body margins around the SVG.
+
+The classifier only says yes when it is sure, and returns None (render in
+Chromium) for anything it cannot reproduce faithfully:
+
+- markup outside the <svg> other than html/head/body/meta/title/style,
+  or more than one <svg>;
+- page CSS other than margin / padding / background(-color) / box-sizing /
+  overflow on html, body and *, and display on svg;
+- scripts, event handlers, foreignObject, animation, filters, masks,
+  images, textPath, or external references (href / url() that are not
+  #fragments or data: URIs);
+- advanced CSS (@import, @font-face, @media, var(), calc(), animation,
+  blend modes, baseline alignment);
+- text with non-ASCII characters (cairo has no per-glyph font fallback);
+- an SVG without an absolute width and height, or one that does not fit
+  the viewport (wider, or inline and touching the bottom of the first
+  screen, where Chromium adds a line-box gap).
+
+A page that classifies but fails to rasterize (e.g. markup that is valid
+HTML but not XML) also goes to Chromium.
+
+cairosvg and Pillow are optional: without them the fast lane is off.
+"""
+
+import io
+import re
+import math
+from dataclasses import dataclass
+
+# Chromium's default viewport height for renders (see renderer._load_page).
+VIEWPORT_HEIGHT = 800
+# Default <body> margin in Chromium's UA stylesheet.
+_BODY_MARGIN = 8.0
+# Inline SVG sits on the text baseline; keep this much room below it.
+_INLINE_GAP_SLACK = 8.0
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_DOCTYPE_RE = re.compile(r"<!doctype[^>]*>", re.IGNORECASE)
+_SVG_OPEN_RE = re.compile(r"<svg\b", re.IGNORECASE)
+_SVG_RE = re.compile(r"<svg\b([^>]*)>(.*)</svg\s*>", re.IGNORECASE | re.DOTALL)
+_STYLE_BLOCK_RE = re.compile(r"<style\b[^>]*>(.*?)</style\s*>", re.IGNORECASE | re.DOTALL)
+_TITLE_RE = re.compile(r"<title\b[^>]*>.*?</title\s*>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"</?([a-zA-Z][\w:-]*)([^>]*)>")
+_ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_CSS_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_LENGTH_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(px)?\s*$", re.IGNORECASE)
+_TEXT_CONTENT_RE = re.compile(r"<(text|tspan)\b[^>]*>(.*?)</\1\s*>", re.IGNORECASE | re.DOTALL)
+
+_OUTER_TAGS = {"html", "head", "body", "meta"}
+_UNSUPPORTED_TAGS = {
+    "script", "foreignobject", "animate", "animatemotion", "animatetransform", "set",
+    "filter", "mask", "image", "textpath", "switch", "iframe", "video", "audio", "canvas",
+}
+_EVENT_ATTR_RE = re.compile(r"\son[a-z]+\s*=", re.IGNORECASE)
+# href/src that are not fragments or data: URIs, and url() that is not a fragment.
+_EXTERNAL_REF_RE = re.compile(
+    r"""(?:\b(?:xlink:)?href|\bsrc)\s*=\s*["']\s*(?!#|data:)[^"'\s]|url\(\s*["']?\s*(?!#)""", re.IGNORECASE,
+)
+_UNSURE_CSS_RE = re.compile(
+    r"@import|@font-face|@media|@keyframes|@supports|var\(|calc\(|animation|mix-blend-mode"
+    r"|dominant-baseline|alignment-baseline|writing-mode|\bfilter\s*:|\bmask\s*:",
+    re.IGNORECASE,
+)
+
+_UNIVERSAL_SELECTORS = {"*", "*::before", "*::after", "*:before", "*:after"}
+_BOX_PROPS = {"margin", "padding"}
+_PAGE_PROPS = _BOX_PROPS | {"background", "background-color", "box-sizing", "overflow"}
+
+
+def svg_fast_lane_available() -> bool:
+    """Rasterizing needs cairosvg (and its cairo library) plus Pillow."""
+    try:
+        import cairosvg  # noqa: F401
+        import PIL  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+@dataclass
+class SvgPagePlan:
+    """How to draw a classified page: the SVG document and where it sits on the page canvas."""
+
+    svg: str
+    width: float
+    height: float
+    left: float
+    top: float
+    page_width: int
+    page_height: int
+    background: tuple[int, int, int]
+
+
+def classify_svg_page(html_content: str, viewport_width: int) -> SvgPagePlan | None:
+    """A plan for drawing the page without a browser, or None when Chromium must render it."""
+    source = _COMMENT_RE.sub("", html_content)
+    if len(_SVG_OPEN_RE.findall(source)) != 1:
+        return None
+    match = _SVG_RE.search(source)
+    if match is None:
+        return None
+    svg_attrs, svg_body = match.group(1), match.group(2)
+    svg_markup = match.group(0)
+
+    page_css = _page_css(source[:match.start()] + source[match.end():])
+    if page_css is None:
+        return None
+    if not _svg_supported(svg_markup):
+        return None
+    page = _page_style(page_css)
+    if page is None:
+        return None
+
+    attrs = _attrs(svg_attrs)
+    inline_style = _declarations(attrs.get("style", ""))
+    if inline_style is None or set(inline_style) - {"display", "width", "height"}:
+        return None
+    width = _length(inline_style.get("width", attrs.get("width")))
+    height = _length(inline_style.get("height", attrs.get("height")))
+    if not width or not height:
+        return None
+    display = inline_style.get("display", page["svg_display"])
+    if display not in ("inline", "block"):
+        return None
+
+    top, right, bottom, left = (
+        sum(page[element][box][side] for element in ("html", "body") for box in ("margin", "padding"))
+        for side in range(4)
+    )
+    if left + width + right > viewport_width:
+        return None
+    content_height = top + height + bottom
+    if display == "inline" and content_height + _INLINE_GAP_SLACK > VIEWPORT_HEIGHT:
+        return None
+
+    return SvgPagePlan(
+        svg=_standalone_svg(svg_attrs, svg_body),
+        width=width,
+        height=height,
+        left=left,
+        top=top,
+        page_width=viewport_width,
+        page_height=max(VIEWPORT_HEIGHT, math.ceil(content_height)),
+        background=page["background"],
+    )
+
+
+def rasterize_svg_page(plan: SvgPagePlan, scale: float) -> bytes:
+    """Draw the page at `scale` as a PNG (runs in the encode pool)."""
+    import cairosvg
+    from PIL import Image
+
+    art_png = cairosvg.svg2png(
+        bytestring=plan.svg.encode("utf-8"),
+        output_width=round(plan.width * scale),
+        output_height=round(plan.height * scale),
+    )
+    canvas = Image.new("RGB", (round(plan.page_width * scale), round(plan.page_height * scale)), plan.background)
+    with Image.open(io.BytesIO(art_png)) as art:
+        art = art.convert("RGBA")
+        canvas.paste(art, (round(plan.left * scale), round(plan.top * scale)), art)
+    out = io.BytesIO()
+    canvas.save(out, format="PNG")
+    return out.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Classification helpers
+# ---------------------------------------------------------------------------
+
+def _page_css(outside: str) -> str | None:
+    """CSS of the page around the SVG, or None when that markup is more than an empty shell."""
+    css = "\n".join(_STYLE_BLOCK_RE.findall(outside))
+    rest = _DOCTYPE_RE.sub("", _TITLE_RE.sub("", _STYLE_BLOCK_RE.sub("", outside)))
+    for tag, attrs in _TAG_RE.findall(rest):
+        if tag.lower() not in _OUTER_TAGS:
+            return None
+        if tag.lower() in ("html", "body") and set(_attrs(attrs)) - {"lang", "dir"}:
+            return None
+    if _TAG_RE.sub("", rest).strip():
+        return None
+    return css
+
+
+def _svg_supported(svg_markup: str) -> bool:
+    tags = {tag.lower() for tag, _ in _TAG_RE.findall(svg_markup)}
+    if tags & _UNSUPPORTED_TAGS:
+        return False
+    if _EVENT_ATTR_RE.search(svg_markup) or _EXTERNAL_REF_RE.search(svg_markup):
+        return False
+    if _UNSURE_CSS_RE.search(svg_markup):
+        return False
+    for _, text in _TEXT_CONTENT_RE.findall(svg_markup):
+        if not _TAG_RE.sub("", text).isascii():
+            return False
+    return True
+
+
+def _page_style(css: str) -> dict | None:
+    """Resolved html/body boxes, canvas colour and svg display from the page CSS (None if unsure)."""
+    css = _CSS_COMMENT_RE.sub("", css)
+    if _UNSURE_CSS_RE.search(css):
+        return None
+    rules = _CSS_RULE_RE.findall(css)
+    if _CSS_RULE_RE.sub("", css).strip():
+        return None
+
+    universal: dict[str, str] = {}
+    typed: dict[str, dict[str, str]] = {"html": {}, "body": {}, "svg": {}}
+    for selectors, body in rules:
+        declarations = _declarations(body)
+        if declarations is None:
+            return None
+        for selector in (s.strip().lower() for s in selectors.split(",")):
+            if selector in _UNIVERSAL_SELECTORS:
+                if set(declarations) - _BOX_PROPS - {"box-sizing"}:
+                    return None
+                universal.update(declarations)
+            elif selector in ("html", "body"):
+                if set(declarations) - _PAGE_PROPS:
+                    return None
+                typed[selector].update(declarations)
+            elif selector == "svg":
+                if set(declarations) - {"display"}:
+                    return None
+                typed["svg"].update(declarations)
+            else:
+                return None
+
+    page = {"svg_display": typed["svg"].get("display", "inline")}
+    for element in ("html", "body"):
+        declared = {**{k: v for k, v in universal.items() if k in _BOX_PROPS}, **typed[element]}
+        default_margin = _BODY_MARGIN if element == "body" else 0.0
+        margin = _box(declared["margin"]) if "margin" in declared else (default_margin,) * 4
+        padding = _box(declared["padding"]) if "padding" in declared else (0.0,) * 4
+        if margin is None or padding is None:
+            return None
+        page[element] = {"margin": margin, "padding": padding}
+
+    background = (255, 255, 255)
+    for element in ("body", "html"):  # html's background wins; body's propagates otherwise
+        value = typed[element].get("background-color", typed[element].get("background"))
+        if value is not None:
+            background = _color(value)
+            if background is None:
+                return None
+    page["background"] = background
+    return page
+
+
+def _declarations(body: str) -> dict[str, str] | None:
+    declarations = {}
+    for declaration in body.split(";"):
+        if not declaration.strip():
+            continue
+        name, sep, value = declaration.partition(":")
+        if not sep:
+            return None
+        value = value.strip()
+        if value.lower().endswith("!important"):
+            value = value[:-len("!important")].strip()
+        declarations[name.strip().lower()] = value
+    return declarations
+
+
+def _attrs(attrs: str) -> dict[str, str]:
+    return {name.lower(): double or single for name, double, single in _ATTR_RE.findall(attrs)}
+
+
+def _length(value: str | None) -> float | None:
+    match = _LENGTH_RE.match(value or "")
+    return float(match.group(1)) if match else None
+
+
+def _box(value: str) -> tuple[float, float, float, float] | None:
+    """CSS margin/padding shorthand in px (top, right, bottom, left); None for auto, %, em, ..."""
+    parts = [_length(part) for part in value.split()]
+    if not parts or len(parts) > 4 or any(part is None for part in parts):
+        return None
+    if len(parts) == 1:
+        top = right = bottom = left = parts[0]
+    elif len(parts) == 2:
+        top, right, bottom, left = parts[0], parts[1], parts[0], parts[1]
+    elif len(parts) == 3:
+        top, right, bottom, left = parts[0], parts[1], parts[2], parts[1]
+    else:
+        top, right, bottom, left = parts
+    return top, right, bottom, left
+
+
+def _color(value: str) -> tuple[int, int, int] | None:
+    """An opaque CSS colour as RGB, or None (gradients, images, transparency, unknown syntax)."""
+    from PIL import ImageColor
+
+    try:
+        rgb = ImageColor.getrgb(value.strip())
+    except ValueError:
+        return None
+    if len(rgb) == 4 and rgb[3] != 255:
+        return None
+    return rgb[:3]
+
+
+def _standalone_svg(svg_attrs: str, svg_body: str) -> str:
+    """The inline SVG as a standalone document (inline SVG may omit its namespaces)."""
+    attrs = svg_attrs
+    if "xmlns=" not in attrs:
+        attrs += ' xmlns="http://www.w3.org/2000/svg"'
+    if "xlink:" in svg_body + svg_attrs and "xmlns:xlink" not in attrs:
+        attrs += ' xmlns:xlink="http://www.w3.org/1999/xlink"'
+    return f"<svg{attrs}>{svg_body}</svg>"
@@ -0,0 +1,115 @@
+"""
+Tiled capture helpers for very tall pages.
+
+A single full_page screenshot of a long report makes Chromium rasterize
+the whole document into one bitmap, which spikes memory and can exceed
+GPU texture limits (~16k px). Instead, the renderer captures the page in
+clip strips of render_tile_height CSS pixels and feeds them to
+PngStripWriter, which decodes one strip at a time and streams its rows
+into a single zlib-compressed PNG. Peak memory is one decoded strip plus
+the compressed output, independent of page height.
+
+render_max_height caps each output image: taller pages are either
+truncated or split into several images (render_overflow_mode).
+"""
+
+import io
+import zlib
+import struct
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_COLOR_TYPES = {"RGB": 2, "RGBA": 6}
+
+
+def plan_parts(page_height: int, max_height: int, overflow_mode: str) -> tuple[list[tuple[int, int]], bool]:
+    """
+    Split a page into output images.
+
+    Returns:
+        ([(top, height), ...] in CSS pixels, truncated flag).
+    """
+    page_height = max(1, page_height)
+    if max_height <= 0 or page_height <= max_height:
+        return [(0, page_height)], False
+    if overflow_mode == "split":
+        return [(top, min(max_height, page_height - top)) for top in range(0, page_height, max_height)], False
+    return [(0, max_height)], True
+
+
+def plan_strips(top: int, height: int, tile_height: int) -> list[tuple[int, int]]:
+    """Cut one output region into capture strips of at most tile_height."""
+    if tile_height <= 0 or height <= tile_height:
+        return [(top, height)]
+    return [(y, min(tile_height, top + height - y)) for y in range(top, top + height, tile_height)]
+
+
+def tiling_available() -> bool:
+    """Strip stitching decodes screenshots with Pillow."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PngStripWriter:
+    """
+    Stream horizontal image strips into one PNG without holding the full bitmap.
+
+    The output size is only known once every strip has been added, so the
+    IHDR chunk is reserved up front and patched in close(); `out` must be
+    seekable (a file or BytesIO).
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.width = 0
+        self.height = 0
+        self._mode: str | None = None
+        self._header_pos = 0
+        self._compressor = zlib.compressobj(6)
+
+    def add_strip(self, png_bytes: bytes) -> None:
+        """Decode one strip screenshot and append its rows."""
+        from PIL import Image
+
+        with Image.open(io.BytesIO(png_bytes)) as strip:
+            if self._mode is None:
+                self._mode = "RGBA" if strip.mode in ("RGBA", "LA", "P") else "RGB"
+                self.width = strip.width
+                self._header_pos = self.out.tell()
+                self.out.write(b"\0" * (len(_PNG_SIGNATURE) + 25))  # signature + IHDR chunk
+            if strip.width != self.width:
+                raise ValueError(f"Strip width {strip.width} != image width {self.width}")
+            image = strip if strip.mode == self._mode else strip.convert(self._mode)
+            rows = image.height
+            stride = self.width * len(self._mode)
+            raw = image.tobytes()
+
+        # Filter type 0 (None) per row: cheap, and zlib does the heavy lifting.
+        for row in range(rows):
+            self._write_idat(self._compressor.compress(b"\x00" + raw[row * stride:(row + 1) * stride]))
+        self.height += rows
+
+    def close(self) -> None:
+        """Flush the compressed stream, terminate the PNG and fill in IHDR."""
+        if self._mode is None:
+            raise ValueError("No strips were added")
+        self._write_idat(self._compressor.flush())
+        self._write_chunk(b"IEND", b"")
+        end = self.out.tell()
+        self.out.seek(self._header_pos)
+        self.out.write(_PNG_SIGNATURE)
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, _COLOR_TYPES[self._mode], 0, 0, 0)
+        self._write_chunk(b"IHDR", ihdr)
+        self.out.seek(end)
+
+    def _write_idat(self, data: bytes) -> None:
+        if data:
+            self._write_chunk(b"IDAT", data)
+
+    def _write_chunk(self, kind: bytes, data: bytes) -> None:
+        self.out.write(struct.pack(">I", len(data)))
+        self.out.write(kind)
+        self.out.write(data)
+        self.out.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
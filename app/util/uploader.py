@@ -1,14 +1,22 @@
 """
 Image upload + URL generation.
 
-Strategy: try local copy to shared directory first, fall back to SFTP.
+Strategy: write into the shared directory first, fall back to SFTP
+over a pool of persistent sessions (see sftp_pool.py).
+Image bytes come from the in-memory image store when the render kept them
+there (see image_store.py) and are written / streamed to the destination
+without a local file.
+
+upload_bytes() is the same upload for bytes already in hand; the
+write-behind publisher (publisher.py) uses it from its background threads.
 """
 
 import os
-import shutil
 import logging
 
 from ..config import get_settings
+from .image_store import read_image
+from .sftp_pool import get_sftp_pool
 
 logger = logging.getLogger(__name__)
 
@@ -17,32 +25,52 @@ def upload_image(local_path: str) -> dict:
     """
     Upload an image and return an accessible URL.
 
-    Strategy:
-        1. Local shutil.copy2 (if shared directory is mounted).
-        2. Fallback SFTP upload to remote server.
+    Strategy (see upload_bytes):
+        1. Write the bytes into image_local_dir (if the shared directory is mounted).
+        2. Fallback SFTP upload to remote server (pooled session).
 
     Args:
-        local_path: Local image file path.
+        local_path: Local image path (render result local_path; in memory or on disk).
 
     Returns:
         dict: {status, url} or {status, error}.
     """
-    if not os.path.exists(local_path):
+    data = read_image(local_path)
+    if data is None:
         return {"status": "error", "error": f"File not found: {local_path}"}
+    return upload_bytes(data, os.path.basename(local_path))
 
+
+def image_url(filename: str) -> str:
+    """Public URL an uploaded image will be served at."""
+    return get_settings().image_url_base + filename
+
+
+def api_image_url(filename: str) -> str | None:
+    """URL of an image on this API's GET /images/{name} route, or None when image_api_url_base is unset."""
+    base = get_settings().image_api_url_base
+    return base + filename if base else None
+
+
+def upload_bytes(data: bytes, filename: str) -> dict:
+    """
+    Upload image bytes as `filename` (local copy, then SFTP) and return its URL.
+
+    Returns:
+        dict: {status, url} or {status, error}.
+    """
     settings = get_settings()
-    filename = os.path.basename(local_path)
-    image_url = settings.image_url_base + filename
+    url = image_url(filename)
 
     # Strategy 1: local copy
-    if _try_local_copy(local_path, filename, settings.image_local_dir):
-        logger.info("[uploader] Local copy OK: %s -> %s", local_path, image_url)
-        return {"status": "success", "url": image_url}
+    if _try_local_copy(data, filename, settings.image_local_dir):
+        logger.info("[uploader] Local copy OK: %s -> %s", filename, url)
+        return {"status": "success", "url": url}
 
     # Strategy 2: SFTP upload
-    if _try_sftp_upload(local_path, filename, settings):
-        logger.info("[uploader] SFTP upload OK: %s -> %s", local_path, image_url)
-        return {"status": "success", "url": image_url}
+    if _try_sftp_upload(data, filename):
+        logger.info("[uploader] SFTP upload OK: %s -> %s", filename, url)
+        return {"status": "success", "url": url}
 
     return {
         "status": "error",
@@ -50,45 +78,33 @@ def upload_image(local_path: str) -> dict:
     }
 
 
-def _try_local_copy(local_path: str, filename: str, image_local_dir: str) -> bool:
-    """Attempt to copy the file to the local shared image directory."""
+def _try_local_copy(data: bytes, filename: str, image_local_dir: str) -> bool:
+    """Attempt to write the image to the local shared image directory."""
     try:
         if not os.path.isdir(image_local_dir):
             logger.debug("[uploader] Local dir not accessible: %s", image_local_dir)
             return False
 
         dest_path = os.path.join(image_local_dir, filename)
-        shutil.copy2(local_path, dest_path)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, dest_path)
         return True
     except Exception as e:
         logger.debug("[uploader] Local copy failed: %s", e)
         return False
 
 
-def _try_sftp_upload(local_path: str, filename: str, settings) -> bool:
-    """Upload to the remote server via SFTP."""
-    try:
-        import paramiko
-    except ImportError:
+def _try_sftp_upload(data: bytes, filename: str) -> bool:
+    """Upload to the remote server over a pooled SFTP session (see sftp_pool.py)."""
+    pool = get_sftp_pool()
+    if pool is None:
         logger.warning("[uploader] paramiko not installed, SFTP unavailable")
         return False
 
     try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(
-            settings.image_remote_host,
-            username=settings.image_sftp_username,
-            timeout=10,
-            allow_agent=True,
-            look_for_keys=True,
-        )
-
-        sftp = ssh.open_sftp()
-        remote_path = settings.image_remote_dir + filename
-        sftp.put(local_path, remote_path)
-        sftp.close()
-        ssh.close()
+        pool.upload(data, filename)
         return True
     except Exception as e:
         logger.warning("[uploader] SFTP upload failed: %s", e)
@@ -0,0 +1,162 @@
+"""
+Pre-warmed ECharts pages.
+
+Parsing and evaluating the ~1 MB ECharts bundle is a large share of every
+chart render. For each pooled browser, the warm page stock keeps a few
+pages whose context already has ECharts evaluated and instrumented. A
+render takes one of them and writes its HTML into the existing document
+with document.open/write; the Window, and therefore window.echarts,
+survives. Afterwards the render closes the context and the stock is
+refilled in the background, off the render's critical path.
+
+Every stocked page holds a PageLease on its browser (see browser_pool.py),
+so warm pages count against render_pool_max_pages like running renders.
+The refill stops when the pool has no capacity left to lease, and the
+stock of a browser that starts retiring is closed at once so the recycle
+is not held up. Taking a page hands its capacity over to the render.
+
+Pages are single-use on purpose. Top-level let/const bindings, timers and
+chart instances from one render's scripts would otherwise leak into the
+next render (a repeated `const chart = ...` is a SyntaxError).
+
+All methods run on the browser pool loop.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from .browser_pool import BrowserPool, PageLease, get_browser_pool
+from .page_scripts import ECHARTS_INSTRUMENT_JS, ECHARTS_READY_JS
+
+logger = logging.getLogger(__name__)
+
+
+class WarmPageStock:
+    """Per-browser stock of single-use pages with ECharts already evaluated."""
+
+    def __init__(self, pool: BrowserPool, per_browser: int):
+        self.pool = pool
+        self.per_browser = per_browser
+        # id(browser) -> (browser, [(context, page, bundle_url, lease), ...])
+        self._stock: dict[int, tuple[Any, list[tuple[Any, Any, str, PageLease]]]] = {}
+        self._refilling: set[int] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+
+    async def take(self, browser, bundle_url: str, bundle: bytes) -> tuple[Any, Any] | None:
+        """
+        Pop a warm (context, page) for `browser` holding `bundle_url`, or None.
+
+        Always schedules a background refill so the next render finds one.
+        """
+        await self._prune()
+        _, pages = self._stock.setdefault(id(browser), (browser, []))
+        taken = None
+        while pages and taken is None:
+            context, page, url, lease = pages.pop()
+            await self.pool.release_lease(lease)
+            if url == bundle_url and not page.is_closed():
+                taken = (context, page)
+            else:
+                await _close_quietly(context)
+
+        if taken is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        self._schedule_refill(browser, bundle_url, bundle)
+        return taken
+
+    def stats(self) -> dict:
+        return {
+            "warm_pages": sum(len(pages) for _, pages in self._stock.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _prune(self) -> None:
+        """Forget stock that belongs to disconnected (crashed/recycled) browsers."""
+        for key, (browser, _) in list(self._stock.items()):
+            if not browser.is_connected():
+                await self._drop(key)
+
+    async def _drop(self, key: int) -> None:
+        """Close a browser's stock and give its page capacity back."""
+        _, pages = self._stock.pop(key, (None, []))
+        for context, _, _, lease in pages:
+            await _close_quietly(context)
+            await self.pool.release_lease(lease)
+
+    def _schedule_refill(self, browser, bundle_url: str, bundle: bytes) -> None:
+        key = id(browser)
+        if key in self._refilling:
+            return
+        self._refilling.add(key)
+        task = asyncio.get_running_loop().create_task(self._refill(browser, bundle_url, bundle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, browser, bundle_url: str, bundle: bytes) -> None:
+        key = id(browser)
+        try:
+            while browser.is_connected():
+                _, pages = self._stock.setdefault(key, (browser, []))
+                if len(pages) >= self.per_browser:
+                    return
+                lease = self.pool.lease(browser, on_retire=lambda: self._drop(key))
+                if lease is None:
+                    logger.debug("[warm_pages] No page capacity left for a warm page")
+                    return
+                warm = await self._create(browser, bundle)
+                if warm is None or lease.pooled.retiring:
+                    if warm is not None:
+                        await _close_quietly(warm[0])
+                    await self.pool.release_lease(lease)
+                    return
+                self._stock.setdefault(key, (browser, []))[1].append((*warm, bundle_url, lease))
+                logger.debug("[warm_pages] Warm ECharts page ready (%s)", bundle_url)
+        except Exception as e:
+            logger.debug("[warm_pages] Refill stopped: %s", e)
+        finally:
+            self._refilling.discard(key)
+
+    async def _create(self, browser, bundle: bytes) -> tuple[Any, Any] | None:
+        context = None
+        try:
+            context = await browser.new_context(viewport={"width": 1200, "height": 800})
+            page = await context.new_page()
+            await page.add_init_script(ECHARTS_INSTRUMENT_JS)
+            await page.evaluate(ECHARTS_INSTRUMENT_JS)
+            await page.add_script_tag(content=bundle.decode("utf-8"))
+            if not await page.evaluate(ECHARTS_READY_JS):
+                raise RuntimeError("ECharts did not initialize on warm page")
+            return context, page
+        except Exception as e:
+            logger.warning("[warm_pages] Failed to prepare warm page: %s", e)
+            if context is not None:
+                await _close_quietly(context)
+            return None
+
+
+async def _close_quietly(context) -> None:
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+
+_stock: WarmPageStock | None = None
+
+
+def get_warm_page_stock(per_browser: int) -> WarmPageStock:
+    """Return the process-wide WarmPageStock (pool loop only)."""
+    global _stock
+    if _stock is None:
+        _stock = WarmPageStock(get_browser_pool(), per_browser)
+    return _stock
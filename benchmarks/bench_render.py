@@ -0,0 +1,351 @@
+"""
+Render benchmark over a fixed HTML corpus.
+
+Renders every fixture in benchmarks/corpus/ (cards, tables, single and
+multi-chart ECharts dashboards, a long infographic, a CJK poster, and
+single-<svg> pages for the SVG fast lane) through the renderer entry points
+and reports, per mode and concurrency level:
+
+    latency_ms      p50 / p95 / p99 / mean per render, overall and per fixture
+    throughput_rps  successful renders per second of wall time
+    peak_rss_mb     peak resident memory of the process tree (browser included)
+    bytes           output image bytes, total and per fixture
+    phases_p50_ms   median per-phase timings (see render_metrics.py)
+
+Modes:
+    sync   render_html_to_image from `concurrency` threads
+    async  render_html_to_image_async, `concurrency` awaits in flight
+    batch  render_html_batch with `concurrency` fixtures per batch call
+
+Each mode runs in a fresh process so browser start-up and memory do not
+leak between modes. The render cache is disabled; one warm-up pass per
+mode (not measured) launches the browser. Requires Playwright with
+Chromium installed.
+
+The JSON result can be saved (--output) and compared against a previous
+run (--compare) to spot regressions between commits.
+
+Usage:
+    python -m benchmarks.bench_render --iterations 5 --concurrency 1,4
+    python -m benchmarks.bench_render --output before.json
+    python -m benchmarks.bench_render --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+# Fixtures render at 1200px unless listed here.
+VIEWPORTS = {"poster_cjk": 750}
+
+MODES = ("sync", "async", "batch")
+
+
+def load_corpus(names: list[str] | None = None) -> dict[str, tuple[str, int]]:
+    """name -> (html, viewport_width) for the corpus fixtures (all, or `names`)."""
+    corpus = {}
+    for path in sorted(CORPUS_DIR.glob("*.html")):
+        if names and path.stem not in names:
+            continue
+        corpus[path.stem] = (path.read_text(encoding="utf-8"), VIEWPORTS.get(path.stem, 1200))
+    missing = set(names or ()) - set(corpus)
+    if missing:
+        raise ValueError(f"Unknown fixtures: {', '.join(sorted(missing))}")
+    return corpus
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    return {
+        "p50": round(_percentile(samples, 50), 1),
+        "p95": round(_percentile(samples, 95), 1),
+        "p99": round(_percentile(samples, 99), 1),
+        "mean": round(statistics.mean(samples), 1),
+    }
+
+
+class RssSampler:
+    """Samples the resident memory of this process and its children (Chromium) in the background."""
+
+    def __init__(self, interval: float = 0.05):
+        from app.util.render_workers import _tree_rss_mb
+
+        self._rss_mb = _tree_rss_mb
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-rss", daemon=True)
+        self.peak_mb = 0.0
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, self._rss_mb(os.getpid()))
+            self._stop.wait(self._interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self._rss_mb(os.getpid()))
+
+
+# ---------------------------------------------------------------------------
+# Runners (child process)
+# ---------------------------------------------------------------------------
+
+def _timed_sync(html: str, width: int) -> tuple[float, dict]:
+    from app.util.renderer import render_html_to_image
+
+    started = time.perf_counter()
+    result = render_html_to_image(html, width)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def _run_sync(work: list[tuple[str, str, int]], concurrency: int) -> list[tuple[str, float, dict]]:
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timed = list(executor.map(lambda job: _timed_sync(job[1], job[2]), work))
+    return [(name, ms, result) for (name, _, _), (ms, result) in zip(work, timed)]
+
+
+def _run_async(work: list[tuple[str, str, int]], concurrency: int) -> list[tuple[str, float, dict]]:
+    from app.util.renderer import render_html_to_image_async
+
+    async def run_all():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(name, html, width):
+            async with slots:
+                started = time.perf_counter()
+                result = await render_html_to_image_async(html, width)
+                return name, (time.perf_counter() - started) * 1000, result
+
+        return await asyncio.gather(*(one(*job) for job in work))
+
+    return asyncio.run(run_all())
+
+
+def _run_batch(work: list[tuple[str, str, int]], concurrency: int) -> list[tuple[str, float, dict]]:
+    """Every item of a batch is charged the batch's wall time."""
+    from app.util.renderer import render_html_batch
+
+    samples = []
+    for start in range(0, len(work), concurrency):
+        chunk = work[start:start + concurrency]
+        started = time.perf_counter()
+        results = render_html_batch([(html, width) for _, html, width in chunk])
+        ms = (time.perf_counter() - started) * 1000
+        samples.extend((name, ms, result) for (name, _, _), result in zip(chunk, results))
+    return samples
+
+
+RUNNERS = {"sync": _run_sync, "async": _run_async, "batch": _run_batch}
+
+
+def summarize(samples: list[tuple[str, float, dict]], wall_s: float, peak_rss_mb: float) -> dict:
+    """Aggregate (fixture, latency_ms, result) samples of one run."""
+    ok = [(name, ms, result) for name, ms, result in samples if result.get("status") == "success"]
+    errors: dict[str, int] = {}
+    for _, _, result in samples:
+        if result.get("status") != "success":
+            code = result.get("error_code") or "RENDER_FAILED"
+            errors[code] = errors.get(code, 0) + 1
+
+    phases: dict[str, list[float]] = {}
+    for _, _, result in ok:
+        for phase, ms in result.get("timings", {}).items():
+            phases.setdefault(phase, []).append(ms)
+
+    fixtures = {}
+    for name in sorted({name for name, _, _ in samples}):
+        mine = [(ms, result) for n, ms, result in ok if n == name]
+        fixtures[name] = {
+            "latency_ms": latency_summary([ms for ms, _ in mine]),
+            "bytes": round(statistics.mean(r.get("file_size", 0) for _, r in mine)) if mine else 0,
+        }
+
+    return {
+        "renders": len(samples),
+        "failures": len(samples) - len(ok),
+        "errors": errors,
+        "wall_s": round(wall_s, 2),
+        "throughput_rps": round(len(ok) / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency_ms": latency_summary([ms for _, ms, _ in ok]),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "bytes": sum(result.get("file_size", 0) for _, _, result in ok),
+        "phases_p50_ms": {phase: round(statistics.median(ms), 1) for phase, ms in sorted(phases.items())},
+        "fixtures": fixtures,
+    }
+
+
+def run_mode(mode: str, corpus: dict[str, tuple[str, int]], iterations: int, levels: list[int]) -> dict:
+    """Benchmark one mode in this process (settings from env)."""
+    from app.util.browser_pool import shutdown_browser_pool
+    from app.util.render_workers import shutdown_render_workers
+
+    runner = RUNNERS[mode]
+    work = [(name, html, width) for _ in range(iterations) for name, (html, width) in corpus.items()]
+    try:
+        # Warm-up: launches the browser and fills the pools; not measured.
+        runner([(name, html, width) for name, (html, width) in corpus.items()], max(levels))
+
+        results = {}
+        for concurrency in levels:
+            with RssSampler() as rss:
+                started = time.perf_counter()
+                samples = runner(work, concurrency)
+                wall_s = time.perf_counter() - started
+            results[f"c{concurrency}"] = summarize(samples, wall_s, rss.peak_mb)
+        return results
+    finally:
+        shutdown_render_workers()
+        shutdown_browser_pool()
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+# metric path -> True when higher is better
+_COMPARED = {
+    ("latency_ms", "p50"): False,
+    ("latency_ms", "p95"): False,
+    ("latency_ms", "p99"): False,
+    ("throughput_rps",): True,
+    ("peak_rss_mb",): False,
+    ("bytes",): False,
+}
+
+
+def _lookup(data: dict, path: tuple[str, ...]):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(baseline: dict, current: dict, threshold_pct: float = 10.0) -> dict:
+    """
+    Per mode/level metric deltas of `current` against `baseline`.
+
+    Returns {"deltas": {"mode.cN.metric": {before, after, change_pct}}, "regressions": [...]}
+    where a regression is a change of more than `threshold_pct` in the bad direction.
+    """
+    deltas, regressions = {}, []
+    for mode, levels in current.get("modes", {}).items():
+        for level, stats in levels.items():
+            before_stats = _lookup(baseline, ("modes", mode, level))
+            if before_stats is None:
+                continue
+            for path, higher_is_better in _COMPARED.items():
+                before, after = _lookup(before_stats, path), _lookup(stats, path)
+                if not before or after is None:
+                    continue
+                change_pct = round((after - before) / before * 100, 1)
+                label = ".".join((mode, level, *path))
+                deltas[label] = {"before": before, "after": after, "change_pct": change_pct}
+                if (-change_pct if higher_is_better else change_pct) > threshold_pct:
+                    regressions.append(label)
+    return {"deltas": deltas, "regressions": regressions}
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5, help="Renders per fixture per concurrency level")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of: " + ", ".join(MODES))
+    parser.add_argument("--fixtures", default="", help="Comma-separated fixture names (default: whole corpus)")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    names = [n for n in args.fixtures.split(",") if n]
+    levels = [int(n) for n in args.concurrency.split(",") if n]
+    corpus = load_corpus(names)
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, corpus, args.iterations, levels)))
+        return 0
+
+    modes = [m for m in args.modes.split(",") if m]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": args.iterations,
+            "concurrency": levels,
+            "fixtures": {name: {"viewport": width, "html_bytes": len(html.encode())}
+                         for name, (html, width) in corpus.items()},
+        },
+        "modes": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="bench_render_") as output_dir:
+        for mode in modes:
+            env = dict(
+                os.environ,
+                RENDER_CACHE_ENABLED="false",
+                RENDER_USE_LOCAL_ECHARTS="true",
+                RENDER_OUTPUT_DIR=output_dir,
+            )
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_render", "--child", mode,
+                 "--iterations", str(args.iterations), "--concurrency", args.concurrency,
+                 "--fixtures", args.fixtures],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            report["modes"][mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(json.load(f), report, args.threshold)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 1 if report.get("comparison", {}).get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
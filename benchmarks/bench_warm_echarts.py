@@ -0,0 +1,116 @@
+"""
+Warm ECharts page benchmark.
+
+Renders a multi-chart dashboard repeatedly with pre-warmed ECharts pages
+off (RENDER_WARM_ECHARTS_PAGES=0) and on, each in a fresh process, and
+prints per-mode latency percentiles plus the speed-up as JSON.
+
+The render cache is disabled and the local ECharts bundle is used so the
+numbers measure script compile/evaluate cost, not network or cache hits.
+Requires Playwright with Chromium installed.
+
+Usage:
+    python -m benchmarks.bench_warm_echarts --renders 30 --gap-ms 300
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ECHARTS_URL = "https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"
+
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<script src="%(url)s"></script>
+<style>
+body { margin: 0; padding: 24px; background: #f5f7fa; font-family: "Microsoft YaHei", sans-serif; }
+.grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 16px; }
+.chart { height: 280px; background: #fff; border-radius: 8px; }
+</style></head>
+<body><h1>Sales Dashboard</h1><div class="grid">%(divs)s</div>
+<script>
+const months = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'];
+const kinds = ['line', 'bar', 'pie', 'line', 'bar', 'scatter'];
+kinds.forEach((kind, i) => {
+  const chart = echarts.init(document.getElementById('c' + i));
+  const data = months.map((m, j) => Math.round(100 + 80 * Math.sin(i + j)));
+  chart.setOption(kind === 'pie'
+    ? { series: [{ type: 'pie', data: months.slice(0, 5).map((m, j) => ({ name: m, value: data[j] })) }] }
+    : { xAxis: { type: 'category', data: months }, yAxis: { type: 'value' }, series: [{ type: kind, data: data }] });
+});
+</script></body></html>
+""" % {"url": ECHARTS_URL, "divs": "".join(f'<div class="chart" id="c{i}"></div>' for i in range(6))}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(renders: int, gap_ms: int) -> dict:
+    """Render the dashboard `renders` times in this process (settings from env)."""
+    from app.util.renderer import render_html_to_image
+    from app.util.browser_pool import shutdown_browser_pool
+
+    # First render launches the browser (and fills the warm stock); not measured.
+    render_html_to_image(DASHBOARD_HTML, enhanced=True)
+    time.sleep(gap_ms / 1000)
+
+    latencies, failures = [], 0
+    for _ in range(renders):
+        started = time.perf_counter()
+        result = render_html_to_image(DASHBOARD_HTML, enhanced=True)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if result["status"] != "success":
+            failures += 1
+        time.sleep(gap_ms / 1000)
+    shutdown_browser_pool()
+
+    return {
+        "renders": renders,
+        "failures": failures,
+        "p50_ms": round(_percentile(latencies, 50), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "mean_ms": round(statistics.mean(latencies), 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=20)
+    parser.add_argument("--gap-ms", type=int, default=300, help="Idle time between renders (lets the stock refill)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.renders, args.gap_ms)))
+        return 0
+
+    results = {}
+    for label, warm_pages in (("cold", "0"), ("warm", "1")):
+        env = dict(
+            os.environ,
+            RENDER_WARM_ECHARTS_PAGES=warm_pages,
+            RENDER_USE_LOCAL_ECHARTS="true",
+            RENDER_CACHE_ENABLED="false",
+            RENDER_POOL_SIZE="1",
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_warm_echarts", "--child",
+             "--renders", str(args.renders), "--gap-ms", str(args.gap_ms)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        results[label] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    results["p50_speedup"] = round(results["cold"]["p50_ms"] / max(results["warm"]["p50_ms"], 0.1), 2)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Shared test fixtures.
+
+inline_pool stands in for the browser pool: pool jobs run inline on the
+caller's event loop (arun) or on a private one (run) with a placeholder
+browser, so no Chromium is needed.
+
+chromium is a real headless browser (Playwright sync API) for the tests
+that check in-page behaviour; they are skipped when Playwright or its
+Chromium build is not installed.
+"""
+
+import asyncio
+
+import pytest
+
+
+class InlinePool:
+    """Runs pool jobs on a private event loop with a placeholder browser."""
+
+    def __init__(self):
+        self.jobs = 0
+
+    def run(self, job, timeout=None, acquire=True):
+        self.jobs += 1
+        return asyncio.run(job(object() if acquire else None))
+
+    async def arun(self, job, timeout=None, acquire=True):
+        self.jobs += 1
+        return await job(object() if acquire else None)
+
+
+@pytest.fixture
+def inline_pool() -> InlinePool:
+    return InlinePool()
+
+
+@pytest.fixture(scope="module")
+def chromium():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    with sync_api.sync_playwright() as playwright:
+        try:
+            browser = playwright.chromium.launch(headless=True, args=["--no-sandbox"])
+        except Exception as e:
+            pytest.skip(f"Chromium unavailable: {e}")
+        yield browser
+        browser.close()
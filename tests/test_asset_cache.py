@@ -0,0 +1,87 @@
+"""
+Unit tests for the URL-keyed CDN AssetCache.
+
+Usage:
+    pytest tests/test_asset_cache.py -v
+"""
+
+import os
+
+from app.util.asset_cache import ASSET_CACHE_VERSION, AssetCache, read_manifest
+
+
+ECHARTS_URL = "https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"
+
+
+def test_put_then_get_exact_url(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10_000)
+    assert cache.get(ECHARTS_URL) is None
+
+    cache.put(ECHARTS_URL, b"var echarts = {};", "application/javascript")
+    assert cache.get(ECHARTS_URL) == (b"var echarts = {};", "application/javascript")
+    # Keyed by exact URL, not by substring.
+    assert cache.get(ECHARTS_URL + "?v=2") is None
+
+
+def test_entries_live_under_version_dir(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10_000)
+    cache.put(ECHARTS_URL, b"x", "application/javascript")
+    assert cache.cache_dir == os.path.join(str(tmp_path), ASSET_CACHE_VERSION)
+    assert len(os.listdir(cache.cache_dir)) == 2
+
+
+def test_put_replaces_cached_entry(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10_000)
+    cache.put(ECHARTS_URL, b"old", "application/javascript")
+    assert cache.get(ECHARTS_URL)[0] == b"old"
+    cache.put(ECHARTS_URL, b"newer", "application/javascript")
+    assert cache.get(ECHARTS_URL)[0] == b"newer"
+
+
+def test_empty_body_is_a_hit(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10_000)
+    cache.put(ECHARTS_URL, b"", "text/css")
+    assert cache.get(ECHARTS_URL) == (b"", "text/css")
+
+
+def test_entries_visible_to_new_instance(tmp_path):
+    AssetCache(str(tmp_path), max_bytes=10_000).put(ECHARTS_URL, b"abc", "application/javascript")
+    assert AssetCache(str(tmp_path), max_bytes=10_000).get(ECHARTS_URL) == (b"abc", "application/javascript")
+
+
+def test_hits_share_one_body_without_copying(tmp_path):
+    AssetCache(str(tmp_path), max_bytes=10_000).put(ECHARTS_URL, b"abc", "application/javascript")
+    cache = AssetCache(str(tmp_path), max_bytes=10_000)
+    assert cache.get(ECHARTS_URL)[0] is cache.get(ECHARTS_URL)[0]
+
+
+def test_lru_evicts_over_byte_cap(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=250)
+    urls = [f"https://cdn.jsdelivr.net/npm/pkg{i}/index.js" for i in range(3)]
+    cache.put(urls[0], b"x" * 100, "application/javascript")
+    cache.put(urls[1], b"x" * 100, "application/javascript")
+    cache.get(urls[0])
+    cache.put(urls[2], b"x" * 100, "application/javascript")
+
+    assert cache.get(urls[1]) is None
+    assert cache.get(urls[0]) is not None and cache.get(urls[2]) is not None
+    assert cache.stats()["bytes"] == 200
+    assert len(os.listdir(cache.cache_dir)) == 4
+
+
+def test_cap_applies_to_entries_left_by_earlier_runs(tmp_path):
+    urls = [f"https://cdn.jsdelivr.net/npm/pkg{i}/index.js" for i in range(3)]
+    previous = AssetCache(str(tmp_path), max_bytes=10_000)
+    for i, url in enumerate(urls):
+        previous.put(url, b"x" * 100, "application/javascript")
+        os.utime(previous._paths(url)[0], (i, i))
+
+    cache = AssetCache(str(tmp_path), max_bytes=150)
+    assert cache.get(urls[2]) is not None
+    assert cache.get(urls[0]) is None and cache.stats()["entries"] == 1
+
+
+def test_read_manifest_skips_comments_and_blanks(tmp_path):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"# header\n\n{ECHARTS_URL}  # main bundle\n", encoding="utf-8")
+    assert read_manifest(str(manifest)) == [ECHARTS_URL]
@@ -0,0 +1,178 @@
+"""
+Unit tests for the native asyncio render path: render_html_to_image_async
+on the browser pool, the tools' async coroutines (agent.ainvoke) and the
+service's agenerate_image.
+
+The browser pool, page render and agent are replaced with in-process fakes,
+so no Chromium or LLM is needed.
+
+Usage:
+    pytest tests/test_async_render.py -v
+"""
+
+import json
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.agent.service import ImageGenAgenticService
+from app.tool import html_render
+from app.util import renderer
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def async_render(monkeypatch, tmp_path, inline_pool):
+    """Renderer on the inline pool whose page render sleeps on the caller's loop."""
+    state = {"active": 0, "peak": 0}
+
+    async def render_page(browser, html_content, viewport_width, **prepared):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.05)
+        state["active"] -= 1
+        return {"status": "success", "local_path": prepared["local_path"], "width": viewport_width, "height": 10}
+
+    def blocking_run(job, timeout=None, acquire=True):
+        raise AssertionError("async render used the blocking pool API")
+
+    inline_pool.run = blocking_run
+    monkeypatch.setattr(renderer, "get_browser_pool", lambda: inline_pool)
+    monkeypatch.setattr(renderer, "get_render_cache", lambda: None)
+    monkeypatch.setattr(renderer, "get_render_workers", lambda: None)
+    monkeypatch.setattr(renderer, "svg_fast_lane_available", lambda: False)
+    monkeypatch.setattr(renderer, "_render_page", render_page)
+    monkeypatch.setattr(renderer, "_ensure_output_dir", lambda: str(tmp_path))
+    return inline_pool, state
+
+
+class FakeAgent:
+    """Agent whose ainvoke answers with a markdown image; invoke must not be used."""
+
+    def __init__(self):
+        self.configs = []
+
+    def invoke(self, agent_input, config=None):
+        raise AssertionError("async path used agent.invoke")
+
+    async def ainvoke(self, agent_input, config=None):
+        self.configs.append(config)
+        await asyncio.sleep(0)
+        return {"messages": [
+            *agent_input["messages"],
+            AIMessage(content="", tool_calls=[{"name": "generate_html_image", "args": {}, "id": "t1"}]),
+            AIMessage(content="已为您生成图片：\n![card](http://img/a.png)"),
+        ]}
+
+
+# ---------------------------------------------------------------------------
+# Renderer
+# ---------------------------------------------------------------------------
+
+def test_async_render_awaits_the_pool(async_render):
+    pool, _ = async_render
+    result = asyncio.run(renderer.render_html_to_image_async("<div>a</div>", 640))
+    assert result["status"] == "success" and result["width"] == 640
+    assert "queue_ms" in result and pool.jobs == 1
+
+
+def test_async_renders_overlap_on_one_loop(async_render):
+    pool, state = async_render
+
+    async def main():
+        return await asyncio.gather(*(
+            renderer.render_html_to_image_async(f"<div>{i}</div>", 640) for i in range(4)
+        ))
+
+    results = asyncio.run(main())
+    assert [r["status"] for r in results] == ["success"] * 4
+    assert state["peak"] == 4 and pool.jobs == 4
+
+
+def test_async_render_maps_pool_failure_to_error(async_render):
+    pool, _ = async_render
+
+    async def broken_arun(job, timeout=None, acquire=True):
+        raise RuntimeError("browser crashed")
+
+    pool.arun = broken_arun
+    result = asyncio.run(renderer.render_html_to_image_async("<div>a</div>", 640))
+    assert result["status"] == "error" and "browser crashed" in result["error"]
+
+
+# ---------------------------------------------------------------------------
+# Tools
+# ---------------------------------------------------------------------------
+
+def test_tool_coroutine_uses_async_renderer(monkeypatch):
+    calls = []
+
+    async def render_async(html_code, **kwargs):
+        calls.append(kwargs["viewport_width"])
+        return {"status": "success", "local_path": "/tmp/a.png", "width": 800, "height": 600}
+
+    monkeypatch.setattr(html_render, "render_html_to_image_async", render_async)
+    monkeypatch.setattr(html_render, "render_html_to_image", lambda *a, **k: pytest.fail("sync renderer"))
+    monkeypatch.setattr(html_render, "upload_image", lambda path: {"status": "success", "url": "http://img/a.png"})
+
+    result = json.loads(asyncio.run(html_render.generate_html_image.ainvoke({"html_code": "<p>x</p>", "width": 800})))
+    assert result["status"] == "success" and result["image_url"] == "http://img/a.png"
+    assert calls == [800]
+
+
+def test_variants_coroutine_uses_async_batch(monkeypatch):
+    async def batch_async(jobs, output_format=""):
+        return [
+            {"status": "success", "local_path": f"/tmp/{width}.png", "width": width, "height": 10}
+            for _, width in jobs
+        ]
+
+    monkeypatch.setattr(html_render, "render_html_batch_async", batch_async)
+    monkeypatch.setattr(html_render, "render_html_batch", lambda *a, **k: pytest.fail("sync renderer"))
+    monkeypatch.setattr(html_render, "upload_image", lambda path: {"status": "success", "url": "http://img" + path})
+
+    result = json.loads(asyncio.run(html_render.generate_html_image_variants.ainvoke(
+        {"html_codes": ["<p>x</p>"], "widths": [400, 800]},
+    )))
+    assert result["status"] == "success"
+    assert [r["image_url"] for r in result["results"]] == ["http://img/tmp/400.png", "http://img/tmp/800.png"]
+
+
+def test_tool_coroutine_reports_render_errors(monkeypatch):
+    async def render_async(html_code, **kwargs):
+        raise RuntimeError("pool closed")
+
+    monkeypatch.setattr(html_render, "render_html_to_image_async", render_async)
+    result = json.loads(asyncio.run(html_render.generate_html_image.ainvoke({"html_code": "<p>x</p>"})))
+    assert result["status"] == "error" and "pool closed" in result["error"]
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+def test_agenerate_image_runs_the_agent_with_ainvoke():
+    service = ImageGenAgenticService.__new__(ImageGenAgenticService)
+    service.service_name = "test"
+    service.agent = FakeAgent()
+
+    reply = asyncio.run(service.agenerate_image("画一张卡片", conversation_id="conv-1"))
+    assert reply == "已为您生成图片：\n![card](http://img/a.png)"
+    assert service.extract_image_url(reply) == "http://img/a.png"
+    assert service.agent.configs[0]["configurable"]["thread_id"] == "conv-1"
+
+
+def test_agenerate_image_maps_agent_errors():
+    class FailingAgent(FakeAgent):
+        async def ainvoke(self, agent_input, config=None):
+            raise RuntimeError("model down")
+
+    service = ImageGenAgenticService.__new__(ImageGenAgenticService)
+    service.service_name = "test"
+    service.agent = FailingAgent()
+    assert "encountered an error" in asyncio.run(service.agenerate_image("x", conversation_id="conv-1"))
+
@@ -0,0 +1,65 @@
+"""
+Unit tests for the render benchmark corpus and its report helpers
+(benchmarks/bench_render.py). The benchmark itself needs Chromium.
+
+Usage:
+    pytest tests/test_bench_render.py -v
+"""
+
+import pytest
+
+from benchmarks.bench_render import compare, latency_summary, load_corpus, summarize
+from app.util.preflight import PreflightOptions, analyze_html
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def test_corpus_covers_representative_pages():
+    corpus = load_corpus()
+    assert {"card", "table", "chart_single", "dashboard", "infographic_long", "poster_cjk"} <= set(corpus)
+    assert corpus["poster_cjk"][1] == 750 and corpus["card"][1] == 1200
+    with pytest.raises(ValueError):
+        load_corpus(["card", "nope"])
+
+
+@pytest.mark.parametrize("name", sorted(load_corpus()))
+def test_fixtures_pass_preflight(name):
+    html, _ = load_corpus([name])[name]
+    options = PreflightOptions(
+        allowed_hosts={"cdn.jsdelivr.net"},
+        echarts_url="https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js",
+        autofix=False,
+    )
+    assert analyze_html(html, options).issues == []
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def test_summary_percentiles_bytes_and_errors():
+    samples = [("card", float(ms), {"status": "success", "file_size": 10, "timings": {"load": 2.0}})
+               for ms in range(1, 101)]
+    samples.append(("table", 5.0, {"status": "error", "error_code": "RENDER_BUSY"}))
+
+    summary = summarize(samples, wall_s=2.0, peak_rss_mb=300.0)
+    assert summary["latency_ms"] == {"p50": 51.0, "p95": 95.0, "p99": 99.0, "mean": 50.5}
+    assert summary["throughput_rps"] == 50.0
+    assert summary["bytes"] == 1000 and summary["fixtures"]["card"]["bytes"] == 10
+    assert summary["errors"] == {"RENDER_BUSY": 1} and summary["fixtures"]["table"]["latency_ms"] == {}
+    assert summary["phases_p50_ms"] == {"load": 2.0}
+    assert latency_summary([]) == {}
+
+
+def test_compare_flags_regressions_only_past_threshold():
+    def run(p95, rps):
+        return {"modes": {"sync": {"c4": {"latency_ms": {"p50": 100, "p95": p95, "p99": 300},
+                                          "throughput_rps": rps, "peak_rss_mb": 500, "bytes": 1000}}}}
+
+    result = compare(run(p95=200, rps=10.0), run(p95=260, rps=9.5))
+    assert result["deltas"]["sync.c4.latency_ms.p95"]["change_pct"] == 30.0
+    assert result["regressions"] == ["sync.c4.latency_ms.p95"]
+    assert compare(run(200, 10.0), run(150, 15.0))["regressions"] == []
+    assert compare({"modes": {}}, run(200, 10.0)) == {"deltas": {}, "regressions": []}
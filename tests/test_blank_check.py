@@ -0,0 +1,79 @@
+"""
+Unit tests for pixel-based blank image detection (blank_check.py) and the
+renderer's blank-image error.
+
+Usage:
+    pytest tests/test_blank_check.py -v
+"""
+
+import io
+import asyncio
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image, ImageDraw  # noqa: E402
+
+from app.util import renderer  # noqa: E402
+from app.util.blank_check import analyze_image  # noqa: E402
+
+
+def to_png(image) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_solid_page_is_blank():
+    stats = analyze_image(to_png(Image.new("RGB", (1200, 900), (255, 255, 255))))
+    assert stats["blank"] is True
+    assert stats["background"] == "#ffffff"
+    assert stats["content_bbox"] is None
+
+
+def test_noisy_background_is_blank():
+    noise = Image.effect_noise((1200, 900), 12).convert("RGB")
+    page = Image.blend(Image.new("RGB", (1200, 900), (240, 240, 245)), noise, 0.2)
+    assert analyze_image(to_png(page))["blank"] is True
+
+
+def test_transparent_page_is_blank():
+    assert analyze_image(to_png(Image.new("RGBA", (300, 200), (0, 0, 0, 0))))["blank"] is True
+
+
+def test_small_legitimate_image_passes():
+    badge = Image.new("RGB", (120, 60), (255, 255, 255))
+    ImageDraw.Draw(badge).text((10, 20), "OK", fill=(0, 0, 0))
+    assert len(to_png(badge)) < 8000  # would fail the old byte-size heuristic
+    assert analyze_image(to_png(badge))["blank"] is False
+
+
+def test_content_bbox_in_screenshot_pixels():
+    page = Image.new("RGB", (1200, 900), (255, 255, 255))
+    ImageDraw.Draw(page).rectangle((600, 300, 899, 599), fill=(30, 90, 200))
+    stats = analyze_image(to_png(page))
+    assert stats["blank"] is False
+    x0, y0, x1, y1 = stats["content_bbox"]
+    assert abs(x0 - 600) <= 5 and abs(y0 - 300) <= 5
+    assert abs(x1 - 900) <= 5 and abs(y1 - 600) <= 5
+
+
+def test_gradient_background_with_small_text_passes():
+    page = Image.new("RGB", (1200, 900))
+    draw = ImageDraw.Draw(page)
+    for y in range(900):
+        shade = 250 - y * 60 // 900
+        draw.line((0, y, 1199, y), fill=(shade, shade, 255))
+    draw.text((40, 40), "Q3 revenue", fill=(20, 20, 40))
+    assert analyze_image(to_png(page))["blank"] is False
+
+
+def test_blank_verdict_codes_with_and_without_pillow(monkeypatch):
+    white = to_png(Image.new("RGB", (1200, 900), (255, 255, 255)))
+    error = asyncio.run(renderer._check_blank_image([white], "<div></div>"))
+    assert error["error_code"] == "BLANK_PAGE"
+
+    monkeypatch.setattr(renderer, "blank_check_available", lambda: False)
+    tiny = to_png(Image.new("RGB", (10, 10), (255, 255, 255)))
+    error = asyncio.run(renderer._check_blank_image([tiny], "<div></div>"))
+    assert error["error_code"] == "FILE_TOO_SMALL"
@@ -0,0 +1,211 @@
+"""
+Unit tests for BrowserPool slot management.
+
+Chromium is replaced by a fake browser, so these tests do not require
+Playwright or a browser binary.
+
+Usage:
+    pytest tests/test_browser_pool.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from app.util.browser_pool import BrowserPool, _PooledBrowser
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class FakeBrowser:
+    def __init__(self, index: int):
+        self.index = index
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def close(self) -> None:
+        self.closed = True
+        self.connected = False
+
+
+def make_pool(**kwargs) -> tuple[BrowserPool, list[FakeBrowser]]:
+    pool = BrowserPool(**kwargs)
+    launched: list[FakeBrowser] = []
+
+    async def fake_launch(slot: int) -> _PooledBrowser:
+        browser = FakeBrowser(len(launched))
+        launched.append(browser)
+        pool._launches += 1
+        return _PooledBrowser(slot=slot, browser=browser)
+
+    pool._launch = fake_launch
+    return pool, launched
+
+
+async def echo_browser(browser):
+    return browser
+
+
+@pytest.fixture
+def pool_factory():
+    pools: list[BrowserPool] = []
+
+    def _factory(**kwargs):
+        pool, launched = make_pool(**kwargs)
+        pools.append(pool)
+        return pool, launched
+
+    yield _factory
+    for pool in pools:
+        pool.close()
+
+
+# ---------------------------------------------------------------------------
+# Reuse / recycling / health
+# ---------------------------------------------------------------------------
+
+def test_sequential_renders_reuse_warm_browser(pool_factory):
+    pool, launched = pool_factory(size=2, max_renders=100)
+    first = pool.run(echo_browser, timeout=5)
+    second = pool.run(echo_browser, timeout=5)
+    assert first is second
+    assert len(launched) == 1
+
+
+def test_browser_recycled_after_max_renders(pool_factory):
+    pool, launched = pool_factory(size=1, max_renders=2)
+    browsers = [pool.run(echo_browser, timeout=5) for _ in range(3)]
+    assert browsers[0] is browsers[1]
+    assert browsers[2] is not browsers[0]
+    assert launched[0].closed
+    assert pool.stats()["recycles"] == 1
+
+
+def test_disconnected_browser_is_replaced(pool_factory):
+    pool, launched = pool_factory(size=1)
+    first = pool.run(echo_browser, timeout=5)
+    first.connected = False
+    second = pool.run(echo_browser, timeout=5)
+    assert second is not first
+    assert len(launched) == 2
+
+
+def test_concurrent_renders_spread_over_slots(pool_factory):
+    pool, launched = pool_factory(size=2, max_pages=1)
+
+    async def slow_job(browser):
+        await asyncio.sleep(0.05)
+        return browser
+
+    futures = [pool.submit(slow_job) for _ in range(4)]
+    results = [f.result(timeout=5) for f in futures]
+    assert len(launched) == 2
+    assert {r.index for r in results} == {0, 1}
+    assert pool.stats()["active_renders"] == 0
+
+
+def test_job_exception_releases_slot(pool_factory):
+    pool, _ = pool_factory(size=1, max_pages=1)
+
+    async def failing_job(browser):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        pool.run(failing_job, timeout=5)
+    assert pool.stats()["active_renders"] == 0
+    assert pool.run(echo_browser, timeout=5) is not None
+
+
+def test_closed_pool_rejects_jobs():
+    pool, _ = make_pool(size=1)
+    pool.run(echo_browser, timeout=5)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.run(echo_browser, timeout=5)
+
+
+# ---------------------------------------------------------------------------
+# Page leases
+# ---------------------------------------------------------------------------
+
+def test_leased_pages_count_against_max_pages(pool_factory):
+    pool, launched = pool_factory(size=1, max_pages=3)
+
+    async def lease_job(browser):
+        return pool.lease(browser, from_job=True)
+
+    leases = [pool.run(lease_job, timeout=5) for _ in range(3)]
+    assert leases[0] is not None and leases[1] is not None
+    assert leases[2] is None  # one page always stays free for renders
+    assert pool.stats()["leased_pages"] == 2
+
+    pool.run(lambda browser: pool.release_lease(leases[0]), timeout=5)
+    pool.run(lambda browser: pool.release_lease(leases[0]), timeout=5)
+    assert pool.stats()["leased_pages"] == 1
+    assert len(launched) == 1
+
+
+def test_recycled_browser_stays_open_until_leases_are_released(pool_factory):
+    pool, launched = pool_factory(size=1, max_renders=1, max_pages=2)
+    retiring = []
+
+    async def lease_job(browser):
+        async def on_retire():
+            retiring.append(browser)
+        return pool.lease(browser, on_retire=on_retire, from_job=True)
+
+    lease = pool.run(lease_job, timeout=5)
+    assert pool.run(echo_browser, timeout=5) is launched[1]
+    assert retiring == [launched[0]] and not launched[0].closed
+
+    pool.run(lambda browser: pool.release_lease(lease), timeout=5)
+    assert launched[0].closed
+    assert pool.stats()["leased_pages"] == 0
+
+
+# ---------------------------------------------------------------------------
+# Async API
+# ---------------------------------------------------------------------------
+
+def test_arun_awaits_job_from_caller_loop(pool_factory):
+    pool, launched = pool_factory(size=1, max_pages=4)
+
+    async def slow_job(browser):
+        await asyncio.sleep(0.05)
+        return browser
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(pool.arun(slow_job, timeout=5) for _ in range(3)))
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    assert all(r is launched[0] for r in results)
+    assert ticks > 3  # the caller's loop kept running while the jobs were in flight
+    assert pool.stats()["active_renders"] == 0
+
+
+def test_arun_timeout_releases_slot(pool_factory):
+    pool, _ = pool_factory(size=1, max_pages=1)
+
+    async def stuck_job(browser):
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(pool.arun(stuck_job, timeout=0.05))
+    assert pool.run(echo_browser, timeout=5) is not None
+    assert pool.stats()["active_renders"] == 0
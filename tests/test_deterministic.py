@@ -0,0 +1,132 @@
+"""
+Unit tests for deterministic render mode (RENDER_DETERMINISTIC): the
+static-style injection, frozen page clocks and seeded Math.random, and the
+effect on the render cache key.
+
+The in-page tests are skipped when Playwright or its Chromium build is not
+installed.
+
+Usage:
+    pytest tests/test_deterministic.py -v
+"""
+
+import os
+import time
+
+import pytest
+
+from app.util import renderer
+from app.util.font_service import inject_style
+from app.util.page_scripts import (
+    DETERMINISTIC_CSS,
+    DETERMINISTIC_EPOCH_MS,
+    DETERMINISTIC_JS,
+    ECHARTS_INSTRUMENT_JS,
+    READY_JS,
+)
+
+ECHARTS_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "static", "echarts.min.js")
+CLOCK_HTML = (
+    "<p id='out' style='font:16px monospace'></p><script>"
+    "document.getElementById('out').textContent = [new Date().toISOString(), Date.now(),"
+    " performance.now(), Math.random()].join(' ');</script>"
+)
+
+PREPARED = {"output_format": "png", "scales": [1.0], "thumbnails": [], "use_enhanced": False}
+
+
+@pytest.fixture
+def deterministic(monkeypatch):
+    monkeypatch.setenv("RENDER_DETERMINISTIC", "true")
+    renderer.get_settings.cache_clear()
+    yield
+    renderer.get_settings.cache_clear()
+
+
+# ---------------------------------------------------------------------------
+# Page scripts
+# ---------------------------------------------------------------------------
+
+def test_static_style_lands_in_head_once():
+    page = "<html><head><title>t</title></head><body><p>x</p></body></html>"
+    styled = inject_style(page, DETERMINISTIC_CSS, "__lumi_static__")
+    assert styled.index('id="__lumi_static__"') < styled.index("</head>")
+    assert "animation-duration:0s" in styled
+    # Font styles use their own id and coexist with the static style.
+    both = inject_style(styled, "@font-face{}")
+    assert 'id="__lumi_fonts__"' in both and 'id="__lumi_static__"' in both
+
+
+def test_scripts_share_the_no_animation_flag():
+    assert "__LUMI_NO_ANIMATION__" in DETERMINISTIC_JS
+    assert "__LUMI_NO_ANIMATION__" in ECHARTS_INSTRUMENT_JS
+    assert "Math.random" in DETERMINISTIC_JS
+
+
+def test_probes_time_with_the_real_clock():
+    assert str(DETERMINISTIC_EPOCH_MS) in DETERMINISTIC_JS
+    for script in (ECHARTS_INSTRUMENT_JS, READY_JS):
+        assert "__LUMI_NOW__" in script
+
+
+# ---------------------------------------------------------------------------
+# In-page behaviour (Chromium)
+# ---------------------------------------------------------------------------
+
+def _deterministic_page(chromium):
+    context = chromium.new_context(viewport={"width": 640, "height": 200})
+    page = context.new_page()
+    page.add_init_script(ECHARTS_INSTRUMENT_JS)
+    page.add_init_script(DETERMINISTIC_JS)
+    page.evaluate(ECHARTS_INSTRUMENT_JS)
+    page.evaluate(DETERMINISTIC_JS)
+    return context, page
+
+
+def test_clocks_and_random_are_frozen_across_renders(chromium):
+    texts, shots = [], []
+    for _ in range(2):
+        context, page = _deterministic_page(chromium)
+        page.set_content(CLOCK_HTML, wait_until="load")
+        texts.append(page.inner_text("#out"))
+        shots.append(page.screenshot())
+        context.close()
+        time.sleep(0.05)
+
+    assert texts[0] == texts[1]
+    assert texts[0].startswith(f"2024-01-01T00:00:00.000Z {DETERMINISTIC_EPOCH_MS} 0 ")
+    assert shots[0] == shots[1]
+
+
+def test_chart_readiness_survives_frozen_clocks(chromium):
+    context, page = _deterministic_page(chromium)
+    try:
+        page.set_content("<div id='c' style='width:300px;height:200px'></div>", wait_until="load")
+        page.add_script_tag(path=ECHARTS_PATH)
+        page.add_script_tag(content=(
+            "echarts.init(document.getElementById('c')).setOption({"
+            " xAxis: {data: ['a', 'b']}, yAxis: {}, series: [{type: 'bar', data: [1, 2]}]});"
+        ))
+        handle = page.wait_for_function(
+            READY_JS, arg={"autoCharts": True, "settleMs": 100, "idleMs": None}, timeout=5000,
+        )
+        assert handle.json_value() == "charts"
+    finally:
+        context.close()
+
+
+# ---------------------------------------------------------------------------
+# Cache key
+# ---------------------------------------------------------------------------
+
+def test_output_variant_marks_deterministic_renders(deterministic):
+    assert "|det" in renderer._output_variant(PREPARED)
+
+
+def test_output_variant_unchanged_by_default(monkeypatch):
+    monkeypatch.delenv("RENDER_DETERMINISTIC", raising=False)
+    renderer.get_settings.cache_clear()
+    try:
+        assert "det" not in renderer._output_variant(PREPARED)
+    finally:
+        renderer.get_settings.cache_clear()
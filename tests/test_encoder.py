@@ -0,0 +1,98 @@
+"""
+Unit tests for output encoding (encoder.py).
+
+Encodes a synthetic screenshot in memory; no browser is needed.
+
+Usage:
+    pytest tests/test_encoder.py -v
+"""
+
+import io
+import asyncio
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+from app.util.encoder import (  # noqa: E402
+    encode_image,
+    encode_image_async,
+    encode_variants,
+    resolve_output_format,
+)
+
+
+def make_png(width: int = 200, height: int = 120) -> bytes:
+    image = Image.new("RGBA", (width, height), (255, 255, 255, 255))
+    for x in range(0, width, 10):
+        for y in range(height):
+            image.putpixel((x, y), (30, 90, 200, 255))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# resolve_output_format
+# ---------------------------------------------------------------------------
+
+def test_resolve_aliases_and_case():
+    assert resolve_output_format("JPG") == "jpeg"
+    assert resolve_output_format(" webp ") == "webp"
+
+
+def test_resolve_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        resolve_output_format("gif")
+
+
+# ---------------------------------------------------------------------------
+# encode_image
+# ---------------------------------------------------------------------------
+
+def test_png_is_passed_through():
+    png = make_png()
+    assert encode_image(png, "png", 85) is png
+
+
+@pytest.mark.parametrize("fmt, pil_format", [
+    ("png_optimized", "PNG"),
+    ("png_quantized", "PNG"),
+    ("webp", "WEBP"),
+    ("jpeg", "JPEG"),
+])
+def test_formats_round_trip(fmt, pil_format):
+    data = encode_image(make_png(), fmt, 85)
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == pil_format
+        assert image.size == (200, 120)
+
+
+def test_lossless_webp_keeps_pixels():
+    png = make_png()
+    with Image.open(io.BytesIO(encode_image(png, "webp", 100))) as decoded, \
+            Image.open(io.BytesIO(png)) as original:
+        assert decoded.convert("RGBA").tobytes() == original.convert("RGBA").tobytes()
+
+
+def test_encode_async_reports_time(monkeypatch):
+    monkeypatch.setattr("app.util.encoder.get_encode_executor", lambda: None)
+    data, encode_ms = asyncio.run(encode_image_async(make_png(), "jpeg"))
+    assert data[:2] == b"\xff\xd8"
+    assert encode_ms >= 0
+
+
+# ---------------------------------------------------------------------------
+# encode_variants
+# ---------------------------------------------------------------------------
+
+def test_variants_downsample_from_one_decode():
+    png = make_png(400, 240)
+    blobs = encode_variants(png, [(400, 240), (200, 120), (100, 60)], "png", 85)
+    assert blobs[0] is png  # source size in png format is passed through
+    sizes = []
+    for blob in blobs[1:]:
+        with Image.open(io.BytesIO(blob)) as image:
+            sizes.append(image.size)
+    assert sizes == [(200, 120), (100, 60)]
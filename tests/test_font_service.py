@@ -0,0 +1,89 @@
+"""
+Unit tests for the local font subsetting service (font_service.py).
+
+Subsetting tests use DejaVu Sans when it is installed.
+
+Usage:
+    pytest tests/test_font_service.py -v
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from app.util import font_service
+from app.util.font_service import FontService, inject_style, page_chars, parse_font_map
+
+DEJAVU = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+# ---------------------------------------------------------------------------
+# Page analysis
+# ---------------------------------------------------------------------------
+
+def test_parse_font_map():
+    assert parse_font_map("Microsoft YaHei=/a.ttc, SimHei = /b.ttc,broken") == {
+        "Microsoft YaHei": "/a.ttc",
+        "SimHei": "/b.ttc",
+    }
+
+
+def test_page_chars_decodes_entities_and_adds_ascii():
+    chars = page_chars("<p>销售&amp;利润 &#x4E2D;</p>")
+    assert {"销", "售", "利", "润", "中", "&", "A", "0"} <= set(chars)
+    assert "\n" not in chars
+    assert chars == "".join(sorted(chars))
+
+
+def test_primary_family_per_declaration(tmp_path):
+    a, b = tmp_path / "a.ttf", tmp_path / "b.ttf"
+    a.write_bytes(b"x")
+    b.write_bytes(b"x")
+    fonts = FontService({"Microsoft YaHei": str(a), "SimHei": str(b), "Missing": "/nope.ttf"}, str(tmp_path))
+    assert "Missing" not in fonts.font_map
+
+    css = '<style>body { font-family: "Microsoft YaHei", "SimHei", sans-serif; }</style>'
+    assert [f for f, _ in fonts.families_for(css)] == ["Microsoft YaHei"]
+    chart = "<script>textStyle: { fontFamily: 'SimHei', fontSize: 12 }</script>"
+    assert [f for f, _ in fonts.families_for(css + chart)] == ["Microsoft YaHei", "SimHei"]
+    assert fonts.families_for('<style>body { font-family: Arial; }</style>') == []
+
+
+def test_inject_style_keeps_doctype_first():
+    page = "<!DOCTYPE html><html><head><meta charset='utf-8'></head><body>x</body></html>"
+    assert inject_style(page, "X").startswith("<!DOCTYPE html><html><head><style id=\"__lumi_fonts__\">X</style>")
+    assert inject_style("<div>x</div>", "X") == '<style id="__lumi_fonts__">X</style><div>x</div>'
+
+
+# ---------------------------------------------------------------------------
+# Subsetting
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    async def run_in_thread(func, *args):
+        return await asyncio.to_thread(func, *args)
+
+    monkeypatch.setattr(font_service, "run_in_encode_pool", run_in_thread)
+
+
+@pytest.mark.skipif(not os.path.isfile(DEJAVU), reason="DejaVu Sans not installed")
+def test_subset_covers_page_chars_and_is_cached(tmp_path, inline_pool):
+    pytest.importorskip("fontTools")
+    from fontTools.ttLib import TTFont
+
+    fonts = FontService({"Microsoft YaHei": DEJAVU}, str(tmp_path))
+    page = '<div style="font-family: \'Microsoft YaHei\'">Café — ÅØ</div>'
+    plan = asyncio.run(fonts.prepare(page))
+    assert "@font-face" in plan.css and '"Microsoft YaHei"' in plan.css
+    (url, key), = plan.urls.items()
+    assert url.startswith(font_service.FONT_URL_PREFIX)
+
+    data = fonts.get(key)
+    assert len(data) < os.path.getsize(DEJAVU) / 5
+    cmap = TTFont(os.path.join(str(tmp_path), f"{key}.ttf")).getBestCmap()
+    assert all(ord(c) in cmap for c in "CaféÅØ—")
+
+    assert asyncio.run(fonts.prepare(page)).urls == plan.urls
+    assert fonts.stats()["builds"] == 1 and fonts.stats()["hits"] == 1
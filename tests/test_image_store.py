@@ -0,0 +1,101 @@
+"""
+Unit tests for the in-memory image store (image_store.py) and the
+zero-disk paths that read from it (uploader, render cache, render workers).
+
+Usage:
+    pytest tests/test_image_store.py -v
+"""
+
+import os
+
+from app.util import image_store, renderer, uploader
+from app.util.image_store import ImageStore, read_image
+from app.util.render_cache import RenderCache
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+def test_lru_spills_to_disk_over_budget(tmp_path):
+    store = ImageStore(max_bytes=250)
+    paths = [str(tmp_path / f"{i}.png") for i in range(3)]
+    for path in paths:
+        store.put(path, b"x" * 100)
+
+    assert store.get(paths[0]) is None
+    with open(paths[0], "rb") as f:
+        assert f.read() == b"x" * 100
+    assert not os.path.exists(paths[1]) and store.get(paths[1]) == b"x" * 100
+    assert store.stats() == {"images": 2, "bytes": 200, "spilled": 1, "dropped": 0}
+
+
+def test_oversized_image_dropped_without_spill(tmp_path):
+    store = ImageStore(max_bytes=10, spill_to_disk=False)
+    path = str(tmp_path / "big.png")
+    store.put(path, b"x" * 100)
+    assert store.get(path) is None and not os.path.exists(path)
+    assert store.stats()["dropped"] == 1
+
+
+def test_read_image_prefers_memory_and_falls_back_to_disk(monkeypatch, tmp_path):
+    store = ImageStore(max_bytes=1000)
+    monkeypatch.setattr(image_store, "get_image_store", lambda: store)
+    on_disk = tmp_path / "disk.png"
+    on_disk.write_bytes(b"disk")
+    store.put(str(tmp_path / "mem.png"), b"mem")
+
+    assert read_image(str(tmp_path / "mem.png")) == b"mem"
+    assert read_image(str(on_disk)) == b"disk"
+    assert read_image(str(tmp_path / "missing.png")) is None
+
+
+# ---------------------------------------------------------------------------
+# Consumers
+# ---------------------------------------------------------------------------
+
+def test_upload_from_memory(monkeypatch, tmp_path):
+    store = ImageStore(max_bytes=1000)
+    monkeypatch.setattr(image_store, "get_image_store", lambda: store)
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    monkeypatch.setenv("IMAGE_LOCAL_DIR", str(shared))
+    monkeypatch.setenv("IMAGE_URL_BASE", "http://img/")
+    uploader.get_settings.cache_clear()
+    try:
+        path = str(tmp_path / "out" / "a.png")  # directory never created
+        store.put(path, b"png-bytes")
+        assert uploader.upload_image(path) == {"status": "success", "url": "http://img/a.png"}
+        assert (shared / "a.png").read_bytes() == b"png-bytes"
+    finally:
+        uploader.get_settings.cache_clear()
+
+
+def test_render_cache_stores_in_memory_image(monkeypatch, tmp_path):
+    store = ImageStore(max_bytes=1000)
+    monkeypatch.setattr("app.util.render_cache.get_image_store", lambda: store)
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=10_000, max_entries=10)
+    store.put(str(tmp_path / "leader.png"), b"\x89PNG-bytes")
+
+    cache.store("k", str(tmp_path / "leader.png"), 5, 6)
+    hit = cache.lookup("k", str(tmp_path / "follower.png"))
+    assert hit["file_size"] == len(b"\x89PNG-bytes")
+
+
+def test_worker_images_travel_with_results(monkeypatch, tmp_path):
+    worker_store, api_store = ImageStore(max_bytes=1000), ImageStore(max_bytes=1000)
+    result = {
+        "status": "success", "local_path": "/out/a.png",
+        "variants": [{"local_path": "/out/a.png"}, {"local_path": "/out/a@2x.png"}],
+    }
+    worker_store.put("/out/a.png", b"1x")
+    worker_store.put("/out/a@2x.png", b"2x")
+
+    monkeypatch.setattr(renderer, "get_image_store", lambda: worker_store)
+    sent = renderer._export_images([result])
+    assert worker_store.stats()["images"] == 0
+
+    monkeypatch.setattr(image_store, "get_image_store", lambda: api_store)
+    received = renderer._adopt_images(sent)
+    assert "_images" not in received[0]
+    assert api_store.get("/out/a@2x.png") == b"2x"
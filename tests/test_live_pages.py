@@ -0,0 +1,276 @@
+"""
+Unit tests for conversation-affine live pages (live_pages.py and the
+live render / patch entry points of renderer.py).
+
+Pages, contexts and browsers are small fakes (on a real BrowserPool loop
+where page accounting matters), so no Chromium is needed.
+
+Usage:
+    pytest tests/test_live_pages.py -v
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.util import renderer
+from app.util.browser_pool import BrowserPool, _PooledBrowser
+from app.util.font_service import FontPlan
+from app.util.live_pages import LivePage, LivePageStore
+from app.util.page_scripts import LAYOUT_STABLE_JS, LIVE_PATCH_JS, SET_STYLE_JS
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.routes = []
+        self.styles = []
+
+    def is_closed(self):
+        return self.context.closed
+
+    async def evaluate(self, script, arg=None):
+        if script == LIVE_PATCH_JS:
+            return {"applied": True, "results": [{"op": p["op"], "matched": 1} for p in arg["patches"]]}
+        if script == LAYOUT_STABLE_JS:
+            return {"state": "stable", "waitedMs": 0}
+        if script == SET_STYLE_JS:
+            self.styles.append(arg)
+        return None
+
+    async def route(self, url, handler):
+        self.routes.append(url)
+
+    async def unroute(self, url):
+        self.routes.remove(url)
+
+
+def live_page(browser=None) -> LivePage:
+    context = FakeContext(browser or FakeBrowser())
+    loaded = renderer._LoadedPage(context, FakePage(context), False, 1.0, [], [])
+    return LivePage(loaded, "<div>x</div>", 800, "png", [1.0], [])
+
+
+@pytest.fixture
+def live_pool(monkeypatch, tmp_path):
+    """Real BrowserPool with fake browsers; renders open a fake page and hand it to keep_page."""
+    pools = []
+
+    def _factory(**kwargs):
+        pool = BrowserPool(size=1, **kwargs)
+        launched = []
+
+        async def fake_launch(slot):
+            launched.append(FakeBrowser())
+            return _PooledBrowser(slot=slot, browser=launched[-1])
+
+        async def render_page(browser, html_content, viewport_width, keep_page=None, timer=None, **prepared):
+            context = FakeContext(browser)
+            loaded = renderer._LoadedPage(context, FakePage(context), False, 1.0, [], [])
+            if not await keep_page(loaded):
+                await context.close()
+            return {"status": "success", "local_path": prepared["local_path"], "width": viewport_width, "height": 10}
+
+        async def capture(loaded, html_content):
+            return renderer._Capture([b"png"], {}, False)
+
+        async def write_render(loaded, capture, html_content, local_path, *args):
+            return {"status": "success", "local_path": local_path}
+
+        pool._launch = fake_launch
+        store = LivePageStore(max_pages=8, ttl=60)
+        pools.append((pool, store))
+        monkeypatch.setattr(renderer, "get_browser_pool", lambda: pool)
+        monkeypatch.setattr(renderer, "_live_store", lambda: store)
+        monkeypatch.setattr(renderer, "_render_page", render_page)
+        monkeypatch.setattr(renderer, "_capture_loaded", capture)
+        monkeypatch.setattr(renderer, "_write_render", write_render)
+        monkeypatch.setattr(renderer, "_prepare_fonts", lambda html_content: asyncio.sleep(0))
+        monkeypatch.setattr(renderer, "_ensure_output_dir", lambda: str(tmp_path))
+        return pool, store, launched
+
+    yield _factory
+    for pool, store in pools:
+        if store._sweeper is not None:
+            pool._loop.call_soon_threadsafe(store._sweeper.cancel)
+        pool.close()
+
+
+def pool_call(pool, coro_fn):
+    """Run coro_fn() on the pool loop without taking a slot."""
+    return pool.run(lambda _browser: coro_fn(), timeout=5, acquire=False)
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+def test_put_replaces_previous_page():
+    async def main():
+        store = LivePageStore(max_pages=4, ttl=60)
+        first, second = live_page(), live_page()
+        await store.put("c1", first)
+        await store.put("c1", second)
+        assert first.loaded.context.closed
+        assert await store.get("c1") is second
+
+    asyncio.run(main())
+
+
+def test_lru_cap_evicts_least_recently_used():
+    async def main():
+        store = LivePageStore(max_pages=2, ttl=60)
+        pages = [live_page() for _ in range(3)]
+        await store.put("a", pages[0])
+        await store.put("b", pages[1])
+        await store.get("a")  # refresh: "b" is now least recently used
+        await store.put("c", pages[2])
+        assert pages[1].loaded.context.closed
+        assert await store.get("b") is None
+        assert await store.get("a") is pages[0]
+        assert store.stats()["evicted"] == 1
+
+    asyncio.run(main())
+
+
+def test_idle_page_expires():
+    async def main():
+        store = LivePageStore(max_pages=2, ttl=60)
+        live = live_page()
+        await store.put("c1", live)
+        live.last_used = time.monotonic() - 61
+        assert await store.get("c1") is None
+        assert live.loaded.context.closed
+        assert store.stats()["expired"] == 1
+
+    asyncio.run(main())
+
+
+def test_page_of_recycled_browser_is_dropped():
+    async def main():
+        store = LivePageStore(max_pages=2, ttl=60)
+        browser = FakeBrowser()
+        await store.put("c1", live_page(browser))
+        browser.connected = False
+        assert await store.get("c1") is None
+
+    asyncio.run(main())
+
+
+# ---------------------------------------------------------------------------
+# Renderer entry points
+# ---------------------------------------------------------------------------
+
+def test_patch_validation():
+    assert renderer._validate_patches([{"op": "css", "css": "h1{color:red}"}]) is None
+    assert renderer._validate_patches([{"op": "chart", "option": {"series": []}}]) is None
+    assert renderer._validate_patches([]) is not None
+    assert "op must be" in renderer._validate_patches([{"op": "eval"}])
+    assert "needs 'selector'" in renderer._validate_patches([{"op": "text", "text": "x"}])
+    assert "must be a string" in renderer._validate_patches([{"op": "text", "selector": "h1", "text": 3}])
+    assert "must be an object" in renderer._validate_patches([{"op": "chart", "option": []}])
+
+
+def test_patch_without_live_page(monkeypatch, inline_pool):
+    monkeypatch.setattr(renderer, "get_browser_pool", lambda: inline_pool)
+    monkeypatch.setattr(renderer, "_live_store", lambda: LivePageStore())
+    result = asyncio.run(renderer.patch_live_page_async("c1", [{"op": "css", "css": "h1{color:red}"}]))
+    assert result["error_code"] == "LIVE_PAGE_NOT_FOUND"
+
+
+def test_invalid_patch_rejected_before_render(monkeypatch):
+    monkeypatch.setattr(renderer, "get_browser_pool", lambda: None)
+    result = renderer.patch_live_page("c1", [{"op": "text", "selector": "h1"}])
+    assert result["error_code"] == "INVALID_PATCH"
+
+
+# ---------------------------------------------------------------------------
+# Browser pool accounting
+# ---------------------------------------------------------------------------
+
+def test_live_page_holds_a_lease_until_dropped(live_pool):
+    pool, store, _ = live_pool(max_pages=4)
+    assert renderer.render_live_page("c1", "<div>x</div>", 800)["status"] == "success"
+    assert renderer.render_live_page("c1", "<div>y</div>", 800)["status"] == "success"
+    assert pool.stats()["leased_pages"] == 1
+    assert store.stats()["live_pages"] == 1
+
+    pool_call(pool, lambda: store.drop("c1"))
+    assert pool.stats()["leased_pages"] == 0
+
+
+def test_live_page_not_kept_without_page_capacity(live_pool):
+    pool, store, _ = live_pool(max_pages=1)
+    assert renderer.render_live_page("c1", "<div>x</div>", 800)["status"] == "success"
+    assert store.stats()["live_pages"] == 0
+    assert pool.stats()["leased_pages"] == 0
+
+
+def test_recycled_browser_drops_live_page_then_closes(live_pool):
+    pool, store, launched = live_pool(max_renders=1)
+    renderer.render_live_page("c1", "<div>x</div>", 800)
+    pool.run(lambda browser: asyncio.sleep(0.05), timeout=5)
+
+    assert launched[0].closed
+    assert store.stats()["live_pages"] == 0
+    assert pool.stats()["leased_pages"] == 0
+
+
+def test_patch_runs_without_a_browser_slot(live_pool):
+    pool, store, _ = live_pool(max_pages=2)
+    renderer.render_live_page("c1", "<div id='t'>x</div>", 800)
+    release = asyncio.Event()
+
+    async def hold_slot(browser):
+        await release.wait()
+
+    held = pool.submit(hold_slot)  # the only free page of the only browser
+    result = renderer.patch_live_page("c1", [{"op": "text", "selector": "#t", "text": "y"}])
+    assert result["status"] == "success" and result["patch_count"] == 1
+    pool._loop.call_soon_threadsafe(release.set)
+    held.result(timeout=5)
+
+
+def test_patch_resubsets_fonts_for_new_text(live_pool, monkeypatch):
+    pool, store, _ = live_pool()
+    sources = []
+
+    async def prepare_fonts(html_content):
+        sources.append(html_content)
+        return FontPlan(css=f"/* {len(sources)} */", urls={f"https://lumi-fonts.local/{len(sources)}.ttf": "k"})
+
+    renderer.render_live_page("c1", "<div id='t'>x</div>", 800)
+    monkeypatch.setattr(renderer, "_prepare_fonts", prepare_fonts)
+    renderer.patch_live_page("c1", [{"op": "text", "selector": "#t", "text": "新增文字"}])
+
+    assert "新增文字" in sources[0]
+    page = store._pages["c1"].loaded.page
+    assert page.routes == [f"{renderer.FONT_URL_PREFIX}**"]
+    assert page.styles == [{"id": "__lumi_fonts__", "css": "/* 1 */"}]
@@ -0,0 +1,136 @@
+"""
+Browser-side readiness probes (page_scripts.py) evaluated in real Chromium:
+LAYOUT_STABLE_JS for pure_css pages, and ECHARTS_INSTRUMENT_JS + READY_JS
+for enhanced_web pages (chart 'finished' detection, pages without charts).
+
+The browser tests are skipped when Playwright or its Chromium build is not
+installed.
+
+Usage:
+    pytest tests/test_page_readiness.py -v
+"""
+
+import os
+import time
+
+import pytest
+
+from app.config import get_settings
+from app.util.page_scripts import ECHARTS_INSTRUMENT_JS, LAYOUT_STABLE_JS, READY_JS
+from app.util.renderer import _NO_CHARTS_IDLE_MS, _STABLE_QUIET_FRAMES, _ready_arg
+
+ECHARTS_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "static", "echarts.min.js")
+
+
+@pytest.fixture
+def page(chromium):
+    context = chromium.new_context(viewport={"width": 640, "height": 480})
+    page = context.new_page()
+    yield page
+    context.close()
+
+
+@pytest.fixture
+def instrumented_page(page):
+    page.add_init_script(ECHARTS_INSTRUMENT_JS)
+    return page
+
+
+def _stability(page, timeout_ms: int = 5000) -> dict:
+    return page.evaluate(LAYOUT_STABLE_JS, {"timeoutMs": timeout_ms, "quietFrames": _STABLE_QUIET_FRAMES})
+
+
+def _wait_ready(page, html_content: str, timeout_ms: int = 5000) -> tuple[str, float]:
+    """Run the renderer's READY_JS wait; returns (reason, seconds waited)."""
+    started = time.monotonic()
+    handle = page.wait_for_function(READY_JS, arg=_ready_arg(html_content), timeout=timeout_ms)
+    return handle.json_value(), time.monotonic() - started
+
+
+# ---------------------------------------------------------------------------
+# Layout stability (pure_css)
+# ---------------------------------------------------------------------------
+
+def test_static_page_is_stable_quickly(page):
+    page.set_content("<div style='height:200px'>hello</div>", wait_until="load")
+    result = _stability(page)
+    assert result["state"] == "stable"
+    assert result["waitedMs"] < 1000
+
+
+def test_stable_waits_for_layout_to_stop_changing(page):
+    page.set_content(
+        "<div id='box' style='height:10px'></div>"
+        "<script>let n = 0; const grow = () => {"
+        " document.getElementById('box').style.height = (10 + 20 * ++n) + 'px';"
+        " if (n < 10) setTimeout(grow, 30); }; setTimeout(grow, 30);</script>",
+        wait_until="load",
+    )
+    result = _stability(page)
+    assert result["state"] == "stable"
+    assert page.evaluate("document.getElementById('box').offsetHeight") == 210
+
+
+def test_never_settling_layout_times_out(page):
+    page.set_content(
+        "<div id='box'></div>"
+        "<script>let n = 0; (function grow() {"
+        " document.getElementById('box').style.height = (++n % 400) + 'px';"
+        " requestAnimationFrame(grow); })();</script>",
+        wait_until="load",
+    )
+    started = time.monotonic()
+    result = _stability(page, timeout_ms=300)
+    assert result["state"] == "timeout"
+    assert time.monotonic() - started < 2
+
+
+# ---------------------------------------------------------------------------
+# Chart readiness (enhanced_web)
+# ---------------------------------------------------------------------------
+
+CHART_DIV = "<div id='chart' style='width:400px;height:300px'></div>"
+CHART_SCRIPT = (
+    "echarts.init(document.getElementById('chart')).setOption({"
+    " animationDuration: 300, xAxis: {data: ['a', 'b', 'c']}, yAxis: {},"
+    " series: [{type: 'bar', data: [1, 2, 3]}]});"
+)
+
+def test_ready_arg_skips_idle_shortcut_for_signalling_pages():
+    assert _ready_arg("<div>plain</div>")["idleMs"] == _NO_CHARTS_IDLE_MS
+    assert _ready_arg("<script>window.__LUMI_RENDER_DONE__ = true;</script>")["idleMs"] is None
+    assert _ready_arg("<div></div>")["autoCharts"] == get_settings().render_auto_detect_charts
+
+
+def test_finished_chart_resolves_ready(instrumented_page):
+    page = instrumented_page
+    page.set_content(CHART_DIV, wait_until="domcontentloaded")
+    assert page.evaluate("window.__LUMI_CHARTS__.total") == 0
+    page.add_script_tag(path=ECHARTS_PATH)
+    page.add_script_tag(content=CHART_SCRIPT)
+
+    reason, waited = _wait_ready(page, CHART_DIV + f"<script>{CHART_SCRIPT}</script>")
+    assert reason == "charts"
+    assert waited < 3
+    charts = page.evaluate("window.__LUMI_CHARTS__")
+    assert charts["total"] == 1 and charts["finished"] == 1
+
+
+def test_page_without_charts_does_not_wait_the_full_timeout(instrumented_page):
+    page = instrumented_page
+    html = "<div>no charts here</div><script>document.title = 'x';</script>"
+    page.set_content(html, wait_until="domcontentloaded")
+
+    reason, waited = _wait_ready(page, html, timeout_ms=get_settings().render_ready_timeout_ms)
+    assert reason == "no-charts"
+    assert waited < _NO_CHARTS_IDLE_MS / 1000 + 1.5
+
+
+def test_manual_signal_is_awaited_without_idle_shortcut(instrumented_page):
+    page = instrumented_page
+    html = "<div>late</div><script>setTimeout(() => { window.__LUMI_RENDER_DONE__ = true; }, 1500);</script>"
+    page.set_content(html, wait_until="domcontentloaded")
+
+    reason, waited = _wait_ready(page, html)
+    assert reason == "signal"
+    assert waited >= 1
@@ -0,0 +1,134 @@
+"""
+Unit tests for the static HTML pre-flight analyzer (preflight.py) and its
+use by the renderer entry points.
+
+Usage:
+    pytest tests/test_preflight.py -v
+"""
+
+import pytest
+
+from app.util import renderer
+from app.util.preflight import PreflightOptions, analyze_html
+
+CDN = "https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"
+DEFAULT_SCRIPT = "echarts.init(document.getElementById('main')).setOption({});"
+
+
+def options(**overrides) -> PreflightOptions:
+    values = {"allowed_hosts": {"cdn.jsdelivr.net"}, "echarts_url": CDN}
+    values.update(overrides)
+    return PreflightOptions(**values)
+
+
+def chart_page(head: str = f'<script src="{CDN}"></script>', style: str = "", script: str = "") -> str:
+    return (
+        f"<!DOCTYPE html><html><head>{head}<style>{style}</style></head><body>"
+        f'<div id="main" class="chart"></div>'
+        f"<script>{script or DEFAULT_SCRIPT}</script>"
+        "</body></html>"
+    )
+
+
+def codes(report) -> dict:
+    return {issue.code: issue.severity for issue in report.issues}
+
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+def test_clean_page_passes_unchanged():
+    page = chart_page(style="#main { height: 400px; }")
+    report = analyze_html(page, options())
+    assert report.issues == [] and report.html == page
+
+
+def test_missing_bundle_is_added_to_head():
+    report = analyze_html(chart_page(head="", style=".chart{height:300px}"), options())
+    assert codes(report) == {"ECHARTS_NOT_LOADED": "fixed"}
+    assert report.html.startswith(f'<!DOCTYPE html><html><head><script src="{CDN}"></script>')
+
+    unfixed = analyze_html(chart_page(head="", style=".chart{height:300px}"), options(autofix=False))
+    assert codes(unfixed) == {"ECHARTS_NOT_LOADED": "error"}
+
+
+def test_bundle_from_unlisted_host_is_replaced():
+    other = "https://cdn.bootcdn.net/ajax/libs/echarts/5.4.0/echarts.min.js"
+    report = analyze_html(chart_page(head=f'<script src="{other}"></script>', style="#main{height:1px}"), options())
+    assert codes(report) == {"ECHARTS_HOST_NOT_ALLOWED": "fixed"}
+    assert other not in report.html and CDN in report.html
+    assert analyze_html(chart_page(head=f'<script src="{other}"></script>'), options(local_echarts=True)).html \
+        .count(other) == 1
+
+
+@pytest.mark.parametrize("style, script, sized", [
+    ("", "", False),
+    ("#main { height: 50vh }", "", True),
+    (".box, .chart { flex: 1 }", "", True),
+    ("#main-title { height: 10px }", "", False),
+    ("", "var el = document.getElementById('main'); el.style.height = '300px'; echarts.init(el);", True),
+    ("", "const c = document.getElementById('main'); echarts.init(c).setOption({});", False),
+    ("", "echarts.init(document.querySelector('#main'), null, {height: 300});", True),
+])
+def test_chart_container_size(style, script, sized):
+    report = analyze_html(chart_page(style=style, script=script), options())
+    assert ("CHART_SIZE_MISSING" not in codes(report)) is sized
+    if not sized:
+        assert "__lumiSizeGuard" in report.html
+        assert report.html.index("__lumiSizeGuard") < report.html.index("echarts.init")
+
+
+def test_ready_signal_required_without_chart_detection():
+    page = chart_page(style="#main{height:300px}")
+    assert codes(analyze_html(page, options(auto_detect_charts=False))) == {"READY_SIGNAL_MISSING": "error"}
+    signalled = chart_page(style="#main{height:300px}", script="echarts.init(document.getElementById('main'));"
+                           "window.__LUMI_RENDER_DONE__ = true;")
+    assert analyze_html(signalled, options(auto_detect_charts=False)).issues == []
+
+
+def test_external_scripts_and_images_warn():
+    page = (
+        '<html><head><script src="https://evil.example.com/lib.js"></script>'
+        '<style>.hero { background: url("https://img.example.com/bg.png"); }'
+        '@font-face { src: url(https://fonts.example.com/a.woff2) }</style></head>'
+        '<body><img src="https://cdn.jsdelivr.net/logo.png"><img src="data:image/png;base64,AA">'
+        '<div style="background-image:url(//pics.example.com/x.jpg)">x</div></body></html>'
+    )
+    report = analyze_html(page, options())
+    assert codes(report) == {"SCRIPT_HOST_NOT_ALLOWED": "warning", "EXTERNAL_IMAGE_BLOCKED": "warning"}
+    blocked = next(i for i in report.issues if i.code == "EXTERNAL_IMAGE_BLOCKED").message
+    assert "img.example.com" in blocked and "pics.example.com" in blocked
+    assert "fonts.example.com" not in blocked and "cdn.jsdelivr.net" not in blocked
+    assert analyze_html(page, options(block_external_images=False)).issues[0].code == "SCRIPT_HOST_NOT_ALLOWED"
+
+
+# ---------------------------------------------------------------------------
+# Renderer integration
+# ---------------------------------------------------------------------------
+
+def test_preflight_error_returned_before_render(monkeypatch):
+    pytest.importorskip("playwright.async_api")
+    monkeypatch.setattr(renderer, "_render_cached", lambda *a: pytest.fail("must not render"))
+    monkeypatch.setenv("RENDER_AUTO_DETECT_CHARTS", "false")
+    renderer.get_settings.cache_clear()
+    try:
+        result = renderer.render_html_to_image(chart_page(style="#main{height:300px}"), enhanced=True)
+    finally:
+        renderer.get_settings.cache_clear()
+    assert result["error_code"] == "PREFLIGHT_FAILED"
+    assert result["issues"][0]["code"] == "READY_SIGNAL_MISSING"
+
+
+def test_fixed_html_is_rendered_and_reported(monkeypatch):
+    pytest.importorskip("playwright.async_api")
+    rendered = {}
+
+    def fake_render(html_content, viewport_width, prepared):
+        rendered["html"] = html_content
+        return {"status": "success", "local_path": prepared["local_path"]}
+
+    monkeypatch.setattr(renderer, "_render_cached", fake_render)
+    result = renderer.render_html_to_image(chart_page(head="", style="#main{height:1px}"), enhanced=True)
+    assert CDN in rendered["html"]
+    assert [note["code"] for note in result["preflight"]] == ["ECHARTS_NOT_LOADED"]
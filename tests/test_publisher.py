@@ -0,0 +1,267 @@
+"""
+Unit tests for write-behind image publishing (publisher.py): background
+uploads with retries, per-conversation waits, serving pending images and
+the render tools / agent service using it.
+
+Uploads are replaced with in-process fakes, so no image host is needed.
+
+Usage:
+    pytest tests/test_publisher.py -v
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.agent.service import ImageGenAgenticService
+from app.api import routes
+from app.tool import html_render
+from app.util import image_store
+from app.util import publisher as publisher_module
+from app.util.image_store import ImageStore, hold_images, release_images
+from app.util.publisher import ImagePublisher
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class FakeUpload:
+    """upload(data, filename) that records uploads, fails a set number of times and can be held."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+        self.uploaded = {}
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, data, filename):
+        self.release.wait(5)
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            return {"status": "error", "error": "host unreachable"}
+        self.uploaded[filename] = data
+        return {"status": "success", "url": "http://img/" + filename}
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = ImageStore(max_bytes=10_000)
+    monkeypatch.setattr("app.util.image_store.get_image_store", lambda: store)
+    monkeypatch.setenv("IMAGE_URL_BASE", "http://img/")
+    monkeypatch.setenv("IMAGE_API_URL_BASE", "http://api/api/v1/images/")
+    publisher_module.get_settings.cache_clear()
+    for name in ("a.png", "b.png"):
+        store.put(str(tmp_path / name), b"bytes-" + name.encode())
+    yield tmp_path
+    publisher_module.get_settings.cache_clear()
+
+
+# ---------------------------------------------------------------------------
+# Publisher
+# ---------------------------------------------------------------------------
+
+def test_submit_returns_url_before_upload_and_serves_pending_bytes(store):
+    upload = FakeUpload()
+    upload.release.clear()
+    publisher = ImagePublisher(upload)
+
+    assert publisher.submit("conv", str(store / "a.png")) == "http://api/api/v1/images/a.png"
+    assert publisher.pending("a.png") == b"bytes-a.png"
+    assert upload.uploaded == {}
+
+    upload.release.set()
+    assert publisher.wait("conv", timeout=5) == []
+    assert upload.uploaded == {"a.png": b"bytes-a.png"}
+    assert publisher.pending("a.png") is None
+    publisher.close()
+
+
+def test_missing_image_is_not_queued(store):
+    publisher = ImagePublisher(FakeUpload())
+    assert publisher.submit("conv", str(store / "missing.png")) is None
+    assert publisher.stats()["pending"] == 0
+    publisher.close()
+
+
+def test_failed_upload_is_retried_with_backoff(store):
+    upload = FakeUpload(failures=2)
+    publisher = ImagePublisher(upload, retries=3, backoff=0.01)
+    publisher.submit("conv", str(store / "a.png"))
+
+    assert publisher.wait("conv", timeout=5) == []
+    assert upload.calls == 3
+    assert publisher.stats() == {"pending": 0, "published": 1, "failed": 0, "retried": 2}
+    publisher.close()
+
+
+def test_exhausted_retries_are_reported_once_per_wait(store):
+    publisher = ImagePublisher(FakeUpload(failures=10), retries=1, backoff=0.01)
+    publisher.submit("conv", str(store / "a.png"))
+    publisher.submit("other", str(store / "b.png"))
+
+    failures = publisher.wait("conv", timeout=5)
+    assert failures == [{
+        "status": "error", "error": "host unreachable", "url": "http://api/api/v1/images/a.png", "filename": "a.png",
+    }]
+    assert publisher.wait("conv", timeout=5) == []
+    assert [f["filename"] for f in publisher.wait("other", timeout=5)] == ["b.png"]
+    assert publisher.stats()["failed"] == 2
+    publisher.close()
+
+
+def test_wait_times_out_on_a_stuck_upload(store):
+    upload = FakeUpload()
+    upload.release.clear()
+    publisher = ImagePublisher(upload)
+    publisher.submit("conv", str(store / "a.png"))
+
+    failures = publisher.wait("conv", timeout=0.05)
+    assert failures[0]["error"] == "Publish timed out" and failures[0]["url"] == "http://api/api/v1/images/a.png"
+    upload.release.set()
+    publisher.close()
+
+
+def test_await_published_waits_for_the_conversation(store):
+    upload = FakeUpload()
+    publisher = ImagePublisher(upload, workers=2)
+    publisher.submit("conv", str(store / "a.png"))
+    publisher.submit("conv", str(store / "b.png"))
+
+    assert asyncio.run(publisher.await_published("conv", timeout=5)) == []
+    assert set(upload.uploaded) == {"a.png", "b.png"}
+    publisher.close()
+
+
+# ---------------------------------------------------------------------------
+# Tools, service and route
+# ---------------------------------------------------------------------------
+
+def test_publish_render_queues_inside_a_conversation(store, monkeypatch):
+    upload = FakeUpload()
+    upload.release.clear()
+    publisher = ImagePublisher(upload)
+    monkeypatch.setattr(html_render, "get_image_publisher", lambda: publisher)
+    monkeypatch.setattr(html_render, "upload_image", lambda path: pytest.fail("uploaded synchronously"))
+    render = {"status": "success", "local_path": str(store / "a.png"), "width": 10, "height": 20}
+
+    result = html_render._publish_render(render, "conv")
+    assert result["status"] == "success" and result["image_url"] == "http://api/api/v1/images/a.png"
+    assert upload.uploaded == {}
+
+    upload.release.set()
+    assert publisher.wait("conv", timeout=5) == []
+    publisher.close()
+
+
+def test_publish_render_uploads_synchronously_without_a_conversation(store, monkeypatch):
+    monkeypatch.setattr(html_render, "get_image_publisher", lambda: pytest.fail("queued without a conversation"))
+    monkeypatch.setattr(html_render, "upload_image", lambda path: {"status": "success", "url": "http://img/x.png"})
+    render = {"status": "success", "local_path": str(store / "a.png"), "width": 10, "height": 20}
+    assert html_render._publish_render(render)["image_url"] == "http://img/x.png"
+
+
+def test_store_empties_after_a_published_render(store, monkeypatch):
+    memory = image_store.get_image_store()
+    publisher = ImagePublisher(FakeUpload())
+    monkeypatch.setattr(html_render, "get_image_publisher", lambda: publisher)
+    render = {
+        "status": "success", "local_path": str(store / "a.png"), "width": 10, "height": 20,
+        "variants": [{"local_path": str(store / "a.png")}, {"local_path": str(store / "b.png")}],
+    }
+
+    assert html_render._publish_render(render, "conv")["status"] == "success"
+    assert memory.stats()["images"] == 2  # still readable by check_image_quality
+    assert publisher.wait("conv", timeout=5) == []
+    release_images("conv")
+    assert memory.stats()["images"] == 0 and not list(store.iterdir())
+    publisher.close()
+
+
+def test_store_empties_after_a_synchronous_upload(store, monkeypatch):
+    memory = image_store.get_image_store()
+    monkeypatch.setattr(html_render, "upload_image", lambda path: {"status": "success", "url": "http://img/x.png"})
+    render = {"status": "success", "local_path": str(store / "a.png"), "width": 10, "height": 20}
+    html_render._publish_render(render)
+    assert memory.stats()["images"] == 1 and memory.get(str(store / "a.png")) is None
+
+
+def test_agent_run_releases_its_images(store, monkeypatch):
+    memory = image_store.get_image_store()
+    service = ImageGenAgenticService.__new__(ImageGenAgenticService)
+    service.service_name = "test"
+    service.agent = type("Agent", (), {"invoke": lambda self, agent_input, config: {"messages": []}})()
+    service._build_run_input = lambda query, conversation_id, user_id: ({}, {})
+    service._finish_run = lambda result, conversation_id, start_time, failures: "done"
+    hold_images("conv", [str(store / "a.png"), str(store / "b.png")])
+
+    assert service.generate_image("q", "conv") == "done"
+    assert memory.stats()["images"] == 0
+
+
+def test_final_reply_linking_a_failed_image_is_replaced():
+    service = ImageGenAgenticService.__new__(ImageGenAgenticService)
+    service.service_name = "test"
+    reply = "已为您生成图片：\n![card](http://img/a.png)"
+    result = {"messages": []}
+    failure = {"status": "error", "error": "host unreachable", "url": "http://img/a.png", "filename": "a.png"}
+    service._extract_final_output = lambda result, conversation_id: reply
+
+    assert service._finish_run(result, "conv", datetime.now(), []) == reply
+    assert "publishing the image failed" in service._finish_run(result, "conv", datetime.now(), [failure])
+    other = {**failure, "url": "http://img/b.png"}
+    assert service._finish_run(result, "conv", datetime.now(), [other]) == reply
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    upload = FakeUpload()
+    upload.release.clear()
+    publisher = ImagePublisher(upload)
+    monkeypatch.setattr(routes, "get_image_publisher", lambda: publisher)
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/v1")
+    yield TestClient(app, base_url="http://api"), publisher, upload
+    upload.release.set()
+    publisher.close()
+
+
+def test_image_route_serves_pending_upload(client, store):
+    http, publisher, upload = client
+    url = publisher.submit("conv", str(store / "a.png"))
+
+    response = http.get(url, follow_redirects=False)
+    assert response.status_code == 200 and response.content == b"bytes-a.png"
+    assert response.headers["content-type"] == "image/png"
+    assert upload.uploaded == {}
+
+
+def test_image_route_redirects_published_image(client, store):
+    http, publisher, upload = client
+    url = publisher.submit("conv", str(store / "a.png"))
+    upload.release.set()
+    assert publisher.wait("conv", timeout=5) == []
+
+    response = http.get(url, follow_redirects=False)
+    assert response.status_code == 307 and response.headers["location"] == "http://img/a.png"
+    assert http.get("/api/v1/images/..", follow_redirects=False).status_code == 404
+
+
+def test_image_route_never_redirects_to_itself(client, monkeypatch):
+    http, _, _ = client
+    monkeypatch.setenv("IMAGE_URL_BASE", "http://api/api/v1/images/")
+    publisher_module.get_settings.cache_clear()
+    response = http.get("/api/v1/images/gone.png", follow_redirects=False)
+    assert response.status_code == 404
+
+
+def test_no_write_behind_without_api_url_base(store, monkeypatch):
+    monkeypatch.setenv("IMAGE_API_URL_BASE", "")
+    publisher_module.get_settings.cache_clear()
+    assert publisher_module.get_image_publisher() is None
@@ -0,0 +1,84 @@
+"""
+Unit tests for batch / multi-variant rendering.
+
+The browser pool and page render are replaced with in-process fakes, so
+no Chromium is needed.
+
+Usage:
+    pytest tests/test_render_batch.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from app.util import renderer
+from app.tool.html_render import _batch_result, _pair_variants
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def fake_render(monkeypatch, tmp_path, inline_pool):
+    rendered = []
+
+    async def render_page(browser, html_content, viewport_width, **prepared):
+        rendered.append((html_content, viewport_width))
+        if "boom" in html_content:
+            raise RuntimeError("page crashed")
+        return {"status": "success", "local_path": prepared["local_path"], "width": viewport_width, "height": 10}
+
+    monkeypatch.setattr(renderer, "get_browser_pool", lambda: inline_pool)
+    monkeypatch.setattr(renderer, "get_render_cache", lambda: None)
+    monkeypatch.setattr(renderer, "_render_page", render_page)
+    monkeypatch.setattr(renderer, "_ensure_output_dir", lambda: str(tmp_path))
+    return inline_pool, rendered
+
+
+# ---------------------------------------------------------------------------
+# Renderer
+# ---------------------------------------------------------------------------
+
+def test_batch_renders_all_items_in_one_pool_job(fake_render):
+    pool, rendered = fake_render
+    results = renderer.render_html_batch([("<div>a</div>", 800), ("<div>a</div>", 1200), ("<div>b</div>", 600)])
+    assert [r["width"] for r in results] == [800, 1200, 600]
+    assert pool.jobs == 1
+    assert len(rendered) == 3
+
+
+def test_failing_item_does_not_fail_batch(fake_render):
+    results = renderer.render_html_batch([("<div>ok</div>", 800), ("<div>boom</div>", 800)])
+    assert results[0]["status"] == "success"
+    assert results[1]["status"] == "error"
+    assert "page crashed" in results[1]["error"]
+
+
+def test_async_batch_matches_sync(fake_render):
+    results = asyncio.run(renderer.render_html_batch_async([("<div>a</div>", 640), ("<div>boom</div>", 640)]))
+    assert [r["status"] for r in results] == ["success", "error"]
+
+
+# ---------------------------------------------------------------------------
+# Tool helpers
+# ---------------------------------------------------------------------------
+
+def test_pair_variants():
+    assert _pair_variants(["a"], [800, 1200])[0] == [("a", 800), ("a", 1200)]
+    assert _pair_variants(["a", "b"], None)[0] == [("a", 1200), ("b", 1200)]
+    assert _pair_variants(["a", "b"], [800, 600])[0] == [("a", 800), ("b", 600)]
+    assert _pair_variants(["a", "b", "c"], [800, 600])[1]["status"] == "error"
+    assert _pair_variants([], None)[1]["status"] == "error"
+
+
+def test_batch_result_status():
+    jobs = [("a", 800), ("b", 600)]
+    ok = {"status": "success", "image_url": "u"}
+    failed = {"status": "error", "error": "x"}
+    assert _batch_result(jobs, [ok, ok])["status"] == "success"
+    partial = _batch_result(jobs, [ok, failed])
+    assert partial["status"] == "partial"
+    assert partial["results"][1] == {"index": 1, "viewport_width": 600, **failed}
+    assert _batch_result(jobs, [failed, failed])["status"] == "error"
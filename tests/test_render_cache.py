@@ -0,0 +1,173 @@
+"""
+Unit tests for the content-addressed RenderCache.
+
+These tests only touch a temporary directory; no browser is needed.
+
+Usage:
+    pytest tests/test_render_cache.py -v
+"""
+
+import os
+import threading
+
+from app.util import renderer
+from app.util.render_cache import RenderCache, render_cache_key
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def write_png(path, size: int = 100) -> str:
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG" + b"x" * (size - 4))
+    return str(path)
+
+
+def make_cache(tmp_path, max_bytes: int = 10_000, max_entries: int = 10) -> RenderCache:
+    return RenderCache(str(tmp_path / "cache"), max_bytes=max_bytes, max_entries=max_entries)
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+def test_key_depends_on_all_inputs():
+    base = render_cache_key("<div>a</div>", 1200, True, "1")
+    assert base == render_cache_key("<div>a</div>", 1200, True, "1")
+    assert base != render_cache_key("<div>b</div>", 1200, True, "1")
+    assert base != render_cache_key("<div>a</div>", 800, True, "1")
+    assert base != render_cache_key("<div>a</div>", 1200, False, "1")
+    assert base != render_cache_key("<div>a</div>", 1200, True, "2")
+    assert base != render_cache_key("<div>a</div>", 1200, True, "1", "webp:q85")
+
+
+def test_output_variant_tracks_pipeline_settings(monkeypatch):
+    enhanced = {"output_format": "png", "scales": [1.0], "thumbnails": [], "use_enhanced": True}
+    pure = {**enhanced, "use_enhanced": False}
+
+    def variant(prepared, **env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        renderer.get_settings.cache_clear()
+        try:
+            return renderer._output_variant(prepared)
+        finally:
+            renderer.get_settings.cache_clear()
+
+    base = variant(enhanced)
+    assert variant(enhanced, RENDER_USE_LOCAL_ECHARTS="true") != base
+    assert variant(enhanced, RENDER_BLOCK_EXTERNAL_IMAGES="false") != base
+    assert variant(pure, RENDER_USE_LOCAL_ECHARTS="false") == variant(pure, RENDER_USE_LOCAL_ECHARTS="true")
+
+    monkeypatch.setattr(renderer, "svg_fast_lane_available", lambda: True)
+    assert variant(pure, RENDER_SVG_FAST_LANE="true") != variant(pure, RENDER_SVG_FAST_LANE="false")
+
+
+# ---------------------------------------------------------------------------
+# lookup / store
+# ---------------------------------------------------------------------------
+
+def test_miss_then_hit(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.lookup("k1", str(tmp_path / "out1.png")) is None
+
+    cache.store("k1", write_png(tmp_path / "render.png"), 1200, 900)
+    dest = str(tmp_path / "out2.png")
+    hit = cache.lookup("k1", dest)
+    assert {k: v for k, v in hit.items() if k not in ("timings", "counters")} == {
+        "status": "success", "local_path": dest, "width": 1200, "height": 900,
+        "format": "png", "file_size": 100, "encode_ms": 0, "ready_wait_ms": 0, "cached": True,
+    }
+    assert set(hit["timings"]) == {"cache", "total"} and hit["counters"] == {"cache_hit": 1}
+    assert os.path.getsize(dest) == 100
+
+
+def test_hit_replays_full_render_result(tmp_path, caplog):
+    cache = make_cache(tmp_path)
+    flight, _ = cache.join("k")
+    render = {
+        "status": "success", "local_path": write_png(tmp_path / "leader.png"), "width": 5, "height": 6,
+        "format": "png", "file_size": 100, "encode_ms": 12, "ready_wait_ms": 40, "truncated": True,
+        "page_height": 9000, "timings": {"load": 30.0, "total": 90.0}, "counters": {"images": 1},
+        "queue_ms": 3, "preflight": {"warnings": []},
+    }
+    cache.complete("k", flight, render)
+
+    with caplog.at_level("INFO", logger="app.util.render_metrics"):
+        hit = cache.lookup("k", str(tmp_path / "out.png"))
+    assert hit["truncated"] is True and hit["page_height"] == 9000
+    assert hit["encode_ms"] == 0 and "load" not in hit["timings"]
+    assert "queue_ms" not in hit and "preflight" not in hit
+    assert set(render) - {"queue_ms", "preflight"} <= set(hit)
+    assert '"cache_hit":1' in caplog.text
+
+
+def test_format_round_trips(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("k1", write_png(tmp_path / "render.webp"), 10, 20, "webp")
+    assert cache.lookup("k1", str(tmp_path / "out.webp"))["format"] == "webp"
+
+
+def test_index_reloaded_from_disk(tmp_path):
+    make_cache(tmp_path).store("k1", write_png(tmp_path / "render.png"), 10, 20)
+    fresh = make_cache(tmp_path)
+    assert fresh.lookup("k1", str(tmp_path / "out.png"))["height"] == 20
+
+
+def test_lru_eviction_by_entries(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    src = write_png(tmp_path / "render.png")
+    cache.store("a", src, 1, 1)
+    cache.store("b", src, 1, 1)
+    assert cache.lookup("a", str(tmp_path / "o.png")) is not None  # "a" becomes most recent
+    cache.store("c", src, 1, 1)
+    assert cache.lookup("b", str(tmp_path / "o.png")) is None
+    assert cache.lookup("a", str(tmp_path / "o.png")) is not None
+    assert cache.lookup("c", str(tmp_path / "o.png")) is not None
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.store(key, write_png(tmp_path / f"{key}.png", size=100), 1, 1)
+    assert cache.lookup("a", str(tmp_path / "o.png")) is None
+    assert not os.path.exists(tmp_path / "cache" / "a.img")
+
+
+# ---------------------------------------------------------------------------
+# Single-flight
+# ---------------------------------------------------------------------------
+
+def test_single_flight_followers_share_leader_render(tmp_path):
+    cache = make_cache(tmp_path)
+    flight, is_leader = cache.join("k")
+    assert is_leader
+    follower_flight, follower_is_leader = cache.join("k")
+    assert follower_flight is flight and not follower_is_leader
+
+    results = []
+
+    def follower():
+        leader_result = follower_flight.result(timeout=5)
+        results.append(cache.follow("k", leader_result, str(tmp_path / "follower.png")))
+
+    t = threading.Thread(target=follower)
+    t.start()
+    render = {"status": "success", "local_path": write_png(tmp_path / "leader.png"), "width": 5, "height": 6}
+    cache.complete("k", flight, render)
+    t.join(timeout=5)
+
+    assert results[0]["local_path"] == str(tmp_path / "follower.png")
+    assert results[0]["cached"] is True
+    # Flight is released: the next join leads a new render.
+    assert cache.join("k")[1] is True
+
+
+def test_single_flight_error_is_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    flight, _ = cache.join("k")
+    error = {"status": "error", "error_code": "BLANK_PAGE", "error": "blank"}
+    cache.complete("k", flight, error)
+    assert cache.follow("k", flight.result(), str(tmp_path / "o.png")) == error
+    assert cache.lookup("k", str(tmp_path / "o.png")) is None
@@ -0,0 +1,72 @@
+"""
+Unit tests for per-render phase timings and counters (render_metrics.py).
+
+Usage:
+    pytest tests/test_render_metrics.py -v
+"""
+
+import json
+import logging
+import time
+
+from app.util import renderer
+from app.util.render_metrics import RenderTimer, log_render_metrics
+
+
+# ---------------------------------------------------------------------------
+# Timer
+# ---------------------------------------------------------------------------
+
+def test_phases_accumulate_and_total_covers_them():
+    timer = RenderTimer()
+    for _ in range(2):
+        with timer.phase("screenshot"):
+            time.sleep(0.01)
+    timer.add("ready_wait", 5)
+    timer.count("images", 1)
+    timer.count("images", 2)
+
+    report = timer.report()
+    assert report["timings"]["screenshot"] >= 20
+    assert report["timings"]["ready_wait"] == 5
+    assert report["timings"]["total"] >= report["timings"]["screenshot"]
+    assert report["counters"] == {"images": 3}
+
+
+def test_phase_recorded_when_block_raises():
+    timer = RenderTimer()
+    try:
+        with timer.phase("load"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert "load" in timer.report()["timings"]
+
+
+# ---------------------------------------------------------------------------
+# Results and log line
+# ---------------------------------------------------------------------------
+
+def test_queue_wait_joins_timings():
+    results = [{"status": "success", "timings": {"total": 10.0}}, {"status": "error", "error": "x"}]
+    renderer._with_queue_ms(results, 3.5)
+    assert results[0]["timings"]["queue"] == 3.5
+    assert results[1] == {"status": "error", "error": "x", "queue_ms": 3.5}
+
+
+def test_log_line_is_json(caplog):
+    result = {
+        "status": "error", "error_code": "BLANK_PAGE", "error": "blank",
+        "timings": {"load": 1.5, "total": 2.0}, "counters": {"console_errors": 2},
+    }
+    with caplog.at_level(logging.INFO, logger="app.util.render_metrics"):
+        log_render_metrics(result)
+        log_render_metrics({"status": "success", "cached": True})  # no timings: not logged
+
+    (record,) = caplog.records
+    prefix, payload = record.getMessage().split(" ", 1)
+    assert prefix == "[render_metrics]"
+    assert json.loads(payload) == {
+        "status": "error", "error_code": "BLANK_PAGE",
+        "timings": {"load": 1.5, "total": 2.0}, "counters": {"console_errors": 2},
+    }
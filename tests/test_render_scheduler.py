@@ -0,0 +1,122 @@
+"""
+Unit tests for render admission control (render_scheduler.py).
+
+Usage:
+    pytest tests/test_render_scheduler.py -v
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.util import renderer
+from app.util.render_scheduler import RenderBusy, RenderScheduler
+
+
+# ---------------------------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------------------------
+
+def test_free_slot_admits_immediately():
+    scheduler = RenderScheduler(max_concurrent=2, max_queue=0)
+    with scheduler.slot() as queue_ms:
+        assert queue_ms < 50
+        assert scheduler.stats()["active"] == 1
+    assert scheduler.stats()["active"] == 0
+
+
+def test_full_queue_fails_fast():
+    scheduler = RenderScheduler(max_concurrent=1, max_queue=0)
+    with scheduler.slot():
+        started = time.monotonic()
+        with pytest.raises(RenderBusy):
+            with scheduler.slot():
+                pass
+        assert time.monotonic() - started < 0.5
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_queued_caller_gets_released_slot():
+    scheduler = RenderScheduler(max_concurrent=1, max_queue=1, queue_timeout=5)
+    waited = []
+
+    def waiter():
+        with scheduler.slot() as queue_ms:
+            waited.append(queue_ms)
+
+    with scheduler.slot():
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while scheduler.stats()["queued"] == 0:
+            time.sleep(0.01)
+        time.sleep(0.2)
+    thread.join(5)
+    assert waited and waited[0] >= 150
+    stats = scheduler.stats()
+    assert stats["active"] == 0 and stats["queued"] == 0 and stats["admitted"] == 2
+
+
+def test_queue_wait_times_out():
+    scheduler = RenderScheduler(max_concurrent=1, max_queue=1, queue_timeout=0.1)
+    with scheduler.slot():
+        with pytest.raises(RenderBusy):
+            with scheduler.slot():
+                pass
+    stats = scheduler.stats()
+    assert stats["timeouts"] == 1 and stats["queued"] == 0 and stats["active"] == 0
+
+
+def test_async_slots_share_the_limit():
+    scheduler = RenderScheduler(max_concurrent=2, max_queue=4, queue_timeout=5)
+    peak = 0
+
+    async def render():
+        nonlocal peak
+        async with scheduler.aslot():
+            peak = max(peak, scheduler.stats()["active"])
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await asyncio.gather(*(render() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    stats = scheduler.stats()
+    assert stats["admitted"] == 6 and stats["active"] == 0 and stats["queued"] == 0
+    assert stats["max_queue_ms"] >= 50
+
+
+def test_cancelled_async_waiter_leaves_queue():
+    scheduler = RenderScheduler(max_concurrent=1, max_queue=1, queue_timeout=5)
+
+    async def main():
+        async with scheduler.aslot():
+            async def wait():
+                async with scheduler.aslot():
+                    pass
+            task = asyncio.create_task(wait())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(main())
+    stats = scheduler.stats()
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+# ---------------------------------------------------------------------------
+# Renderer integration
+# ---------------------------------------------------------------------------
+
+def test_renderer_reports_render_busy(monkeypatch, tmp_path):
+    scheduler = RenderScheduler(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(renderer, "get_render_scheduler", lambda: scheduler)
+    monkeypatch.setattr(renderer, "get_render_cache", lambda: None)
+    monkeypatch.setattr(renderer, "_ensure_output_dir", lambda: str(tmp_path))
+    with scheduler.slot():
+        result = renderer.render_html_to_image("<div>a</div>", 800, enhanced=False)
+    assert result["status"] == "error"
+    assert result["error_code"] == "RENDER_BUSY"
@@ -0,0 +1,53 @@
+"""
+Unit tests for multi-resolution output (scale / thumbnail variants).
+
+Usage:
+    pytest tests/test_render_variants.py -v
+"""
+
+import io
+import asyncio
+
+import pytest
+
+from app.util import renderer
+from app.util.image_store import read_image
+
+
+def test_resolve_variants_defaults_and_dedup():
+    assert renderer._resolve_variants(None, None) == ([1.0], [])
+    assert renderer._resolve_variants([2, 1, 2], [640, 320, 640]) == ([2.0, 1.0], [320, 640])
+
+
+@pytest.mark.parametrize("scales, thumbnails", [([0], None), ([5], None), (None, [8]), ([1, 2, 3, 4], [100, 200, 300, 400, 500])])
+def test_resolve_variants_rejects_out_of_range(scales, thumbnails):
+    with pytest.raises(ValueError):
+        renderer._resolve_variants(scales, thumbnails)
+
+
+def test_variant_cache_key_component():
+    base = {"output_format": "png", "scales": [1.0], "thumbnails": [], "use_enhanced": False}
+    assert renderer._output_variant(base) != renderer._output_variant({**base, "scales": [1.0, 2.0]})
+    assert renderer._output_variant(base) != renderer._output_variant({**base, "thumbnails": [320]})
+
+
+def test_write_variants_from_one_capture(monkeypatch, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr("app.util.encoder.get_encode_executor", lambda: None)
+
+    capture = io.BytesIO()
+    Image.new("RGB", (800, 600), (20, 120, 220)).save(capture, format="PNG")  # 2x capture of a 400x300 page
+    local_path = str(tmp_path / "render.png")
+
+    variants, _ = asyncio.run(renderer._write_variants(
+        capture.getvalue(), local_path, "png", scales=[1.0, 2.0], thumbnails=[100], capture_scale=2.0,
+    ))
+
+    assert [(v["kind"], v["width"], v["height"]) for v in variants] == [
+        ("scale", 400, 300), ("scale", 800, 600), ("thumbnail", 100, 75),
+    ]
+    assert variants[0]["local_path"] == local_path
+    assert variants[1]["local_path"] == str(tmp_path / "render@2x.png")
+    for variant in variants:
+        with Image.open(io.BytesIO(read_image(variant["local_path"]))) as image:
+            assert image.size == (variant["width"], variant["height"])
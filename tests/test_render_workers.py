@@ -0,0 +1,133 @@
+"""
+Unit tests for the supervised render worker pool (render_workers.py).
+
+Workers are real spawn-context processes running small fake entry points
+from this module, so no Chromium is needed.
+
+Usage:
+    pytest tests/test_render_workers.py -v
+"""
+
+import os
+import time
+
+import pytest
+
+from app.util import renderer, render_workers
+from app.util.render_workers import RenderWorkerPool, WorkerCrashed, WorkerTimeout
+
+
+# ---------------------------------------------------------------------------
+# Fake worker entry points (must be importable by spawned children)
+# ---------------------------------------------------------------------------
+
+def echo_worker(conn):
+    """Replies with its pid; "hang" sleeps forever, "crash" exits abruptly."""
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            kind, payload = conn.recv()
+        except EOFError:
+            return
+        if kind == "stop":
+            return
+        command = payload["jobs"][0]["html_content"]
+        if command == "hang":
+            time.sleep(3600)
+        if command == "crash":
+            os._exit(1)
+        conn.send(("result", [{"status": "success", "pid": os.getpid()}]))
+
+
+def job(command: str) -> list[dict]:
+    return [{"html_content": command, "viewport_width": 800, "prepared": {}}]
+
+
+@pytest.fixture
+def pool_factory(monkeypatch):
+    monkeypatch.setattr(render_workers, "_KILL_GRACE", 0.5)
+    pools = []
+
+    def make(**kwargs):
+        pool = RenderWorkerPool(target=echo_worker, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+def test_worker_is_reused(pool_factory):
+    pool = pool_factory(size=1)
+    first = pool.run(job("ok"), timeout=10)[0]["pid"]
+    second = pool.run(job("ok"), timeout=10)[0]["pid"]
+    assert first == second != os.getpid()
+    assert pool.stats()["launches"] == 1
+
+
+def test_worker_recycled_after_max_renders(pool_factory):
+    pool = pool_factory(size=1, max_renders=2)
+    pids = [pool.run(job("ok"), timeout=10)[0]["pid"] for _ in range(3)]
+    assert pids[0] == pids[1] != pids[2]
+    assert pool.stats()["recycles"] == 1
+
+
+def test_worker_recycled_above_rss_limit(pool_factory, monkeypatch):
+    monkeypatch.setattr(render_workers, "_tree_rss_mb", lambda pid: 4096.0)
+    pool = pool_factory(size=1, max_rss_mb=1024)
+    first = pool.run(job("ok"), timeout=10)[0]["pid"]
+    assert pool.run(job("ok"), timeout=10)[0]["pid"] != first
+
+
+def test_hung_worker_killed_at_deadline(pool_factory):
+    pool = pool_factory(size=1)
+    started = time.monotonic()
+    with pytest.raises(WorkerTimeout):
+        pool.run(job("hang"), timeout=1)
+    assert time.monotonic() - started < 5
+    stats = pool.stats()
+    assert stats["live"] == 0 and stats["kills"] == 1
+    assert pool.run(job("ok"), timeout=10)[0]["status"] == "success"
+
+
+def test_crashed_worker_replaced(pool_factory):
+    pool = pool_factory(size=1)
+    with pytest.raises(WorkerCrashed):
+        pool.run(job("crash"), timeout=10)
+    assert pool.run(job("ok"), timeout=10)[0]["status"] == "success"
+
+
+def test_tree_rss_of_current_process():
+    if not os.path.isdir("/proc"):
+        pytest.skip("needs /proc")
+    assert render_workers._tree_rss_mb(os.getpid()) > 1
+
+
+# ---------------------------------------------------------------------------
+# Renderer dispatch
+# ---------------------------------------------------------------------------
+
+class FailingWorkers:
+    def __init__(self, error):
+        self.error = error
+
+    def run(self, jobs, timeout):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, code", [
+    (WorkerTimeout("too slow"), "RENDER_TIMEOUT"),
+    (WorkerCrashed("gone"), "WORKER_CRASHED"),
+])
+def test_worker_failures_map_to_error_codes(monkeypatch, tmp_path, error, code):
+    monkeypatch.setattr(renderer, "get_render_workers", lambda: FailingWorkers(error))
+    monkeypatch.setattr(renderer, "get_render_cache", lambda: None)
+    monkeypatch.setattr(renderer, "_ensure_output_dir", lambda: str(tmp_path))
+    result = renderer.render_html_to_image("<div>a</div>", 800, enhanced=False)
+    assert result["status"] == "error"
+    assert result["error_code"] == code
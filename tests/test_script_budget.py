@@ -0,0 +1,155 @@
+"""
+Unit tests for the per-page script time / JS heap watchdog (script_budget.py)
+and the renderer's SCRIPT_BUDGET_EXCEEDED result.
+
+Usage:
+    pytest tests/test_script_budget.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from app.util import renderer
+from app.util.script_budget import ScriptBudgetExceeded, ScriptWatchdog
+
+
+class FakeCDP:
+    """Answers Performance.getMetrics from `samples` (None = main thread busy, never answers)."""
+
+    def __init__(self, samples):
+        self.samples = list(samples)
+        self.sent = []
+
+    async def send(self, method, params=None):
+        self.sent.append(method)
+        if method != "Performance.getMetrics":
+            return {}
+        sample = self.samples.pop(0) if len(self.samples) > 1 else self.samples[0]
+        if sample is None:
+            await asyncio.Event().wait()
+        script_s, heap_mb = sample
+        return {"metrics": [
+            {"name": "ScriptDuration", "value": script_s},
+            {"name": "JSHeapUsedSize", "value": heap_mb * 1024 * 1024},
+        ]}
+
+    async def detach(self):
+        self.sent.append("detach")
+
+
+async def watch(cdp, work, max_script_ms=300, max_heap_mb=100):
+    watchdog = ScriptWatchdog(cdp, max_script_ms, max_heap_mb, poll_ms=20)
+    await watchdog.start()
+    try:
+        return await watchdog.guard(work), watchdog
+    finally:
+        await watchdog.stop()
+
+
+# ---------------------------------------------------------------------------
+# Watchdog
+# ---------------------------------------------------------------------------
+
+def test_page_within_budget_completes():
+    cdp = FakeCDP([(5.0, 10)])  # 5s of script before the watchdog started is not charged
+    result, watchdog = asyncio.run(watch(cdp, asyncio.sleep(0.15, result="done")))
+    assert result == "done"
+    assert "Runtime.terminateExecution" not in cdp.sent
+    assert watchdog.counters() == {"script_ms": 0, "heap_mb": 10}
+
+
+def test_script_blocking_the_main_thread_is_terminated():
+    cdp = FakeCDP([(0.0, 10), (0.2, 10), None])  # last answer shows a script running
+    cancelled = asyncio.Event()
+
+    async def load():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        with pytest.raises(ScriptBudgetExceeded) as info:
+            await watch(cdp, load(), max_script_ms=500)
+        return info.value
+
+    exceeded = asyncio.run(run())
+    assert exceeded.budget == "script_time" and exceeded.used > 500
+    assert "Runtime.terminateExecution" in cdp.sent and cancelled.is_set()
+
+
+def test_busy_main_thread_without_script_is_not_charged():
+    cdp = FakeCDP([(0.0, 10), (0.0, 10), None])  # layout / paint: no script time, no answers
+    result, watchdog = asyncio.run(watch(cdp, asyncio.sleep(0.6, result="captured")))
+    assert result == "captured"
+    assert "Runtime.terminateExecution" not in cdp.sent and watchdog.exceeded is None
+
+
+@pytest.mark.parametrize("samples, budget", [
+    ([(0.0, 10), (0.2, 10), (0.5, 10)], "script_time"),
+    ([(0.0, 10), (0.0, 50), (0.0, 150)], "heap"),
+])
+def test_metrics_over_budget(samples, budget):
+    async def run():
+        with pytest.raises(ScriptBudgetExceeded) as info:
+            await watch(FakeCDP(samples), asyncio.sleep(30))
+        return info.value
+
+    assert asyncio.run(run()).budget == budget
+
+
+# ---------------------------------------------------------------------------
+# Real pages (Chromium)
+# ---------------------------------------------------------------------------
+
+LAYOUT_HEAVY_HTML = "<div style='font:14px serif'>" + "<p>row <b>bold</b> <i>text</i></p>" * 60_000 + "</div>"
+
+
+def _watch_in_chromium(html: str, max_script_ms: int):
+    """Load and full-page capture `html` under a watchdog; returns (error or None, watchdog)."""
+    async_api = pytest.importorskip("playwright.async_api")
+
+    async def run():
+        async with async_api.async_playwright() as playwright:
+            try:
+                browser = await playwright.chromium.launch(headless=True, args=["--no-sandbox"])
+            except Exception as e:
+                pytest.skip(f"Chromium unavailable: {e}")
+            context = await browser.new_context(viewport={"width": 800, "height": 600})
+            page = await context.new_page()
+            watchdog = ScriptWatchdog(await context.new_cdp_session(page), max_script_ms, 0, poll_ms=50)
+            await watchdog.start()
+            try:
+                await watchdog.guard(page.set_content(html, wait_until="load", timeout=60_000))
+                await watchdog.guard(page.screenshot(full_page=True, timeout=60_000))
+                return None, watchdog
+            except ScriptBudgetExceeded as e:
+                return e, watchdog
+            finally:
+                await watchdog.stop()
+                await browser.close()
+
+    return asyncio.run(run())
+
+
+def test_layout_heavy_page_is_not_charged_as_script_time():
+    error, watchdog = _watch_in_chromium(LAYOUT_HEAVY_HTML, max_script_ms=200)
+    assert error is None
+    assert watchdog.script_ms < 200
+
+
+def test_infinite_loop_is_terminated_in_chromium():
+    error, _ = _watch_in_chromium("<script>while (true) {}</script>", max_script_ms=500)
+    assert error is not None and error.budget == "script_time"
+
+
+# ---------------------------------------------------------------------------
+# Renderer result
+# ---------------------------------------------------------------------------
+
+def test_budget_error_result():
+    error = renderer._budget_error(ScriptBudgetExceeded("heap", 700, 512))
+    assert error["error_code"] == "SCRIPT_BUDGET_EXCEEDED"
+    assert "JavaScript heap" in error["error"] and "700MB > 512MB" in error["error"]
@@ -0,0 +1,190 @@
+"""
+Unit tests for the pooled SFTP sessions (sftp_pool.py) used by the uploader.
+
+SSH connections are replaced with in-process fakes, so no server is needed.
+
+Usage:
+    pytest tests/test_sftp_pool.py -v
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.util import uploader
+from app.util.image_store import ImageStore
+from app.util.sftp_pool import SftpPool
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeSFTP:
+    def __init__(self, server):
+        self.server = server
+        self.cwd = None
+        self.fail_next = False
+
+    def stat(self, path):
+        self.server.stats += 1
+        if path not in self.server.dirs:
+            raise FileNotFoundError(path)
+
+    def mkdir(self, path):
+        self.server.dirs.add(path)
+
+    def chdir(self, path):
+        self.cwd = path
+
+    def putfo(self, fileobj, remotepath, file_size=0):
+        if self.fail_next:
+            self.fail_next = False
+            raise EOFError("connection reset")
+        time.sleep(0.01)
+        self.server.files[f"{self.cwd}/{remotepath}"] = fileobj.read()
+
+    def close(self):
+        pass
+
+
+class FakeServer:
+    """Stands in for the remote host: counts handshakes and stores uploads."""
+
+    def __init__(self, dirs=("/images",)):
+        self.dirs = set(dirs)
+        self.files = {}
+        self.stats = 0
+        self.clients = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        server = self
+
+        class Client:
+            def __init__(self):
+                self.transport = FakeTransport()
+                self.sftp = FakeSFTP(server)
+
+            def get_transport(self):
+                return self.transport
+
+            def open_sftp(self):
+                return self.sftp
+
+            def close(self):
+                self.transport.active = False
+
+        client = Client()
+        with self.lock:
+            self.clients.append(client)
+        return client
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+def test_sessions_are_reused_and_dir_checked_once():
+    server = FakeServer()
+    pool = SftpPool(server.connect, "/images/", size=2, keepalive=15)
+    for i in range(5):
+        pool.upload(b"img%d" % i, f"{i}.png")
+
+    assert len(server.clients) == 1 and server.stats == 1
+    assert server.clients[0].transport.keepalive == 15
+    assert server.files["/images/4.png"] == b"img4"
+    assert pool.stats() == {"idle": 1, "opened": 1, "reused": 4}
+
+
+def test_missing_remote_dir_is_created():
+    server = FakeServer(dirs=())
+    SftpPool(server.connect, "/images").upload(b"x", "a.png")
+    assert "/images" in server.dirs and server.files == {"/images/a.png": b"x"}
+
+
+def test_concurrent_uploads_share_at_most_size_sessions():
+    server = FakeServer()
+    pool = SftpPool(server.connect, "/images", size=2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: pool.upload(b"x", f"{i}.png"), range(40)))
+    assert len(server.files) == 40
+    assert len(server.clients) <= 2
+
+
+def test_dead_or_idle_sessions_are_replaced():
+    server = FakeServer()
+    pool = SftpPool(server.connect, "/images", idle_timeout=60)
+    pool.upload(b"1", "1.png")
+    server.clients[0].transport.active = False
+    pool.upload(b"2", "2.png")
+    assert len(server.clients) == 2
+
+    pool._idle[0].last_used -= 120
+    pool.upload(b"3", "3.png")
+    assert len(server.clients) == 3 and len(server.files) == 3
+
+
+def test_failure_on_reused_session_reconnects_once():
+    server = FakeServer()
+    pool = SftpPool(server.connect, "/images")
+    pool.upload(b"1", "1.png")
+    server.clients[0].sftp.fail_next = True
+
+    pool.upload(b"2", "2.png")
+    assert server.files["/images/2.png"] == b"2"
+    assert len(server.clients) == 2 and not server.clients[0].transport.active
+
+
+def test_failure_on_fresh_session_raises_and_discards_it():
+    server = FakeServer()
+    pool = SftpPool(server.connect, "/images")
+
+    original_connect = server.connect
+
+    def failing_connect():
+        client = original_connect()
+        client.sftp.fail_next = True
+        return client
+
+    pool._connect = failing_connect
+    with pytest.raises(EOFError):
+        pool.upload(b"1", "1.png")
+    assert pool.stats()["idle"] == 0
+
+
+# ---------------------------------------------------------------------------
+# Uploader
+# ---------------------------------------------------------------------------
+
+def test_uploader_falls_back_to_pooled_sftp(monkeypatch, tmp_path):
+    server = FakeServer()
+    pool = SftpPool(server.connect, "/images")
+    store = ImageStore(max_bytes=1000)
+    monkeypatch.setattr("app.util.image_store.get_image_store", lambda: store)
+    monkeypatch.setattr(uploader, "get_sftp_pool", lambda: pool)
+    monkeypatch.setenv("IMAGE_LOCAL_DIR", str(tmp_path / "not-mounted"))
+    monkeypatch.setenv("IMAGE_URL_BASE", "http://img/")
+    uploader.get_settings.cache_clear()
+    try:
+        for name in ("a.png", "b.png"):
+            store.put(str(tmp_path / name), b"bytes-" + name.encode())
+            assert uploader.upload_image(str(tmp_path / name)) == {"status": "success", "url": f"http://img/{name}"}
+    finally:
+        uploader.get_settings.cache_clear()
+    assert server.files == {"/images/a.png": b"bytes-a.png", "/images/b.png": b"bytes-b.png"}
+    assert len(server.clients) == 1
@@ -0,0 +1,191 @@
+"""
+Unit tests for the browserless SVG fast lane (svg_fast_lane.py), its use by
+the renderer, and a parity suite comparing fast-lane images with Chromium
+screenshots of the same fixtures (needs cairosvg and Playwright Chromium;
+skipped otherwise).
+
+Usage:
+    pytest tests/test_svg_fast_lane.py -v
+"""
+
+import io
+import asyncio
+
+import pytest
+
+from app.util import renderer
+from app.util.svg_fast_lane import _box, classify_svg_page, rasterize_svg_page
+from benchmarks.bench_render import load_corpus
+
+SVG = '<svg width="400" height="300"><rect width="400" height="300" fill="#0ea5e9"/></svg>'
+SVG_FIXTURES = ["svg_badge", "svg_chart", "svg_flow"]
+
+
+def page(body: str = SVG, style: str = "", head: str = "") -> str:
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'>{head}<style>{style}</style></head><body>{body}</body></html>"
+
+
+# ---------------------------------------------------------------------------
+# Classifier
+# ---------------------------------------------------------------------------
+
+def test_corpus_svg_pages_take_the_fast_lane_and_others_do_not():
+    for name, (html, width) in load_corpus().items():
+        assert (classify_svg_page(html, width) is not None) is name.startswith("svg_"), name
+
+
+def test_plan_reproduces_page_layout():
+    plan = classify_svg_page(page(), 1200)
+    assert (plan.left, plan.top, plan.page_width, plan.page_height) == (8, 8, 1200, 800)
+    assert plan.background == (255, 255, 255)
+    assert 'xmlns="http://www.w3.org/2000/svg"' in plan.svg
+
+    styled = classify_svg_page(page(style="* { margin: 0 } body { padding: 10px 20px; background: navy }"), 1200)
+    assert (styled.left, styled.top, styled.background) == (20, 10, (0, 0, 128))
+
+    tall = SVG.replace('height="300"', 'height="1500"')
+    assert classify_svg_page(page(tall, style="svg { display: block }"), 1200).page_height == 1516
+    assert classify_svg_page(page(tall), 1200) is None  # inline: Chromium adds a line-box gap
+
+
+@pytest.mark.parametrize("html", [
+    page('<svg width="400" height="300"><script>alert(1)</script></svg>'),
+    page('<svg width="400" height="300" onload="go()"></svg>'),
+    page('<svg width="400" height="300"><foreignObject><div>x</div></foreignObject></svg>'),
+    page('<svg width="400" height="300"><animate attributeName="x" dur="1s"/></svg>'),
+    page('<svg width="400" height="300"><image href="https://example.com/a.png"/></svg>'),
+    page('<svg width="400" height="300"><rect fill="url(https://example.com/p.svg#g)"/></svg>'),
+    page('<svg width="400" height="300"><text x="0" y="20">你好</text></svg>'),
+    page('<svg width="100%" height="300"></svg>'),
+    page('<svg viewBox="0 0 400 300"></svg>'),
+    page('<svg width="1300" height="300"></svg>'),
+    page(SVG + SVG),
+    page("<h1>Title</h1>" + SVG),
+    page(SVG, head='<script src="https://cdn.jsdelivr.net/x.js"></script>'),
+    page(SVG, style="body { display: flex; justify-content: center }"),
+    page(SVG, style="body { margin: 0 auto }"),
+    page(SVG, style="body { background: linear-gradient(#fff, #000) }"),
+    page(SVG, style=".card { margin: 0 }"),
+    page(SVG, style="@import url(x.css);"),
+    '<html><body style="margin:0">' + SVG + "</body></html>",
+])
+def test_unsure_pages_go_to_chromium(html):
+    assert classify_svg_page(html, 1200) is None
+
+
+@pytest.mark.parametrize("value, box", [
+    ("0", (0, 0, 0, 0)),
+    ("4px 8px", (4, 8, 4, 8)),
+    ("1px 2px 3px", (1, 2, 3, 2)),
+    ("1 2 3 4", (1, 2, 3, 4)),
+    ("0 auto", None),
+    ("1em", None),
+])
+def test_box_shorthand(value, box):
+    assert _box(value) == box
+
+
+# ---------------------------------------------------------------------------
+# Renderer
+# ---------------------------------------------------------------------------
+
+def fake_rasterize(plan, scale):
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (round(plan.page_width * scale), round(plan.page_height * scale)), "white")
+    draw = ImageDraw.Draw(image)
+    for x in range(0, 400, 20):
+        draw.rectangle([x, x // 2, x + 10, x // 2 + 200], fill=(x % 256, 90, 200))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def fast_lane(monkeypatch, tmp_path):
+    pytest.importorskip("PIL")
+    browser_items = []
+
+    async def inline_pool(func, *args):
+        return func(*args)
+
+    async def adispatch(items, timeout):
+        browser_items.extend(item.html_content for item in items)
+        return [{"status": "success", "local_path": item.prepared["local_path"], "browser": True} for item in items]
+
+    monkeypatch.setattr(renderer, "svg_fast_lane_available", lambda: True)
+    monkeypatch.setattr(renderer, "rasterize_svg_page", fake_rasterize)
+    monkeypatch.setattr(renderer, "run_in_encode_pool", inline_pool)
+    monkeypatch.setattr(renderer, "get_render_cache", lambda: None)
+    monkeypatch.setattr(renderer, "_ensure_output_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(renderer, "_adispatch_pages", adispatch)
+    monkeypatch.setattr(renderer, "_dispatch_pages", lambda items, timeout: asyncio.run(adispatch(items, timeout)))
+    return browser_items
+
+
+def test_svg_page_skips_the_browser(fast_lane):
+    result = renderer.render_html_to_image(page(), 1200, scales=[2.0])
+    assert result["status"] == "success" and "browser" not in result
+    assert (result["width"], result["height"]) == (2400, 1600)
+    assert result["counters"]["fast_lane"] == 1 and "rasterize" in result["timings"]
+    assert fast_lane == []
+
+
+def test_batch_mixes_fast_lane_and_browser(fast_lane):
+    card = page("<div class='card'>Hello</div>")
+    results = asyncio.run(renderer.render_html_batch_async([(card, 1200), (page(), 1200), (card, 800)]))
+    assert [r.get("browser", False) for r in results] == [True, False, True]
+    assert fast_lane == [card, card]
+
+
+def test_rasterize_failure_falls_back_to_browser(fast_lane, monkeypatch):
+    def broken(plan, scale):
+        raise ValueError("not well-formed")
+
+    monkeypatch.setattr(renderer, "rasterize_svg_page", broken)
+    assert renderer.render_html_to_image(page(), 1200)["browser"] is True
+
+
+def test_fast_lane_can_be_switched_off(fast_lane, monkeypatch):
+    monkeypatch.setenv("RENDER_SVG_FAST_LANE", "false")
+    renderer.get_settings.cache_clear()
+    try:
+        assert renderer.render_html_to_image(page(), 1200)["browser"] is True
+    finally:
+        renderer.get_settings.cache_clear()
+
+
+# ---------------------------------------------------------------------------
+# Parity with Chromium
+# ---------------------------------------------------------------------------
+
+# Anti-aliasing and font hinting differ between cairo and Skia; layout and
+# colours must not.
+_MAX_MEAN_DIFF = 2.0  # mean absolute channel difference (0-255)
+_MAX_DIFF_PIXELS = 0.02  # share of pixels differing by more than _PIXEL_TOLERANCE
+_PIXEL_TOLERANCE = 64
+
+
+@pytest.mark.parametrize("name", SVG_FIXTURES)
+@pytest.mark.parametrize("scale", [1.0, 2.0])
+def test_fast_lane_matches_chromium(chromium, name, scale):
+    pytest.importorskip("cairosvg")
+    pytest.importorskip("PIL")
+    from PIL import Image, ImageChops, ImageStat
+
+    html, width = load_corpus([name])[name]
+    context = chromium.new_context(viewport={"width": width, "height": 800}, device_scale_factor=scale)
+    try:
+        browser_page = context.new_page()
+        browser_page.set_content(html, wait_until="load")
+        expected = Image.open(io.BytesIO(browser_page.screenshot(full_page=True))).convert("RGB")
+    finally:
+        context.close()
+    actual = Image.open(io.BytesIO(rasterize_svg_page(classify_svg_page(html, width), scale))).convert("RGB")
+
+    assert actual.size == expected.size
+    diff = ImageChops.difference(actual, expected)
+    assert max(ImageStat.Stat(diff).mean) <= _MAX_MEAN_DIFF
+    strong = diff.convert("L").point(lambda v: 255 if v > _PIXEL_TOLERANCE else 0)
+    share = ImageStat.Stat(strong).mean[0] / 255
+    assert share <= _MAX_DIFF_PIXELS, f"{share:.2%} of pixels differ"
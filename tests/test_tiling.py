@@ -0,0 +1,76 @@
+"""
+Unit tests for tall-page planning and streaming strip stitching (tiling.py).
+
+Usage:
+    pytest tests/test_tiling.py -v
+"""
+
+import io
+
+import pytest
+
+from app.util.tiling import PngStripWriter, plan_parts, plan_strips
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+
+def test_short_page_is_one_part():
+    assert plan_parts(900, 16384, "truncate") == ([(0, 900)], False)
+    assert plan_parts(50_000, 0, "truncate") == ([(0, 50_000)], False)
+
+
+def test_tall_page_truncated():
+    assert plan_parts(20_000, 9000, "truncate") == ([(0, 9000)], True)
+
+
+def test_tall_page_split():
+    parts, truncated = plan_parts(20_000, 9000, "split")
+    assert parts == [(0, 9000), (9000, 9000), (18_000, 2000)]
+    assert not truncated
+
+
+def test_strips_cover_region_exactly():
+    strips = plan_strips(9000, 9000, 4096)
+    assert strips == [(9000, 4096), (13_096, 4096), (17_192, 808)]
+    assert plan_strips(0, 900, 4096) == [(0, 900)]
+    assert plan_strips(0, 9000, 0) == [(0, 9000)]
+
+
+# ---------------------------------------------------------------------------
+# Stitching
+# ---------------------------------------------------------------------------
+
+def test_stitched_png_matches_source_pixels():
+    Image = pytest.importorskip("PIL.Image")
+
+    source = Image.new("RGB", (64, 100))
+    source.putdata([(x * 4, y * 2, (x + y) % 256) for y in range(100) for x in range(64)])
+
+    out = io.BytesIO()
+    writer = PngStripWriter(out)
+    for top, height in plan_strips(0, 100, 30):
+        strip = io.BytesIO()
+        source.crop((0, top, 64, top + height)).save(strip, format="PNG")
+        writer.add_strip(strip.getvalue())
+    writer.close()
+
+    with Image.open(io.BytesIO(out.getvalue())) as stitched:
+        assert stitched.size == (64, 100)
+        assert stitched.mode == "RGB"
+        assert stitched.tobytes() == source.tobytes()
+
+
+def test_strip_width_mismatch_rejected():
+    Image = pytest.importorskip("PIL.Image")
+
+    def png(width):
+        buf = io.BytesIO()
+        Image.new("RGB", (width, 10), (255, 0, 0)).save(buf, format="PNG")
+        return buf.getvalue()
+
+    writer = PngStripWriter(io.BytesIO())
+    writer.add_strip(png(20))
+    with pytest.raises(ValueError):
+        writer.add_strip(png(21))
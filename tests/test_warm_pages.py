@@ -0,0 +1,189 @@
+"""
+Unit tests for the pre-warmed ECharts page stock (warm_pages.py): reuse,
+single-use pages, background refill within the browser pool's page
+capacity and release on browser recycling.
+
+Runs on a real BrowserPool loop with fake browsers, so no Chromium is
+needed.
+
+Usage:
+    pytest tests/test_warm_pages.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from app.util.browser_pool import BrowserPool, _PooledBrowser
+from app.util.warm_pages import WarmPageStock
+
+BUNDLE_URL = "https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"
+BUNDLE = b"window.echarts = {init() {}};"
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    def is_closed(self) -> bool:
+        return self.context.closed
+
+    async def add_init_script(self, script):
+        pass
+
+    async def add_script_tag(self, content=None):
+        pass
+
+    async def evaluate(self, script, arg=None):
+        return True
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.contexts: list[FakeContext] = []
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+@pytest.fixture
+def warm_pool():
+    pools: list[BrowserPool] = []
+
+    def _factory(per_browser: int = 1, **kwargs):
+        pool = BrowserPool(size=1, **kwargs)
+        launched: list[FakeBrowser] = []
+
+        async def fake_launch(slot: int) -> _PooledBrowser:
+            launched.append(FakeBrowser())
+            return _PooledBrowser(slot=slot, browser=launched[-1])
+
+        pool._launch = fake_launch
+        pools.append(pool)
+        return pool, WarmPageStock(pool, per_browser), launched
+
+    yield _factory
+    for pool in pools:
+        pool.close()
+
+
+async def take_and_refill(stock: WarmPageStock, browser):
+    """take() plus waiting for the background refill it schedules."""
+    taken = await stock.take(browser, BUNDLE_URL, BUNDLE)
+    await asyncio.gather(*stock._tasks)
+    return taken
+
+
+# ---------------------------------------------------------------------------
+# Reuse / single use / refill
+# ---------------------------------------------------------------------------
+
+def test_miss_refills_and_next_render_reuses_the_page(warm_pool):
+    pool, stock, _ = warm_pool()
+
+    async def job(browser):
+        first = await take_and_refill(stock, browser)
+        leased = pool.stats()["leased_pages"]
+        second = await take_and_refill(stock, browser)
+        return first, leased, second
+
+    first, leased, second = pool.run(job, timeout=5)
+    assert first is None and leased == 1
+    context, page = second
+    assert page.context is context and not context.closed
+    assert stock.stats() == {"warm_pages": 1, "hits": 1, "misses": 1}
+
+
+def test_warm_pages_are_single_use(warm_pool):
+    pool, stock, _ = warm_pool()
+
+    async def job(browser):
+        await take_and_refill(stock, browser)
+        taken = [await take_and_refill(stock, browser) for _ in range(3)]
+        return [context for context, _ in taken]
+
+    contexts = pool.run(job, timeout=5)
+    assert len(set(map(id, contexts))) == 3
+
+
+def test_stale_bundle_pages_are_closed_not_served(warm_pool):
+    pool, stock, _ = warm_pool()
+
+    async def job(browser):
+        await take_and_refill(stock, browser)
+        stale = stock._stock[id(browser)][1][0][0]
+        other = await stock.take(browser, "https://unpkg.com/echarts/dist/echarts.min.js", BUNDLE)
+        return stale, other
+
+    stale, other = pool.run(job, timeout=5)
+    assert other is None and stale.closed
+
+
+def test_refill_stops_at_pool_page_capacity(warm_pool):
+    pool, stock, launched = warm_pool(per_browser=5, max_pages=3)
+
+    async def job(browser):
+        await take_and_refill(stock, browser)
+        return pool.stats()["leased_pages"]
+
+    assert pool.run(job, timeout=5) == 2
+    assert stock.stats()["warm_pages"] == 2
+    assert len(launched[0].contexts) == 2
+
+
+def test_no_warm_pages_when_browser_holds_one_page(warm_pool):
+    pool, stock, launched = warm_pool(max_pages=1)
+
+    async def job(browser):
+        return await take_and_refill(stock, browser)
+
+    assert pool.run(job, timeout=5) is None
+    assert launched[0].contexts == [] and stock.stats()["warm_pages"] == 0
+
+
+def test_recycled_browser_drops_its_stock_and_closes(warm_pool):
+    pool, stock, launched = warm_pool(max_renders=2)
+
+    async def job(browser):
+        await take_and_refill(stock, browser)
+        return [context for context, _, _, _ in stock._stock[id(browser)][1]]
+
+    pool.run(job, timeout=5)
+    stocked = pool.run(job, timeout=5)
+
+    async def settle(browser):
+        await asyncio.sleep(0.05)
+        return browser
+
+    replacement = pool.run(settle, timeout=5)
+    assert replacement is launched[1]
+    assert launched[0].closed
+    assert stocked and all(context.closed for context in stocked)
+    assert pool.stats()["leased_pages"] == 0
+    assert stock.stats()["warm_pages"] == 0